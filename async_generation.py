@@ -0,0 +1,148 @@
+import asyncio
+import time
+from cohere import AsyncClient
+
+from poem_automation import POEM_MODEL, DEFAULT_ONE_LINER
+from rate_limiter import limited_chat_async
+from poem_parser import parse_structured_poem, STRUCTURED_POEM_SCHEMA
+
+class AsyncPoemGenerator:
+    """Generate a whole day's worth of poems concurrently with Cohere's AsyncClient"""
+
+    def __init__(self, automation, cohere_api_key, max_concurrency=4, max_retries=3):
+        self.automation = automation
+        self.cohere_api_key = cohere_api_key
+        self.max_concurrency = max(1, max_concurrency)
+        self.max_retries = max_retries
+        self.logger = automation.logger
+
+    async def _chat(self, client, **kwargs):
+        """client.chat under the automation's shared rate limiter"""
+        with self.automation.metrics.stage("cohere_chat"):
+            return await limited_chat_async(self.automation.rate_limiter, client.chat, self.logger, **kwargs)
+
+    async def _generate_one_liner(self, client, themes_used, content_lines):
+        """Generate the one-liner for a poem, falling back to the default on errors"""
+        prompt = self.automation.build_one_liner_prompt(themes_used, content_lines)
+        with self.automation.metrics.stage("generate_one_liner") as record:
+            try:
+                response = await self._chat(
+                    client,
+                    message=prompt,
+                    model=POEM_MODEL,
+                    temperature=0.93,
+                    max_tokens=60
+                )
+                return self.automation.clean_one_liner(response.text)
+            except Exception as e:
+                record["outcome"] = "fallback"
+                self.logger.warning(f"Failed to generate custom one-liner: {str(e)}")
+                return DEFAULT_ONE_LINER
+
+    async def _generate_structured(self, client, poem_number, context):
+        """Single-call poem generation; None when the structured response is unusable"""
+        selected_themes = self.automation.select_themes()
+        prompt = self.automation.build_structured_prompt(selected_themes, context)
+        try:
+            response = await self._chat(
+                client,
+                message=prompt,
+                model=POEM_MODEL,
+                temperature=0.92,
+                max_tokens=1000,
+                response_format={"type": "json_object", "schema": STRUCTURED_POEM_SCHEMA}
+            )
+        except Exception as e:
+            self.logger.warning(f"Poem {poem_number}: structured generation failed: {str(e)}")
+            return None
+        parsed = parse_structured_poem(self.automation.extract_response_text(response))
+        if parsed is None:
+            self.logger.info(f"Poem {poem_number}: unusable structured response, using two-call path")
+            return None
+        poem_text, one_liner = parsed
+        return poem_text, selected_themes, one_liner
+
+    async def _generate_one(self, client, semaphore, poem_number, context):
+        """Generate and validate a single poem plus its one-liner"""
+        async with semaphore:
+            # Each gather() task has its own context, so the poem number stays with it
+            with self.automation.metrics.poem(poem_number), \
+                    self.automation.metrics.stage("generate_poem") as record:
+                return await self._generate_validated(client, poem_number, context, record)
+
+    async def _generate_validated(self, client, poem_number, context, record):
+        """Structured call first, then the two-call path with retries; record gets the attempts"""
+        if self.automation.structured_output:
+            structured = await self._generate_structured(client, poem_number, context)
+            if structured:
+                return structured
+
+        for attempt in range(self.max_retries):
+            record["attempts"] = attempt + 1
+            selected_themes = self.automation.select_themes()
+            prompt = self.automation.build_poem_prompt(selected_themes, context)
+            try:
+                response = await self._chat(
+                    client,
+                    message=prompt,
+                    model=POEM_MODEL,
+                    temperature=0.92,
+                    max_tokens=1000
+                )
+            except Exception as e:
+                self.logger.warning(f"Poem {poem_number}: API error in attempt {attempt + 1}: {str(e)}")
+                continue
+
+            poem_text = self.automation.extract_response_text(response)
+            if not self.automation.validate_poem_structure(poem_text):
+                self.logger.info(f"Poem {poem_number}: invalid structure in attempt {attempt + 1}, retrying...")
+                continue
+
+            _, content_lines = self.automation.extract_title_and_lines(poem_text)
+            one_liner = await self._generate_one_liner(client, selected_themes, content_lines)
+            return poem_text, selected_themes, one_liner
+
+        raise ValueError(f"Failed to generate a valid poem {poem_number} after {self.max_retries} attempts")
+
+    async def generate(self, poem_numbers):
+        """Generate poems for all poem numbers concurrently.
+
+        Returns a dict of poem_number -> (poem_text, themes, one_liner), ordered
+        by poem number. Poems that failed every attempt are left out.
+        """
+        poem_numbers = sorted(poem_numbers)
+        if not poem_numbers:
+            return {}
+
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        # Poems generated together all see the same earlier-poem context
+        context = self.automation.get_poem_context()
+        start_time = time.perf_counter()
+        # Leaving the block closes the client's connection pool, which belongs to this event loop
+        async with AsyncClient(
+            self.cohere_api_key,
+            base_url=self.automation.cohere_base_url,
+            log_warning_experimental_features=False
+        ) as client:
+            results = await asyncio.gather(
+                *(self._generate_one(client, semaphore, number, context) for number in poem_numbers),
+                return_exceptions=True
+            )
+
+        poems = {}
+        for poem_number, result in zip(poem_numbers, results):
+            if isinstance(result, BaseException):
+                self.logger.error(f"Poem {poem_number} generation failed: {str(result)}")
+                continue
+            poems[poem_number] = result
+
+        elapsed = time.perf_counter() - start_time
+        self.logger.info(
+            f"Generated {len(poems)}/{len(poem_numbers)} poems in {elapsed:.1f}s "
+            f"(concurrency {self.max_concurrency})"
+        )
+        return poems
+
+    def run(self, poem_numbers):
+        """Synchronous entry point for generate()"""
+        return asyncio.run(self.generate(poem_numbers))
@@ -0,0 +1,105 @@
+import numpy as np
+
+GLYPH_WIDTH = 5
+GLYPH_HEIGHT = 7  # One row per weekday of the contribution graph
+
+# 5x7 bitmap font: one string per row, "1" is a lit cell
+FONT_5X7 = {
+    "A": [".111.", "1...1", "1...1", "11111", "1...1", "1...1", "1...1"],
+    "B": ["1111.", "1...1", "1...1", "1111.", "1...1", "1...1", "1111."],
+    "C": [".111.", "1...1", "1....", "1....", "1....", "1...1", ".111."],
+    "D": ["1111.", "1...1", "1...1", "1...1", "1...1", "1...1", "1111."],
+    "E": ["11111", "1....", "1....", "1111.", "1....", "1....", "11111"],
+    "F": ["11111", "1....", "1....", "1111.", "1....", "1....", "1...."],
+    "G": [".111.", "1...1", "1....", "1.111", "1...1", "1...1", ".1111"],
+    "H": ["1...1", "1...1", "1...1", "11111", "1...1", "1...1", "1...1"],
+    "I": [".111.", "..1..", "..1..", "..1..", "..1..", "..1..", ".111."],
+    "J": ["..111", "...1.", "...1.", "...1.", "...1.", "1..1.", ".11.."],
+    "K": ["1...1", "1..1.", "1.1..", "11...", "1.1..", "1..1.", "1...1"],
+    "L": ["1....", "1....", "1....", "1....", "1....", "1....", "11111"],
+    "M": ["1...1", "11.11", "1.1.1", "1.1.1", "1...1", "1...1", "1...1"],
+    "N": ["1...1", "1...1", "11..1", "1.1.1", "1..11", "1...1", "1...1"],
+    "O": [".111.", "1...1", "1...1", "1...1", "1...1", "1...1", ".111."],
+    "P": ["1111.", "1...1", "1...1", "1111.", "1....", "1....", "1...."],
+    "Q": [".111.", "1...1", "1...1", "1...1", "1.1.1", "1..1.", ".11.1"],
+    "R": ["1111.", "1...1", "1...1", "1111.", "1.1..", "1..1.", "1...1"],
+    "S": [".1111", "1....", "1....", ".111.", "....1", "....1", "1111."],
+    "T": ["11111", "..1..", "..1..", "..1..", "..1..", "..1..", "..1.."],
+    "U": ["1...1", "1...1", "1...1", "1...1", "1...1", "1...1", ".111."],
+    "V": ["1...1", "1...1", "1...1", "1...1", "1...1", ".1.1.", "..1.."],
+    "W": ["1...1", "1...1", "1...1", "1.1.1", "1.1.1", "1.1.1", ".1.1."],
+    "X": ["1...1", "1...1", ".1.1.", "..1..", ".1.1.", "1...1", "1...1"],
+    "Y": ["1...1", "1...1", ".1.1.", "..1..", "..1..", "..1..", "..1.."],
+    "Z": ["11111", "....1", "...1.", "..1..", ".1...", "1....", "11111"],
+    "0": [".111.", "1...1", "1..11", "1.1.1", "11..1", "1...1", ".111."],
+    "1": ["..1..", ".11..", "..1..", "..1..", "..1..", "..1..", ".111."],
+    "2": [".111.", "1...1", "....1", "...1.", "..1..", ".1...", "11111"],
+    "3": ["11111", "...1.", "..1..", "...1.", "....1", "1...1", ".111."],
+    "4": ["...1.", "..11.", ".1.1.", "1..1.", "11111", "...1.", "...1."],
+    "5": ["11111", "1....", "1111.", "....1", "....1", "1...1", ".111."],
+    "6": ["..11.", ".1...", "1....", "1111.", "1...1", "1...1", ".111."],
+    "7": ["11111", "....1", "...1.", "..1..", ".1...", ".1...", ".1..."],
+    "8": [".111.", "1...1", "1...1", ".111.", "1...1", "1...1", ".111."],
+    "9": [".111.", "1...1", "1...1", ".1111", "....1", "...1.", ".11.."],
+    " ": [".....", ".....", ".....", ".....", ".....", ".....", "....."],
+    "!": ["..1..", "..1..", "..1..", "..1..", "..1..", ".....", "..1.."],
+    "?": [".111.", "1...1", "....1", "...1.", "..1..", ".....", "..1.."],
+    ".": [".....", ".....", ".....", ".....", ".....", ".11..", ".11.."],
+    ",": [".....", ".....", ".....", ".....", ".11..", "..1..", ".1..."],
+    ":": [".....", ".11..", ".11..", ".....", ".11..", ".11..", "....."],
+    ";": [".....", ".11..", ".11..", ".....", ".11..", "..1..", ".1..."],
+    "'": ["..1..", "..1..", ".1...", ".....", ".....", ".....", "....."],
+    '"': [".1.1.", ".1.1.", ".....", ".....", ".....", ".....", "....."],
+    "-": [".....", ".....", ".....", "11111", ".....", ".....", "....."],
+    "+": [".....", "..1..", "..1..", "11111", "..1..", "..1..", "....."],
+    "=": [".....", ".....", "11111", ".....", "11111", ".....", "....."],
+    "_": [".....", ".....", ".....", ".....", ".....", ".....", "11111"],
+    "/": [".....", "....1", "...1.", "..1..", ".1...", "1....", "....."],
+    "\\": [".....", "1....", ".1...", "..1..", "...1.", "....1", "....."],
+    "(": ["...1.", "..1..", ".1...", ".1...", ".1...", "..1..", "...1."],
+    ")": [".1...", "..1..", "...1.", "...1.", "...1.", "..1..", ".1..."],
+    "<": ["...1.", "..1..", ".1...", "1....", ".1...", "..1..", "...1."],
+    ">": [".1...", "..1..", "...1.", "....1", "...1.", "..1..", ".1..."],
+    "*": [".....", "..1..", "1.1.1", ".111.", "1.1.1", "..1..", "....."],
+    "#": [".1.1.", ".1.1.", "11111", ".1.1.", "11111", ".1.1.", ".1.1."],
+    "&": [".11..", "1..1.", "1.1..", ".1...", "1.1.1", "1..1.", ".11.1"],
+    "@": [".111.", "1...1", "....1", ".11.1", "1.1.1", "1.1.1", ".111."],
+    "%": ["11...", "11..1", "...1.", "..1..", ".1...", "1..11", "...11"],
+    "$": ["..1..", ".1111", "1.1..", ".111.", "..1.1", "1111.", "..1.."],
+    "^": ["..1..", ".1.1.", "1...1", ".....", ".....", ".....", "....."],
+    "|": ["..1..", "..1..", "..1..", "..1..", "..1..", "..1..", "..1.."],
+}
+
+# Glyphs as 7x5 boolean arrays, stacked once at import
+_GLYPH_INDEX = {char: i for i, char in enumerate(FONT_5X7)}
+_GLYPHS = np.array(
+    [[[cell == "1" for cell in row] for row in FONT_5X7[char]] for char in FONT_5X7],
+    dtype=bool
+)
+
+def unsupported_characters(text):
+    """Characters of text the font has no glyph for (letters are upper-cased)"""
+    return sorted({char for char in text.upper() if char not in _GLYPH_INDEX})
+
+def text_width(text, spacing=1):
+    """Width in columns of text rendered with render_text"""
+    if not text:
+        return 0
+    return len(text) * GLYPH_WIDTH + (len(text) - 1) * spacing
+
+def render_text(text, spacing=1):
+    """Render text as a 7 x text_width(text) boolean array.
+
+    Letters are upper-cased; unknown characters raise ValueError.
+    """
+    missing = unsupported_characters(text)
+    if missing:
+        raise ValueError(f"No glyph for: {''.join(missing)}")
+    if not text:
+        return np.zeros((GLYPH_HEIGHT, 0), dtype=bool)
+
+    glyphs = _GLYPHS[[_GLYPH_INDEX[char] for char in text.upper()]]
+    # Pad each glyph with its trailing spacing, lay them side by side, drop the last gap
+    padded = np.pad(glyphs, ((0, 0), (0, 0), (0, spacing)))
+    banner = padded.transpose(1, 0, 2).reshape(GLYPH_HEIGHT, -1)
+    return banner[:, :text_width(text, spacing)]
@@ -0,0 +1,105 @@
+import subprocess
+from io import BytesIO
+from pathlib import Path
+
+from git import Commit, Tree
+from git.objects.fun import tree_entries_from_data, tree_to_stream
+from gitdb import IStream
+
+FILE_MODE = 0o100644
+TREE_MODE = 0o040000
+
+def _sort_key(entry):
+    # Git orders tree entries by name, with directories compared as "name/"
+    _, mode, name = entry
+    return name + "/" if mode == TREE_MODE else name
+
+class CommitWriter:
+    """Commits single poem files straight into the object database.
+
+    The blob, the trees along poems/YYYY/MM_Month/DD_Weekday and the
+    commit are written in-process, and HEAD's branch is moved with a
+    reflog entry, so a commit costs the same however large the tree gets.
+    Each committed entry goes to a journal in the git directory and is
+    applied to the index right away with git update-index, so git status
+    never shows the committed poem as a staged deletion. If the index is
+    locked at that moment, the entry stays in the journal for the next
+    sync_index() (at the next commit, the end of the run or before a merge).
+    """
+
+    JOURNAL = "poem-index-pending"
+
+    def __init__(self, repo):
+        self.repo = repo
+        self.repo_path = Path(repo.working_tree_dir)
+        self.journal_path = Path(repo.git_dir) / self.JOURNAL
+
+    def _store(self, type_name, data):
+        return self.repo.odb.store(IStream(type_name, len(data), BytesIO(data))).binsha
+
+    def _tree_entries(self, binsha):
+        return tree_entries_from_data(self.repo.odb.stream(binsha).read())
+
+    def _write_tree(self, entries):
+        stream = BytesIO()
+        tree_to_stream(sorted(entries, key=_sort_key), stream.write)
+        return self._store(Tree.type, stream.getvalue())
+
+    def _update_tree(self, tree_sha, parts, blob_sha):
+        """New tree sha with parts[-1] set to blob_sha, rewriting only the trees on the path"""
+        entries = self._tree_entries(tree_sha) if tree_sha else []
+        name = parts[0]
+        existing = next((entry for entry in entries if entry[2] == name), None)
+        entries = [entry for entry in entries if entry[2] != name]
+        if len(parts) == 1:
+            entries.append((blob_sha, FILE_MODE, name))
+        else:
+            subtree_sha = existing[0] if existing and existing[1] == TREE_MODE else None
+            entries.append((self._update_tree(subtree_sha, parts[1:], blob_sha), TREE_MODE, name))
+        return self._write_tree(entries)
+
+    def commit_file(self, file_path, message):
+        """Commit one file on top of HEAD; returns the new Commit (or HEAD if nothing changed)"""
+        file_path = Path(file_path)
+        rel_path = file_path.resolve().relative_to(self.repo_path.resolve()).as_posix()
+        with open(file_path, 'rb') as f:
+            blob_sha = self._store(b"blob", f.read())
+
+        head = self.repo.head.commit if self.repo.head.is_valid() else None
+        root_sha = self._update_tree(head.tree.binsha if head else None, rel_path.split('/'), blob_sha)
+        if head and root_sha == head.tree.binsha:
+            return head
+
+        commit = Commit.create_from_tree(
+            self.repo, Tree(self.repo, root_sha), message,
+            parent_commits=[head] if head else [], head=True
+        )
+        with open(self.journal_path, 'a', encoding='utf-8') as f:
+            f.write(f"{FILE_MODE:o} {blob_sha.hex()}\t{rel_path}\n")
+        try:
+            self.sync_index()
+        except subprocess.CalledProcessError:
+            # Most likely another git process holds index.lock
+            pass
+        return commit
+
+    def pending(self):
+        """Number of committed files the index doesn't know about yet"""
+        try:
+            with open(self.journal_path, 'r', encoding='utf-8') as f:
+                return sum(1 for line in f if line.strip())
+        except OSError:
+            return 0
+
+    def sync_index(self):
+        """Apply the journal to the index in one git update-index call"""
+        try:
+            with open(self.journal_path, 'r', encoding='utf-8') as f:
+                entries = f.read()
+        except OSError:
+            return 0
+        if entries.strip():
+            subprocess.run(['git', 'update-index', '--index-info'], cwd=self.repo_path,
+                           input=entries, text=True, check=True, capture_output=True)
+        self.journal_path.unlink()
+        return entries.count("\n")
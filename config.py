@@ -8,6 +8,37 @@ load_dotenv()
 COHERE_API_KEY = os.getenv('COHERE_API_KEY')
 REPO_PATH = os.path.dirname(os.path.abspath(__file__))
 
+# Maximum number of concurrent Cohere requests when generating a day's poems
+GENERATION_CONCURRENCY = int(os.getenv('GENERATION_CONCURRENCY', '4'))
+
+# Commit poems locally at their slots and push once per run instead of per poem
+BATCH_PUSH = os.getenv('BATCH_PUSH', 'false').lower() in ('1', 'true', 'yes')
+
+# Number of pre-generated poems to keep in poem_spool/ (0 disables prefetching)
+PREFETCH_DEPTH = int(os.getenv('PREFETCH_DEPTH', '0'))
+
+# Ask for title, lines and one-liner as one JSON response (falls back to two calls)
+STRUCTURED_OUTPUT = os.getenv('STRUCTURED_OUTPUT', 'true').lower() in ('1', 'true', 'yes')
+
+# Alternative Cohere API endpoint, e.g. a local fake_cohere.py server
+COHERE_BASE_URL = os.getenv('COHERE_BASE_URL') or None
+
+# Cohere quota shared by every process on this machine (0 disables a limit)
+COHERE_RPM = int(os.getenv('COHERE_RPM', '20'))
+COHERE_TPM = int(os.getenv('COHERE_TPM', '0'))
+
+# Push queued poem commits together once this many are waiting or the oldest
+# has waited this long (1 and 0 push every commit right away)
+PUSH_BATCH_SIZE = int(os.getenv('PUSH_BATCH_SIZE', '1'))
+PUSH_WINDOW_SECONDS = int(os.getenv('PUSH_WINDOW_SECONDS', '0'))
+
+# What happens to poem day folders and log files once they're older than their
+# retention days: keep, archive (into archive/, poems as monthly packs) or delete
+POEM_RETENTION = os.getenv('POEM_RETENTION', 'keep')
+POEM_RETENTION_DAYS = int(os.getenv('POEM_RETENTION_DAYS', '30'))
+LOG_RETENTION = os.getenv('LOG_RETENTION', 'delete')
+LOG_RETENTION_DAYS = int(os.getenv('LOG_RETENTION_DAYS', '7'))
+
 # Validate required environment variables
 if not COHERE_API_KEY:
     raise ValueError("COHERE_API_KEY environment variable is not set")
\ No newline at end of file
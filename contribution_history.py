@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+import argparse
+import datetime
+import json
+import os
+import subprocess
+from pathlib import Path
+
+class ContributionHistory:
+    """Per-day commit counts of a repository, maintained incrementally.
+
+    Counts are keyed by author date (YYYY-MM-DD) and cached together with the
+    last scanned commit, so later scans only stream the commits added since.
+    A rewritten history (the cached commit is no longer an ancestor) falls
+    back to a full rescan.
+    """
+
+    def __init__(self, repo_path, cache_path=None, ref="HEAD"):
+        self.repo_path = Path(repo_path)
+        self.cache_path = Path(cache_path) if cache_path else self.repo_path / "contribution_history.json"
+        self.ref = ref
+        self.last_sha = None
+        self.daily = {}
+        self._load()
+
+    def _load(self):
+        try:
+            with open(self.cache_path, 'r') as f:
+                cache = json.load(f)
+        except (OSError, ValueError):
+            return
+        if cache.get("ref") == self.ref:
+            self.last_sha = cache.get("last_sha")
+            self.daily = cache.get("counts", {})
+
+    def _save(self):
+        tmp_path = self.cache_path.with_suffix(".tmp")
+        with open(tmp_path, 'w') as f:
+            json.dump({"ref": self.ref, "last_sha": self.last_sha, "counts": self.daily}, f)
+        os.replace(tmp_path, self.cache_path)
+
+    def _git(self, *args):
+        return subprocess.run(['git', *args], cwd=self.repo_path, capture_output=True, text=True)
+
+    def _head(self):
+        result = self._git('rev-parse', '--verify', '-q', f'{self.ref}^{{commit}}')
+        return result.stdout.strip() if result.returncode == 0 else None
+
+    def _stream_dates(self, revision_range):
+        """Yield the author date of every commit in a range, one git log line at a time"""
+        process = subprocess.Popen(
+            ['git', 'log', '--format=%ad', '--date=short', revision_range],
+            cwd=self.repo_path, stdout=subprocess.PIPE, text=True
+        )
+        try:
+            for line in process.stdout:
+                yield line.strip()
+        finally:
+            process.stdout.close()
+            process.wait()
+
+    def scan(self):
+        """Bring the counts up to date; returns the number of commits processed"""
+        head = self._head()
+        if head is None or head == self.last_sha:
+            return 0
+
+        if self.last_sha and self._git('merge-base', '--is-ancestor', self.last_sha, head).returncode == 0:
+            revision_range = f"{self.last_sha}..{head}"
+        else:
+            revision_range = head
+            self.daily = {}
+
+        processed = 0
+        for date in self._stream_dates(revision_range):
+            if date:
+                self.daily[date] = self.daily.get(date, 0) + 1
+                processed += 1
+        self.last_sha = head
+        self._save()
+        return processed
+
+    def count(self, date):
+        """Commits on a date (YYYY-MM-DD string, date or datetime)"""
+        if not isinstance(date, str):
+            date = date.strftime('%Y-%m-%d')
+        return self.daily.get(date, 0)
+
+    def counts(self, start=None, end=None):
+        """{YYYY-MM-DD: commits}, optionally limited to start <= date <= end"""
+        return {
+            date: count for date, count in sorted(self.daily.items())
+            if (start is None or date >= start) and (end is None or date <= end)
+        }
+
+def load_history(repo_path):
+    """Scanned contribution history of a repository (updates the cache)"""
+    history = ContributionHistory(repo_path)
+    history.scan()
+    return history
+
+def main():
+    parser = argparse.ArgumentParser(description='Per-day commit counts of this repository, with target comparison')
+    parser.add_argument('--start', default=None, help='First date, YYYY-MM-DD')
+    parser.add_argument('--end', default=datetime.date.today().isoformat(), help='Last date (default: today)')
+    parser.add_argument('--compare', action='store_true', help='Compare with the commit pattern targets')
+    parser.add_argument('--rescan', action='store_true', help='Ignore the cache and scan everything again')
+    args = parser.parse_args()
+
+    repo_path = os.path.dirname(os.path.abspath(__file__))
+    history = ContributionHistory(repo_path)
+    if args.rescan:
+        history.last_sha = None
+    processed = history.scan()
+    print(f"Scanned {processed} new commits, {sum(history.daily.values())} in total")
+
+    counts = history.counts(args.start, args.end)
+    if not args.compare:
+        for date, count in counts.items():
+            print(f"{date}: {count}")
+        return
+
+    from pattern_store import load_pattern_store
+    pattern = load_pattern_store(repo_path)
+    if pattern is None:
+        print("No commit pattern found")
+        return
+    start = datetime.date.fromisoformat(args.start) if args.start else pattern.start
+    end = datetime.date.fromisoformat(args.end)
+    days = (end - start).days + 1
+    with pattern:
+        targets = pattern.range(start, max(days, 0), default=0)
+    behind = 0
+    for offset, target in enumerate(targets):
+        date = (start + datetime.timedelta(days=offset)).isoformat()
+        actual = history.count(date)
+        if actual < target:
+            behind += 1
+            print(f"{date}: {actual}/{target} commits")
+    print(f"{behind} of {max(days, 0)} days below target")
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,18 @@
 #!/usr/bin/env python3
+import argparse
+import datetime
 import os
 from pathlib import Path
 from git_art_generator import GitArtGenerator
 
 def main():
+    parser = argparse.ArgumentParser(description='Backfill the contribution art commits')
+    parser.add_argument('--dry-run', action='store_true', help='Only report the commits per day')
+    parser.add_argument('--until', type=datetime.date.fromisoformat, default=None,
+                      help='Last date to backfill, YYYY-MM-DD (default: today)')
+    parser.add_argument('--no-push', action='store_true', help='Commit locally without pushing')
+    args = parser.parse_args()
+    
     # Get the repository path (current directory)
     repo_path = Path(os.getcwd())
     
@@ -15,10 +24,13 @@ def main():
     
     try:
         # Generate the art commits
-        generator.create_art_commits()
+        generator.create_art_commits(dry_run=args.dry_run, until=args.until)
+        if args.dry_run:
+            return
         
         # Push changes to remote
-        generator.push_changes()
+        if not args.no_push:
+            generator.push_changes()
         
         print("\nArt generation completed successfully!")
         print("Check your GitHub profile to see the contribution art.")
@@ -1,11 +1,14 @@
 #!/usr/bin/env python3
+import argparse
 import datetime
-import time
 import traceback
+import subprocess
 import sys
 import os
-from poem_automation import PoemAutomation
-from config import COHERE_API_KEY, REPO_PATH
+# Only light modules here: cohere and git are imported once generation starts
+from poem_index import PoemIndex, date_from_folder, folder_for_date
+from pattern_store import load_pattern_store
+from config import COHERE_API_KEY, REPO_PATH, BATCH_PUSH
 from pathlib import Path
 
 # Global retry configuration
@@ -31,23 +34,42 @@ def print_debug_info():
             print(f"  {key}: {value}")
     print("=== End Debug Info ===\n")
 
-def should_generate_poems():
-    """Determine if we should generate poems now"""
-    now = datetime.datetime.now()
+def poems_planned(date):
+    """Poems to write on a date: the commit pattern's count, or TOTAL_POEMS without one"""
+    try:
+        pattern = load_pattern_store(REPO_PATH)
+    except (OSError, ValueError) as e:
+        print(f"Error reading commit pattern: {str(e)}")
+        pattern = None
+    if pattern is None:
+        return TOTAL_POEMS
+    with pattern:
+        return pattern.get(date, default=TOTAL_POEMS)
+
+def should_generate_poems(now=None):
+    """Determine if we should generate poems now
+
+    Answers from the commit pattern and the day's folder and index alone, so
+    the common "nothing to do" run never loads the Cohere client or git.
+    """
+    now = now or datetime.datetime.now()
     print(f"\nChecking if poems should be generated at {now.strftime('%Y-%m-%d %H:%M:%S')}")
     
     try:
-        automation = PoemAutomation(COHERE_API_KEY, REPO_PATH)
-        folder_path = automation.get_or_create_daily_folder()
-        existing_poems = count_existing_poems(folder_path)
+        planned = poems_planned(now)
+        if planned <= 0:
+            print("No poems planned for today.")
+            return False
+        
+        existing_poems = count_existing_poems(folder_for_date(REPO_PATH, now))
         
         print(f"Found {existing_poems} existing poems for today")
         print(f"Current hour (local): {now.hour}")
         print(f"Current hour (UTC): {datetime.datetime.utcnow().hour}")
         
-        # If we have all 8 poems, don't generate more
-        if existing_poems >= TOTAL_POEMS:
-            print(f"Already have {TOTAL_POEMS} poems for today. No more poems needed.")
+        # If we have all of today's poems, don't generate more
+        if existing_poems >= planned:
+            print(f"Already have {planned} poems for today. No more poems needed.")
             return False
         
         # Always generate if we have started (have some poems)
@@ -74,25 +96,36 @@ def count_existing_poems(folder_path):
     if not folder_path.exists():
         print(f"Folder does not exist: {folder_path}")
         return 0
-    poems = list(folder_path.glob("[0-9][0-9]_RB_*.md"))
-    print(f"Found poems: {[p.name for p in poems]}")
+    index = PoemIndex(REPO_PATH)
+    try:
+        # One directory listing picks up poems the index hasn't seen yet
+        index.sync_folder(folder_path)
+        poems = index.poems_for_date(date_from_folder(folder_path))
+    finally:
+        index.close()
+    print(f"Found poems: {[Path(p['path']).name for p in poems]}")
     return len(poems)
 
-def calculate_next_poem_time(current_poems):
+def calculate_next_poem_time(current_poems, now=None):
     """Calculate when the next poem should be generated"""
-    base_time = datetime.datetime.now().replace(hour=8, minute=0, second=0, microsecond=0)
-    if current_poems == 0 and datetime.datetime.now().hour < 8:
+    now = now or datetime.datetime.now()
+    base_time = now.replace(hour=8, minute=0, second=0, microsecond=0)
+    if current_poems == 0 and now.hour < 8:
         # If no poems and before 8 AM, start at 8 AM today
         return base_time
     elif current_poems == 0:
         # If no poems and after 8 AM, start immediately
-        return datetime.datetime.now()
+        return now
     else:
         # Calculate next time based on current poem count
         return base_time + datetime.timedelta(minutes=current_poems * POEM_INTERVAL)
 
-def run_daily_automation():
-    """Run the daily automation process"""
+def run_daily_automation(clock=None):
+    """Run the daily automation process
+
+    Poems are written at POEM_INTERVAL minute slots by a PoemScheduler; the
+    plan is saved, so a restarted run picks up at the next unfinished slot.
+    """
     print(f"\nStarting daily automation at {datetime.datetime.now()}")
     print_debug_info()
     
@@ -101,7 +134,11 @@ def run_daily_automation():
         return
     
     try:
-        automation = PoemAutomation(COHERE_API_KEY, REPO_PATH)
+        from poem_automation import PoemAutomation
+        from scheduler import PoemScheduler
+        
+        automation = PoemAutomation.from_config(clock=clock)
+        scheduler = PoemScheduler(automation, clock=clock, retry_delay=RETRY_DELAY)
         folder_path = automation.get_or_create_daily_folder()
         existing_poems = count_existing_poems(folder_path)
         
@@ -109,55 +146,100 @@ def run_daily_automation():
         print(f"Folder: {folder_path}")
         print(f"Existing poems: {existing_poems}")
         
-        next_poem_time = calculate_next_poem_time(existing_poems)
+        next_poem_time = calculate_next_poem_time(existing_poems, scheduler.clock.now())
         print(f"Next poem scheduled for: {next_poem_time}")
         
-        # Generate remaining poems
-        for poem_number in range(existing_poems + 1, TOTAL_POEMS + 1):
-            try:
-                # Wait until scheduled time
-                wait_time = (next_poem_time - datetime.datetime.now()).total_seconds()
-                if wait_time > 0:
-                    print(f"\nWaiting {wait_time/60:.1f} minutes until {next_poem_time}")
-                    time.sleep(wait_time)
-                
-                print(f"\nGenerating poem {poem_number}/{TOTAL_POEMS}")
-                file_path = automation.create_poem_file(folder_path, poem_number)
-                
-                if file_path and file_path.exists():
-                    print(f"Created poem at: {file_path}")
-                    automation.git_commit_and_push(file_path)
-                    
-                    # Calculate next poem time
-                    next_poem_time = datetime.datetime.now() + datetime.timedelta(minutes=POEM_INTERVAL)
-                    print(f"Next poem scheduled for: {next_poem_time}")
-                else:
-                    print("Failed to create poem file!")
-                
-            except Exception as e:
-                print(f"Error generating poem {poem_number}: {str(e)}")
-                print(traceback.format_exc())
-                time.sleep(RETRY_DELAY)
-                continue
+        plan = scheduler.run_day(folder_path, poems_planned(date_from_folder(folder_path)),
+                                 datetime.timedelta(minutes=POEM_INTERVAL),
+                                 first_due=next_poem_time, batch_push=BATCH_PUSH)
         
-        print(f"\nCompleted daily automation at {datetime.datetime.now()}")
+        failed = [slot["number"] for slot in plan.slots if slot["status"] == "failed"]
+        if failed:
+            print(f"Failed to create poems: {failed}")
+        print(f"\nCompleted daily automation at {scheduler.clock.now()}")
         
     except Exception as e:
         print(f"Error in daily automation: {str(e)}")
         print(traceback.format_exc())
         raise
 
+# What each path imports, measured in a fresh interpreter
+IMPORT_PATHS = {
+    "should-run check": "import daily_automation",
+    "generation": "import daily_automation, poem_automation, scheduler, git; from cohere import Client",
+}
+
+def _import_times(statement):
+    """[(cumulative microseconds, module, top level?)] of a statement in a cold interpreter"""
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', statement],
+        cwd=REPO_PATH, capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1])
+    modules = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, module = line[len('import time:'):].split('|')
+        # Top-level imports aren't indented; their times add up to the total
+        modules.append((int(cumulative), module.rstrip(), not module[1:].startswith(' ')))
+    return modules
+
+def measure_import_times(top=8):
+    """Print how long each path takes to import, with its slowest modules.
+
+    Uses python -X importtime, so every path starts from a cold interpreter;
+    what the interpreter imports on startup is left out.
+    """
+    startup = {module for _, module, _ in _import_times('pass')}
+    for name, statement in IMPORT_PATHS.items():
+        try:
+            modules = [entry for entry in _import_times(statement) if entry[1] not in startup]
+        except RuntimeError as e:
+            print(f"{name}: import failed: {str(e)}")
+            continue
+        total = sum(cumulative for cumulative, _, top_level in modules if top_level)
+        print(f"\n{name}: {total / 1000:.1f} ms ({statement})")
+        for cumulative, module, _ in sorted(modules, reverse=True)[:top]:
+            print(f"  {cumulative / 1000:8.1f} ms {module}")
+
+def main():
+    parser = argparse.ArgumentParser(description='Write the day\'s poems at their scheduled slots')
+    parser.add_argument('--check', action='store_true',
+                        help='Only report whether poems are due (exit status 1 when not)')
+    parser.add_argument('--import-time', action='store_true',
+                        help='Measure the import time of the check and generation paths')
+    parser.add_argument('--profile', action='store_true',
+                        help='Run under cProfile and tracemalloc; reports go to logs/')
+    parser.add_argument('--profile-top', type=int, default=20,
+                        help='Entries per list in the profile summary (default: 20)')
+    args = parser.parse_args()
+
+    if args.import_time:
+        measure_import_times()
+        return 0
+    if args.check:
+        return 0 if should_generate_poems() else 1
+
+    print(f"\n{'='*50}")
+    print(f"Daily Poem Automation")
+    print(f"Start time: {datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+    print(f"{'='*50}")
+    
+    if args.profile:
+        from run_profiler import RunProfiler
+        with RunProfiler(REPO_PATH, "daily_automation", top=args.profile_top):
+            run_daily_automation()
+        return 0
+    run_daily_automation()
+    return 0
+
 if __name__ == "__main__":
     try:
-        print(f"\n{'='*50}")
-        print(f"Daily Poem Automation")
-        print(f"Start time: {datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
-        print(f"{'='*50}")
-        
-        run_daily_automation()
-        
+        status = main()
     except Exception as e:
         print(f"Fatal error: {str(e)}")
         print(traceback.format_exc())
         sys.exit(1)
-    sys.exit(0)
\ No newline at end of file
+    sys.exit(status)
@@ -0,0 +1,243 @@
+#!/usr/bin/env python3
+import argparse
+import json
+import random
+import threading
+import time
+import urllib.error
+import urllib.request
+import uuid
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+WORDS = (
+    "moon crypto monkey zen penguin empire pixel quest jungle dragon wealth vibe "
+    "galaxy hustle lotus rocket golden level boss matrix tiger ocean neon lantern "
+    "shogun dream legend chaos wisdom glitch sunrise velvet throne emerald comet "
+    "samurai temple storm orbit phoenix banana market stack karma spirit"
+).split()
+EMOJIS = ["🚀", "🐒", "🐧", "🌙", "💰", "🎮", "🍵", "🐲", "✨", "🏛️"]
+
+def parse_latency(spec):
+    """Turn a latency spec into a function returning seconds.
+
+    Supported specs: fixed:S, uniform:LOW,HIGH, exp:MEAN, lognormal:MU,SIGMA
+    """
+    kind, _, args = spec.partition(":")
+    values = [float(v) for v in args.split(",")] if args else []
+    if kind == "fixed":
+        return lambda rng: values[0]
+    if kind == "uniform":
+        return lambda rng: rng.uniform(values[0], values[1])
+    if kind == "exp":
+        return lambda rng: rng.expovariate(1 / values[0])
+    if kind == "lognormal":
+        return lambda rng: rng.lognormvariate(values[0], values[1])
+    raise ValueError(f"Unknown latency spec: {spec}")
+
+def request_kind(payload):
+    """Classify a chat request the way PoemAutomation issues them"""
+    if payload.get("response_format"):
+        return "structured"
+    if payload.get("max_tokens") == 60:
+        return "one_liner"
+    return "poem"
+
+class FakeCohereServer:
+    """Local stand-in for the Cohere v1 chat endpoint.
+
+    Generates plausible poems, structured poems and one-liners with a
+    configurable latency distribution, error rate and malformed-output rate.
+    It can also proxy to the real API while recording responses to a JSONL
+    file, or replay such a recording.
+    """
+
+    def __init__(self, host="127.0.0.1", port=0, latency="fixed:0", error_rate=0.0,
+                 rate_limit_rate=0.0, malformed_rate=0.0, seed=None, record_path=None,
+                 replay_path=None, upstream="https://api.cohere.com"):
+        self.latency = parse_latency(latency)
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.malformed_rate = malformed_rate
+        self.rng = random.Random(seed)
+        self.record_path = record_path
+        self.upstream = upstream.rstrip("/")
+        self.stats = Counter()
+        self._lock = threading.Lock()
+        self._replay = {}
+        if replay_path:
+            with open(replay_path, "r", encoding="utf-8") as f:
+                for line in f:
+                    entry = json.loads(line)
+                    self._replay.setdefault(entry["kind"], []).append(entry["response"])
+        self._replay_positions = Counter()
+
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                server._handle(self)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer((host, port), Handler)
+        self.httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self.httpd.serve_forever, name="FakeCohere", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def _random(self):
+        with self._lock:
+            return self.rng.random()
+
+    def _line(self):
+        with self._lock:
+            words = self.rng.sample(WORDS, 6)
+            emoji = f" {self.rng.choice(EMOJIS)}" if self.rng.random() < 0.3 else ""
+        return " ".join(words).capitalize() + emoji
+
+    def _title(self):
+        with self._lock:
+            return " ".join(w.capitalize() for w in self.rng.sample(WORDS, 3))
+
+    def _generate(self, kind, malformed):
+        """Synthetic response text for a request kind"""
+        line_count = 6 if malformed else 8
+        if kind == "one_liner":
+            return "no cap this poem is bussin fr ✨"
+        if kind == "structured":
+            if malformed:
+                return '{"title": "' + self._title() + '", "lines": ['
+            return json.dumps({
+                "title": self._title(),
+                "lines": [self._line() for _ in range(line_count)],
+                "one_liner": "main character energy loading 🚀"
+            }, ensure_ascii=False)
+        return f"Title: {self._title()}\n\n" + "\n".join(self._line() for _ in range(line_count))
+
+    def _replayed(self, kind):
+        responses = self._replay.get(kind)
+        if not responses:
+            return None
+        with self._lock:
+            position = self._replay_positions[kind]
+            self._replay_positions[kind] += 1
+        return responses[position % len(responses)]
+
+    def _proxy(self, handler, body):
+        """Forward a request to the real API, returning (status, response dict)"""
+        request = urllib.request.Request(
+            f"{self.upstream}{handler.path}",
+            data=body,
+            headers={
+                "Authorization": handler.headers.get("Authorization", ""),
+                "Content-Type": "application/json"
+            },
+            method="POST"
+        )
+        try:
+            with urllib.request.urlopen(request, timeout=120) as response:
+                return response.status, json.loads(response.read())
+        except urllib.error.HTTPError as e:
+            return e.code, {"message": e.read().decode("utf-8", errors="replace")}
+
+    def _send(self, handler, status, payload, headers=None):
+        body = json.dumps(payload).encode("utf-8")
+        handler.send_response(status)
+        handler.send_header("Content-Type", "application/json")
+        handler.send_header("Content-Length", str(len(body)))
+        for key, value in (headers or {}).items():
+            handler.send_header(key, value)
+        handler.end_headers()
+        handler.wfile.write(body)
+
+    def _handle(self, handler):
+        body = handler.rfile.read(int(handler.headers.get("Content-Length", 0)))
+        try:
+            payload = json.loads(body or b"{}")
+        except ValueError:
+            payload = {}
+        kind = request_kind(payload)
+        with self._lock:
+            self.stats[f"requests_{kind}"] += 1
+            delay = self.latency(self.rng)
+        time.sleep(max(0.0, delay))
+
+        if self._random() < self.rate_limit_rate:
+            with self._lock:
+                self.stats["injected_429"] += 1
+            self._send(handler, 429, {"message": "Too many requests (simulated)"}, {"Retry-After": "1"})
+            return
+        if self._random() < self.error_rate:
+            with self._lock:
+                self.stats["injected_500"] += 1
+            self._send(handler, 500, {"message": "Internal server error (simulated)"})
+            return
+
+        if self.record_path:
+            status, response = self._proxy(handler, body)
+            if status == 200:
+                with self._lock:
+                    with open(self.record_path, "a", encoding="utf-8") as f:
+                        f.write(json.dumps({"kind": kind, "request": payload, "response": response},
+                                           ensure_ascii=False) + "\n")
+            self._send(handler, status, response)
+            return
+
+        response = self._replayed(kind)
+        if response is None:
+            malformed = self._random() < self.malformed_rate
+            if malformed:
+                with self._lock:
+                    self.stats["injected_malformed"] += 1
+            response = {
+                "text": self._generate(kind, malformed),
+                "generation_id": str(uuid.uuid4()),
+                "finish_reason": "COMPLETE",
+                "chat_history": []
+            }
+        self._send(handler, 200, response)
+
+def main():
+    parser = argparse.ArgumentParser(description='Run a local fake Cohere chat endpoint')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8088)
+    parser.add_argument('--latency', default='lognormal:-0.7,0.5',
+                      help='fixed:S, uniform:LOW,HIGH, exp:MEAN or lognormal:MU,SIGMA (seconds)')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='Fraction of requests answered with 500')
+    parser.add_argument('--rate-limit-rate', type=float, default=0.0, help='Fraction of requests answered with 429')
+    parser.add_argument('--malformed-rate', type=float, default=0.0, help='Fraction of poems with the wrong shape')
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--record', help='Proxy to the real API and append responses to this JSONL file')
+    parser.add_argument('--replay', help='Serve responses recorded with --record')
+    parser.add_argument('--upstream', default='https://api.cohere.com', help='Real API base URL for --record')
+    args = parser.parse_args()
+
+    server = FakeCohereServer(
+        host=args.host, port=args.port, latency=args.latency, error_rate=args.error_rate,
+        rate_limit_rate=args.rate_limit_rate, malformed_rate=args.malformed_rate, seed=args.seed,
+        record_path=args.record, replay_path=args.replay, upstream=args.upstream
+    )
+    print(f"Fake Cohere listening on {server.base_url} (set COHERE_BASE_URL to use it)")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        print(f"Stats: {dict(server.stats)}")
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,18 @@
 #!/usr/bin/env python3
+import argparse
 import os
 from pathlib import Path
-from git_art_generator import GitArtGenerator
+from git_art_generator import GitArtGenerator, DEFAULT_BANNER
 
 def main():
+    parser = argparse.ArgumentParser(description='Generate commit_pattern.json from a banner')
+    parser.add_argument('--banner', default=DEFAULT_BANNER, help=f'Banner text (default: {DEFAULT_BANNER})')
+    parser.add_argument('--years', type=int, nargs='+', default=None,
+                      help='Years to generate (default: the current year)')
+    parser.add_argument('--minimal', action='store_true',
+                      help='Use the fewest commits per day that give the same graph shading')
+    args = parser.parse_args()
+    
     # Get the repository path (current directory)
     repo_path = Path(os.getcwd())
     
@@ -11,11 +20,11 @@ def main():
     print(f"Repository path: {repo_path}")
     
     # Create and run the pattern generator
-    generator = GitArtGenerator(repo_path)
+    generator = GitArtGenerator(repo_path, banner=args.banner)
     
     try:
         # Generate and save the commit pattern
-        output_file = generator.save_commit_map()
+        output_file = generator.save_commit_map(years=args.years, minimal=args.minimal)
         
         print("\nPattern generation completed successfully!")
         print(f"Pattern saved to: {output_file}")
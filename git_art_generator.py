@@ -2,87 +2,30 @@ import os
 import datetime
 import json
 from pathlib import Path
-import logging
-from logging.handlers import RotatingFileHandler
+import subprocess
+import time
+
+import numpy as np
+
+from bitmap_font import GLYPH_HEIGHT, render_text, text_width, unsupported_characters
+from contribution_history import load_history
+from git_backfill import FastImportBackfill
+from pattern_planner import MAX_LEVEL, commit_history, github_levels, levels_from_commit_map, plan_commit_map
+from resources import REGISTRY
+
+# "GIGACHAD :D" is 65 columns wide in the 5x7 font and no longer fits a year
+DEFAULT_BANNER = "GIGACHAD"
+
+# Preview cell for each contribution graph shade level (0-4)
+SHADES = ["·  ", "░  ", "▒  ", "▓  ", "█  "]
 
 class GitArtGenerator:
-    def __init__(self, repo_path):
+    def __init__(self, repo_path, banner=DEFAULT_BANNER):
         self.repo_path = Path(repo_path)
         self._setup_logging()
         
-        # Define the pixel art for "GIGACHAD :D"
-        self.art_pattern = {
-            "G": [
-                "11111",
-                "1....",
-                "1.111",
-                "1..1.",
-                "11111"
-            ],
-            "I": [
-                "11111",
-                "..1..",
-                "..1..",
-                "..1..",
-                "11111"
-            ],
-            "G": [
-                "11111",
-                "1....",
-                "1.111",
-                "1..1.",
-                "11111"
-            ],
-            "A": [
-                "11111",
-                "1...1",
-                "11111",
-                "1...1",
-                "1...1"
-            ],
-            "C": [
-                "11111",
-                "1....",
-                "1....",
-                "1....",
-                "11111"
-            ],
-            "H": [
-                "1...1",
-                "1...1",
-                "11111",
-                "1...1",
-                "1...1"
-            ],
-            "A": [
-                "11111",
-                "1...1",
-                "11111",
-                "1...1",
-                "1...1"
-            ],
-            "D": [
-                "1111.",
-                "1...1",
-                "1...1",
-                "1...1",
-                "1111."
-            ],
-            ":": [
-                ".....",
-                "..1..",
-                ".....",
-                "..1..",
-                "....."
-            ],
-            "D": [
-                "1111.",
-                "1...1",
-                "1...1",
-                "1...1",
-                "1111."
-            ]
-        }
+        # Banner rendered into the contribution graph with the 5x7 bitmap font
+        self.banner = banner
         
         # Commit counts for pattern
         self.commit_counts = {
@@ -92,84 +35,98 @@ class GitArtGenerator:
     
     def _setup_logging(self):
         """Configure logging"""
-        logs_dir = self.repo_path / "logs"
-        logs_dir.mkdir(exist_ok=True)
-        
-        log_file = logs_dir / f"git_art_{datetime.datetime.now().strftime('%Y-%m-%d')}.log"
-        
-        self.logger = logging.getLogger('GitArtGenerator')
-        self.logger.setLevel(logging.INFO)
-        
-        file_handler = RotatingFileHandler(
-            log_file,
-            maxBytes=10*1024*1024,
-            backupCount=5,
-            encoding='utf-8'
-        )
-        file_handler.setLevel(logging.INFO)
-        file_handler.setFormatter(logging.Formatter('%(asctime)s - %(levelname)s - %(message)s'))
-        
-        console_handler = logging.StreamHandler()
-        console_handler.setLevel(logging.INFO)
-        console_handler.setFormatter(logging.Formatter('%(message)s'))
-        
-        self.logger.addHandler(file_handler)
-        self.logger.addHandler(console_handler)
+        self.logger = REGISTRY.logger(self.repo_path, name='GitArtGenerator', prefix='git_art', error_log=False)
     
-    def calculate_start_date(self):
+    def calculate_start_date(self, year=None):
         """Calculate the start date to begin the art pattern"""
-        current_year = datetime.datetime.now().year
-        start_date = datetime.datetime(current_year, 1, 1)
+        start_date = datetime.datetime(year or datetime.datetime.now().year, 1, 1)
         while start_date.weekday() != 6:  # 6 represents Sunday
             start_date += datetime.timedelta(days=1)
         return start_date
     
-    def generate_commit_map(self):
-        """Generate a map of dates to commit counts for the entire year"""
-        start_date = self.calculate_start_date()
+    def year_weeks(self, year=None):
+        """Number of graph columns from the first Sunday to the end of the year"""
+        start_date = self.calculate_start_date(year)
+        days = (datetime.datetime(start_date.year + 1, 1, 1) - start_date).days
+        return -(-days // 7)
+    
+    def validate_banner(self, banner=None, years=None):
+        """List the problems that keep a banner from rendering in the given years"""
+        banner = self.banner if banner is None else banner
+        problems = []
+        missing = unsupported_characters(banner)
+        if missing:
+            problems.append(f"No glyph for: {''.join(missing)}")
+        width = text_width(banner)
+        for year in years or [datetime.datetime.now().year]:
+            weeks = self.year_weeks(year)
+            if width > weeks:
+                problems.append(f"{year}: banner is {width} weeks wide but the year has {weeks}")
+        return problems
+    
+    def build_grid(self, year=None, banner=None):
+        """Commit counts for a year as a 7 x weeks array (rows Sunday..Saturday)"""
+        banner = self.banner if banner is None else banner
+        weeks = self.year_weeks(year)
+        grid = np.full((GLYPH_HEIGHT, weeks), self.commit_counts["normal_day"], dtype=np.uint16)
+        
+        # Center the banner, clipping whatever doesn't fit
+        mask = render_text(banner)[:, :weeks]
+        offset = (weeks - mask.shape[1]) // 2
+        grid[:, offset:offset + mask.shape[1]][mask] = self.commit_counts["pattern_day"]
+        return grid
+    
+    def grid_dates(self, start_date, weeks):
+        """datetime64[D] date of every cell of a 7 x weeks grid starting at start_date"""
+        start = np.datetime64(start_date.strftime('%Y-%m-%d'), 'D')
+        return start + np.arange(GLYPH_HEIGHT)[:, None] + 7 * np.arange(weeks)[None, :]
+    
+    def grid_to_commit_map(self, grid, start_date, end_date=None):
+        """Convert a grid into the {YYYY-MM-DD: count} map, dropping cells from end_date on"""
+        end_date = end_date or datetime.datetime(start_date.year + 1, 1, 1)
+        # Transposing walks the grid week by week, i.e. in date order
+        dates = self.grid_dates(start_date, grid.shape[1]).T.ravel()
+        counts = grid.T.ravel()
+        keep = dates < np.datetime64(end_date.strftime('%Y-%m-%d'), 'D')
+        return dict(zip(np.datetime_as_string(dates[keep]).tolist(), counts[keep].tolist()))
+    
+    def commit_map_to_grid(self, commit_map, start_date, weeks):
+        """Convert a {YYYY-MM-DD: count} map back into a 7 x weeks grid (missing days are 0)"""
+        dates = np.datetime_as_string(self.grid_dates(start_date, weeks).T.ravel()).tolist()
+        counts = np.array([commit_map.get(date, 0) for date in dates], dtype=np.uint16)
+        return counts.reshape(weeks, GLYPH_HEIGHT).T
+    
+    def generate_commit_map(self, years=None):
+        """Generate a map of dates to commit counts for the given years (default: this year)"""
         commit_map = {}
-        
-        # Initialize all days with normal commit count
-        current_date = start_date
-        end_date = datetime.datetime(start_date.year + 1, 1, 1)
-        
-        while current_date < end_date:
-            commit_map[current_date.strftime('%Y-%m-%d')] = self.commit_counts["normal_day"]
-            current_date += datetime.timedelta(days=1)
-        
-        # Define letter positions (weeks)
-        letter_positions = {
-            "G": (1, 7),      # January
-            "I": (8, 14),     # February-March
-            "G": (15, 21),    # March-April
-            "A": (22, 28),    # May-June
-            "C": (29, 35),    # June-July
-            "H": (36, 42),    # August-September
-            "A": (43, 46),    # September-October
-            "D": (47, 49),    # November
-            ":": (50, 50),    # December
-            "D": (51, 52)     # December
-        }
-        
-        # Process each letter
-        for char, (start_week, end_week) in letter_positions.items():
-            pattern = self.art_pattern.get(char)
-            if not pattern:
-                continue
-            
-            # For each week this letter spans
-            for week in range(start_week, end_week + 1):
-                # Apply the pattern vertically
-                for day, row in enumerate(pattern):
-                    if row[0] == "1":  # Only check first column for horizontal pattern
-                        commit_date = start_date + datetime.timedelta(weeks=week-1, days=day)
-                        commit_map[commit_date.strftime('%Y-%m-%d')] = self.commit_counts["pattern_day"]
-        
+        for year in years or [datetime.datetime.now().year]:
+            commit_map.update(self.grid_to_commit_map(self.build_grid(year), self.calculate_start_date(year)))
         return commit_map
     
-    def save_commit_map(self):
-        """Save the commit map to a JSON file"""
-        commit_map = self.generate_commit_map()
+    def plan_minimal_map(self, commit_map, history=None):
+        """Fewest commits per day that keep the graph shading of commit_map
+        
+        history defaults to the per-day commit counts already in the repo.
+        """
+        if history is None:
+            history = commit_history(self.repo_path, since=min(commit_map)) if commit_map else {}
+        planned, mismatched = plan_commit_map(levels_from_commit_map(commit_map), history)
+        self.logger.info(f"Minimal plan: {sum(commit_map.values())} -> {sum(planned.values())} commits")
+        if mismatched:
+            self.logger.warning(f"{len(mismatched)} days can't reach their shade, e.g. {', '.join(mismatched[:5])}")
+        return planned
+    
+    def save_commit_map(self, years=None, minimal=False):
+        """Save the commit map to a JSON file
+        
+        With minimal, the 8/17 commit counts are replaced by the fewest
+        commits per day that produce the same contribution graph shading.
+        """
+        for problem in self.validate_banner(years=years):
+            self.logger.warning(f"Banner problem: {problem}")
+        commit_map = self.generate_commit_map(years)
+        if minimal:
+            commit_map = self.plan_minimal_map(commit_map)
         
         # Save to a JSON file
         output_file = self.repo_path / "commit_pattern.json"
@@ -177,75 +134,116 @@ class GitArtGenerator:
             json.dump(commit_map, f, indent=2)
         
         self.logger.info(f"Commit pattern saved to {output_file}")
-        self.logger.info(f"Total days with pattern commits: {sum(1 for v in commit_map.values() if v == self.commit_counts['pattern_day'])}")
+        levels = github_levels(list(commit_map.values()))
+        self.logger.info(f"Total days with pattern commits: {int((levels == levels.max(initial=0)).sum()) if levels.any() else 0}")
         
-        # Print pattern preview
-        self.print_pattern_preview(commit_map)
+        # Print pattern preview, next to what the repository actually has
+        actual = load_history(self.repo_path).daily
+        for year in years or [datetime.datetime.now().year]:
+            self.print_pattern_preview(commit_map, year, actual=actual)
         
         return output_file
     
-    def print_pattern_preview(self, commit_map):
-        """Print an ASCII preview of the pattern that matches GitHub's contribution graph"""
+    def print_pattern_preview(self, commit_map, year=None, actual=None):
+        """Print an ASCII preview of the pattern that matches GitHub's contribution graph
+        
+        With `actual` ({YYYY-MM-DD: commits} from contribution_history), the
+        real graph is printed below the target and past days that are
+        shaded lighter than planned are counted.
+        """
         self.logger.info("\nGitHub Contribution Calendar Preview")
         self.logger.info("=" * 120)
-        self.logger.info("Legend:")
-        self.logger.info(f"█ = Pattern day ({self.commit_counts['pattern_day']} commits)")
-        self.logger.info(f"░ = Normal day ({self.commit_counts['normal_day']} commits)")
-        self.logger.info("· = Empty day (0 commits)")
+        self.logger.info("Legend (shade levels, from the quartiles of the daily counts):")
+        self.logger.info(" ".join(f"{shade.strip()} = level {level}" for level, shade in enumerate(SHADES)))
         
-        start_date = self.calculate_start_date()
+        start_date = self.calculate_start_date(year)
+        weeks = self.year_weeks(year)
+        grid = self.commit_map_to_grid(commit_map, start_date, weeks)
+        dates = self.grid_dates(start_date, weeks)
         
         # Print month indicators
-        current_date = start_date
         month_labels = []
         current_month = ""
-        
-        for week in range(53):  # 53 weeks to ensure full year coverage
-            month = current_date.strftime("%b")
-            if month != current_month:
-                month_labels.append(f"{month:^12}")
-                current_month = month
-            else:
-                month_labels.append(" " * 12)
-            current_date += datetime.timedelta(weeks=1)
+        for week_start in dates[0].tolist():
+            month = week_start.strftime("%b")
+            month_labels.append(f"{month:<3}" if month != current_month else "   ")
+            current_month = month
         
         # Print months row
         self.logger.info("\nMonths:")
-        month_row = "    " + "".join(month_labels)
-        self.logger.info(month_row)
+        self.logger.info("    " + "".join(month_labels))
         
         # Print day names and grid
+        levels = github_levels(grid)
+        cells = np.array(SHADES, dtype=object)[levels]
+        cells[dates > np.datetime64(datetime.date.today())] = "·  "  # Future date
         days = ["Sun", "Mon", "Tue", "Wed", "Thu", "Fri", "Sat"]
-        for day_idx, day_name in enumerate(days):
-            row = f"{day_name:<4}"
-            
-            # For each week
-            for week in range(53):
-                current_date = start_date + datetime.timedelta(weeks=week, days=day_idx)
-                date_str = current_date.strftime('%Y-%m-%d')
-                
-                if current_date > datetime.datetime.now():
-                    row += "·  "  # Future date
-                elif commit_map.get(date_str, 0) == self.commit_counts["pattern_day"]:
-                    row += "█  "  # Pattern day
-                else:
-                    row += "░  "  # Normal day
-            
-            self.logger.info(row)
+        for day_name, row in zip(days, cells):
+            self.logger.info(f"{day_name:<4}" + "".join(row))
+        
+        if actual is not None:
+            actual_grid = self.commit_map_to_grid(actual, start_date, weeks)
+            actual_levels = github_levels(actual_grid)
+            actual_cells = np.array(SHADES, dtype=object)[actual_levels]
+            self.logger.info("\nActual:")
+            for day_name, row in zip(days, actual_cells):
+                self.logger.info(f"{day_name:<4}" + "".join(row))
+            past = dates <= np.datetime64(datetime.date.today())
+            behind = past & (actual_levels < levels)
+            self.logger.info(f"Past days below their target shade: {int(behind.sum())} of {int((past & (levels > 0)).sum())}")
+            self.logger.info(f"Commits so far: {int(actual_grid[past].sum())} of {int(grid[past].sum())} planned")
         
         # Print statistics
-        total_pattern_days = sum(1 for v in commit_map.values() if v == self.commit_counts["pattern_day"])
-        total_normal_days = 365 - total_pattern_days
-        total_pattern_commits = total_pattern_days * self.commit_counts["pattern_day"]
-        total_normal_commits = total_normal_days * self.commit_counts["normal_day"]
-        
         self.logger.info("\nPattern Statistics:")
         self.logger.info("-" * 50)
-        self.logger.info(f"Pattern days: {total_pattern_days:>3} days × {self.commit_counts['pattern_day']:>2} commits = {total_pattern_commits:>4} commits")
-        self.logger.info(f"Normal days:  {total_normal_days:>3} days × {self.commit_counts['normal_day']:>2} commits = {total_normal_commits:>4} commits")
+        for level in range(1, MAX_LEVEL + 1):
+            level_days = levels == level
+            if level_days.any():
+                self.logger.info(f"Level {level} {SHADES[level].strip()}: {int(level_days.sum()):>3} days, "
+                               f"{int(grid[level_days].sum()):>4} commits")
         self.logger.info("-" * 50)
-        self.logger.info(f"Total commits for the year: {total_pattern_commits + total_normal_commits}")
+        self.logger.info(f"Total commits for the year: {int(grid.sum())}")
         
         self.logger.info("\nNote: Pattern starts from the first Sunday of the year ({})".format(
             start_date.strftime("%Y-%m-%d")
-        )) 
\ No newline at end of file
+        ))
+    
+    def load_commit_map(self):
+        """Read commit_pattern.json, generating the map if it doesn't exist yet"""
+        pattern_file = self.repo_path / "commit_pattern.json"
+        if pattern_file.exists():
+            with open(pattern_file, 'r') as f:
+                return json.load(f)
+        return self.generate_commit_map()
+    
+    def create_art_commits(self, dry_run=False, until=None):
+        """Write the backdated art commits for every pattern day up to `until` (default today)
+        
+        All commits are streamed through a single git fast-import run; days
+        that already have art commits are skipped. Returns the backfill summary.
+        """
+        backfill = FastImportBackfill(self.repo_path)
+        summary = backfill.run(self.load_commit_map(), until=until, dry_run=dry_run)
+        
+        if dry_run:
+            self.logger.info("\nDry run, commits per day:")
+            for date, count in summary["days"].items():
+                self.logger.info(f"{date}: {count:>3} commits")
+        self.logger.info(f"\nDays: {len(summary['days'])}, commits: {summary['commits']}")
+        if not dry_run and summary["commits"]:
+            self.logger.info(f"Wrote {summary['commits']} art commits in {summary['seconds']:.2f}s")
+        return summary
+    
+    def push_changes(self, max_retries=8, retry_delay=8):
+        """Push the current branch to origin, retrying on failure"""
+        for attempt in range(max_retries):
+            try:
+                subprocess.run(['git', 'push', 'origin', 'HEAD'], cwd=self.repo_path,
+                               capture_output=True, text=True, check=True)
+                self.logger.info("Pushed art commits")
+                return
+            except subprocess.CalledProcessError as e:
+                self.logger.warning(f"Push attempt {attempt + 1} failed: {e.stderr.strip()}")
+                if attempt < max_retries - 1:
+                    time.sleep(retry_delay)
+        raise RuntimeError(f"Failed to push art commits after {max_retries} attempts")
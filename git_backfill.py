@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+import argparse
+import calendar
+import datetime
+import json
+import os
+import re
+import subprocess
+import time
+from pathlib import Path
+
+ART_MESSAGE = "Art commit {index}/{count} on {date} {time} UTC"
+ART_MESSAGE_PATTERN = re.compile(r"^Art commit \d+/\d+ on (\d{4}-\d{2}-\d{2})")
+
+class FastImportBackfill:
+    """Write backdated commits for a date -> count map with a single git fast-import run.
+
+    Every commit but the last is empty (it reuses its parent's tree); the last
+    one appends one line per commit to the art log file, so the working tree
+    only changes once. Days that already have art commits are skipped, which
+    makes re-running a backfill safe.
+    """
+
+    def __init__(self, repo_path, branch=None, log_file="git_art.txt", hour=12):
+        self.repo_path = Path(repo_path)
+        self.branch = branch or self._git('rev-parse', '--abbrev-ref', 'HEAD')
+        self.log_file = log_file
+        # Midday UTC keeps the commit on the same calendar day in every timezone
+        self.hour = hour
+
+    def _git(self, *args, input=None):
+        result = subprocess.run(
+            ['git', *args], cwd=self.repo_path, input=input,
+            capture_output=True, check=True
+        )
+        return result.stdout.decode('utf-8', errors='replace').strip()
+
+    def _identity(self):
+        name = self._git('config', 'user.name')
+        email = self._git('config', 'user.email')
+        return f"{name} <{email}>"
+
+    def existing_art_days(self):
+        """Dates that already have art commits on the branch (one git log pass)"""
+        try:
+            output = self._git('log', self.branch, '--format=%s', '--grep=^Art commit ')
+        except subprocess.CalledProcessError:
+            return set()
+        return {match.group(1) for match in map(ART_MESSAGE_PATTERN.match, output.splitlines()) if match}
+
+    def plan(self, commit_map, until=None, skip_existing=True):
+        """Sorted [(date, count)] still to be written, up to and including `until`"""
+        until = (until or datetime.date.today()).isoformat()
+        existing = self.existing_art_days() if skip_existing else set()
+        return [
+            (date, count) for date, count in sorted(commit_map.items())
+            if count > 0 and date <= until and date not in existing
+        ]
+
+    def build_stream(self, plan, parent):
+        """The fast-import stream for a plan, on top of the `parent` commit"""
+        identity = self._identity().encode('utf-8')
+        ref = f"refs/heads/{self.branch}".encode('utf-8')
+        log_path = self.repo_path / self.log_file
+        log_lines = []
+        chunks = []
+        total = sum(count for _, count in plan)
+        written = 0
+
+        for date, count in plan:
+            day = datetime.datetime.strptime(date, '%Y-%m-%d').replace(hour=self.hour)
+            base_timestamp = calendar.timegm(day.timetuple())
+            for index in range(1, count + 1):
+                written += 1
+                # One second apart keeps the commits ordered within the day
+                timestamp = base_timestamp + index
+                written_at = datetime.datetime.fromtimestamp(timestamp, datetime.timezone.utc)
+                message = ART_MESSAGE.format(index=index, count=count, date=date,
+                                             time=written_at.strftime('%H:%M:%S'))
+                log_lines.append(message)
+                stamp = f"{timestamp} +0000".encode('ascii')
+                encoded = message.encode('utf-8')
+                chunks.append(b"commit " + ref + b"\n")
+                chunks.append(b"author " + identity + b" " + stamp + b"\n")
+                chunks.append(b"committer " + identity + b" " + stamp + b"\n")
+                chunks.append(b"data %d\n" % len(encoded) + encoded + b"\n")
+                if written == 1:
+                    chunks.append(b"from " + parent.encode('ascii') + b"\n")
+                if written == total:
+                    previous = log_path.read_bytes() if log_path.exists() else b""
+                    if previous and not previous.endswith(b"\n"):
+                        previous += b"\n"
+                    content = previous + ("\n".join(log_lines) + "\n").encode('utf-8')
+                    chunks.append(b"M 100644 inline " + self.log_file.encode('utf-8') + b"\n")
+                    chunks.append(b"data %d\n" % len(content) + content + b"\n")
+                chunks.append(b"\n")
+        chunks.append(b"done\n")
+        return b"".join(chunks)
+
+    def run(self, commit_map, until=None, dry_run=False):
+        """Backfill the commit map; returns {"days": {date: count}, "commits": N, "seconds": S}"""
+        plan = self.plan(commit_map, until)
+        summary = {
+            "days": dict(plan),
+            "commits": sum(count for _, count in plan),
+            "seconds": 0.0
+        }
+        if dry_run or not plan:
+            return summary
+
+        if self._git('status', '--porcelain', '--', self.log_file):
+            raise RuntimeError(f"{self.log_file} has uncommitted changes; commit or discard them first")
+
+        start = time.perf_counter()
+        parent = self._git('rev-parse', self.branch)
+        self._git('fast-import', '--quiet', '--done', input=self.build_stream(plan, parent))
+        # fast-import only moves the ref; bring the index and working tree along
+        if self._git('rev-parse', '--abbrev-ref', 'HEAD') == self.branch:
+            self._git('read-tree', '-m', '-u', parent, self.branch)
+        summary["seconds"] = time.perf_counter() - start
+        return summary
+
+def print_day_totals(summary):
+    """Per-day commit totals of a backfill summary"""
+    for date, count in summary["days"].items():
+        print(f"{date}: {count:>3} commits")
+    print(f"\nDays: {len(summary['days'])}, commits: {summary['commits']}")
+
+def main():
+    parser = argparse.ArgumentParser(description='Backfill backdated commits from a commit pattern with git fast-import')
+    parser.add_argument('--pattern', default=None, help='Commit pattern JSON (default: commit_pattern.json)')
+    parser.add_argument('--repo', default=os.getcwd(), help='Repository to write into (default: current directory)')
+    parser.add_argument('--until', type=datetime.date.fromisoformat, default=None,
+                      help='Last date to backfill, YYYY-MM-DD (default: today)')
+    parser.add_argument('--dry-run', action='store_true', help='Only report the commits per day')
+    args = parser.parse_args()
+
+    pattern_path = args.pattern or os.path.join(args.repo, "commit_pattern.json")
+    with open(pattern_path, 'r') as f:
+        commit_map = json.load(f)
+
+    summary = FastImportBackfill(args.repo).run(commit_map, until=args.until, dry_run=args.dry_run)
+    print_day_totals(summary)
+    if not args.dry_run:
+        print(f"Wrote {summary['commits']} commits in {summary['seconds']:.2f}s")
+
+if __name__ == "__main__":
+    main()
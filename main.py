@@ -1,9 +1,25 @@
+import argparse
 from poem_automation import PoemAutomation
-from config import COHERE_API_KEY, REPO_PATH
+from config import REPO_PATH, BATCH_PUSH
+
+def run():
+    automation = PoemAutomation.from_config()
+    automation.run_daily_automation(batch_push=BATCH_PUSH)
 
 def main():
-    automation = PoemAutomation(COHERE_API_KEY, REPO_PATH)
-    automation.run_daily_automation()
+    parser = argparse.ArgumentParser(description='Run the daily poem automation')
+    parser.add_argument('--profile', action='store_true',
+                      help='Run under cProfile and tracemalloc; reports go to logs/')
+    parser.add_argument('--profile-top', type=int, default=20,
+                      help='Entries per list in the profile summary (default: 20)')
+    args = parser.parse_args()
+
+    if args.profile:
+        from run_profiler import RunProfiler
+        with RunProfiler(REPO_PATH, "main", top=args.profile_top):
+            run()
+        return
+    run()
 
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    main()
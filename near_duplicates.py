@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+import argparse
+import hashlib
+import os
+import re
+import sqlite3
+from pathlib import Path
+
+import numpy as np
+
+NUM_PERMUTATIONS = 64
+BANDS = 16
+ROWS_PER_BAND = NUM_PERMUTATIONS // BANDS
+SHINGLE_SIZE = 3
+# Mersenne prime 2^31 - 1 keeps a * x + b within uint64 for 31-bit inputs
+MERSENNE_PRIME = (1 << 31) - 1
+
+WORD_PATTERN = re.compile(r"[a-z0-9']+")
+
+# Fixed seed so signatures stay comparable across runs and processes
+_rng = np.random.default_rng(888)
+PERM_A = _rng.integers(1, MERSENNE_PRIME, size=(NUM_PERMUTATIONS, 1), dtype=np.uint64)
+PERM_B = _rng.integers(0, MERSENNE_PRIME, size=(NUM_PERMUTATIONS, 1), dtype=np.uint64)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS minhash (
+    path TEXT PRIMARY KEY,
+    title_key TEXT,
+    signature BLOB NOT NULL
+);
+CREATE TABLE IF NOT EXISTS minhash_bands (
+    band_key INTEGER NOT NULL,
+    path TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_minhash_bands ON minhash_bands (band_key);
+CREATE INDEX IF NOT EXISTS idx_minhash_bands_path ON minhash_bands (path);
+CREATE INDEX IF NOT EXISTS idx_minhash_title ON minhash (title_key);
+"""
+
+def normalize_title(title):
+    """Lowercase a title and drop everything but words, e.g. for 'Title: Crypto Monkey Business!'"""
+    words = WORD_PATTERN.findall((title or "").lower())
+    if words and words[0] == "title":
+        words = words[1:]
+    return " ".join(words)
+
+def shingles(lines):
+    """Word n-gram shingles of each poem line, hashed to 31 bits"""
+    result = set()
+    for line in lines:
+        words = WORD_PATTERN.findall(line.lower())
+        if len(words) < SHINGLE_SIZE:
+            if words:
+                result.add(" ".join(words))
+            continue
+        for i in range(len(words) - SHINGLE_SIZE + 1):
+            result.add(" ".join(words[i:i + SHINGLE_SIZE]))
+    return np.fromiter(
+        (int.from_bytes(hashlib.blake2b(s.encode(), digest_size=4).digest(), "little") % MERSENNE_PRIME
+         for s in result),
+        dtype=np.uint64,
+        count=len(result)
+    )
+
+def minhash_signature(lines):
+    """MinHash signature of a poem's lines as a uint32 array"""
+    hashed = shingles(lines)
+    if not hashed.size:
+        return np.full(NUM_PERMUTATIONS, MERSENNE_PRIME, dtype=np.uint32)
+    return ((PERM_A * hashed + PERM_B) % MERSENNE_PRIME).min(axis=1).astype(np.uint32)
+
+def band_keys(signature):
+    """One LSH bucket key per band, salted with the band number"""
+    keys = []
+    for band, chunk in enumerate(signature.reshape(BANDS, ROWS_PER_BAND)):
+        digest = hashlib.blake2b(chunk.tobytes(), digest_size=8, salt=band.to_bytes(2, "little")).digest()
+        # SQLite integers are signed 64-bit
+        keys.append(int.from_bytes(digest, "little", signed=True))
+    return keys
+
+def estimated_similarity(sig_a, sig_b):
+    """Estimated Jaccard similarity of two signatures"""
+    return float(np.count_nonzero(sig_a == sig_b)) / NUM_PERMUTATIONS
+
+class NearDuplicateIndex:
+    """MinHash LSH index over shingled poem lines, stored next to the poem index.
+
+    A check costs one signature computation plus one indexed query over the
+    band buckets, independent of how many poems are indexed.
+    """
+
+    def __init__(self, repo_path, db_path=None, threshold=0.5, check_titles=True):
+        self.repo_path = Path(repo_path)
+        self.db_path = Path(db_path) if db_path else self.repo_path / "poem_index.sqlite"
+        self.threshold = threshold
+        self.check_titles = check_titles
+        # Shared with the prefetch thread; sqlite3 serializes access per connection
+        self.conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self.conn.executescript(SCHEMA)
+
+    def close(self):
+        self.conn.close()
+
+    def add(self, path, title, lines, commit=True):
+        """Index a poem by its repo-relative path"""
+        signature = minhash_signature(lines)
+        self.conn.execute("DELETE FROM minhash_bands WHERE path = ?", (path,))
+        self.conn.execute(
+            "INSERT OR REPLACE INTO minhash (path, title_key, signature) VALUES (?, ?, ?)",
+            (path, normalize_title(title), signature.tobytes())
+        )
+        self.conn.executemany(
+            "INSERT INTO minhash_bands (band_key, path) VALUES (?, ?)",
+            [(key, path) for key in band_keys(signature)]
+        )
+        if commit:
+            self.conn.commit()
+
+    def find_duplicate(self, title, lines, exclude_path=None):
+        """Return (path, similarity) of the closest indexed near-duplicate, or None.
+
+        Generated titles collide often, so a title alone never makes a
+        duplicate. With title checks enabled, poems with the same normalized
+        title are compared even when no LSH band matches, but they still need
+        the line similarity to reach the threshold.
+        """
+        signature = minhash_signature(lines)
+        keys = band_keys(signature)
+        candidates = self.conn.execute(
+            f"""SELECT m.path, m.signature FROM minhash m
+                WHERE m.path IN (SELECT path FROM minhash_bands
+                                 WHERE band_key IN ({','.join('?' * len(keys))}))""",
+            keys
+        ).fetchall()
+        title_key = normalize_title(title) if self.check_titles else ""
+        if title_key:
+            candidates += self.conn.execute(
+                "SELECT path, signature FROM minhash WHERE title_key = ?", (title_key,)
+            ).fetchall()
+
+        best = None
+        for path, blob in candidates:
+            if path == exclude_path:
+                continue
+            similarity = estimated_similarity(signature, np.frombuffer(blob, dtype=np.uint32))
+            if similarity >= self.threshold and (best is None or similarity > best[1]):
+                best = (path, similarity)
+        return best
+
+    def sync_with_index(self):
+        """Add every poem in the poems table that has no signature yet, dropping signatures of removed poems"""
+        self.conn.execute("DELETE FROM minhash WHERE path NOT IN (SELECT path FROM poems)")
+        self.conn.execute("DELETE FROM minhash_bands WHERE path NOT IN (SELECT path FROM poems)")
+        rows = self.conn.execute(
+            """SELECT p.path, p.title, p.lines FROM poems p
+               LEFT JOIN minhash m ON m.path = p.path
+               WHERE m.path IS NULL"""
+        ).fetchall()
+        for path, title, lines in rows:
+            self.add(path, title, (lines or "").split("\n"), commit=False)
+        self.conn.commit()
+        return len(rows)
+
+    def rebuild(self):
+        """Recompute signatures for the whole indexed corpus"""
+        self.conn.execute("DELETE FROM minhash")
+        self.conn.execute("DELETE FROM minhash_bands")
+        self.conn.commit()
+        return self.sync_with_index()
+
+def main():
+    parser = argparse.ArgumentParser(description='Near-duplicate detection over the poems corpus')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    subparsers.add_parser('rebuild', help='Recompute MinHash signatures for all indexed poems')
+    check_parser = subparsers.add_parser('check', help='Check a poem markdown file against the corpus')
+    check_parser.add_argument('file', help='Path to a NN_RB_*.md poem')
+    args = parser.parse_args()
+
+    from poem_index import PoemIndex, parse_poem_markdown
+    repo_path = os.path.dirname(os.path.abspath(__file__))
+    index = PoemIndex(repo_path)
+    if not index.is_complete():
+        index.rebuild()
+    index.close()
+
+    duplicates = NearDuplicateIndex(repo_path)
+    if args.command == 'rebuild':
+        print(f"Computed signatures for {duplicates.rebuild()} poems")
+    else:
+        with open(args.file, 'r', encoding='utf-8') as f:
+            parsed = parse_poem_markdown(f.read())
+        duplicates.sync_with_index()
+        rel_path = Path(args.file).resolve().relative_to(repo_path).as_posix()
+        match = duplicates.find_duplicate(parsed["title"], parsed["lines"], exclude_path=rel_path)
+        if match:
+            print(f"Near-duplicate of {match[0]} (similarity {match[1]:.2f})")
+        else:
+            print("No near-duplicates found")
+    duplicates.close()
+
+if __name__ == "__main__":
+    main()
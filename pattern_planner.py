@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+import argparse
+import json
+import os
+from collections import Counter
+
+import numpy as np
+
+MAX_LEVEL = 4
+
+def github_levels(counts):
+    """Shade level (0-4) of each daily count, the way the contribution graph does.
+
+    Days without commits are level 0; the other days are split at the
+    quartiles of the non-zero counts in the same window.
+    """
+    counts = np.asarray(counts)
+    levels = np.zeros(counts.shape, dtype=np.uint8)
+    active = counts > 0
+    if not active.any():
+        return levels
+    quartiles = np.percentile(counts[active], [25, 50, 75])
+    levels[active] = 1 + np.searchsorted(quartiles, counts[active], side='left')
+    return levels
+
+def _separate_levels(counts, target_levels, history):
+    """Lift each level's days to just above the highest day of the levels below"""
+    floor = max(1, int(history[target_levels == 0].max(initial=0)) + 1)
+    for level in range(1, MAX_LEVEL + 1):
+        days = target_levels == level
+        if not days.any():
+            continue
+        counts[days] = np.maximum(counts[days], floor)
+        floor = int(counts[days].max()) + 1
+    return counts
+
+def _lift_above_quartiles(counts, target_levels, history):
+    """Fix days shaded one level too light because a quartile fell inside their level.
+
+    Only the days sorted after the quartile position are lifted above it; the
+    ones at or before it set the quartile and can't be fixed without moving it.
+    """
+    for boundary in range(1, MAX_LEVEL):
+        active = np.flatnonzero(counts > 0)
+        if active.size < 2:
+            return counts
+        quartile = np.percentile(counts[active], 25 * boundary)
+        wrong = active[(target_levels[active] == boundary + 1) & (counts[active] <= quartile)]
+        if not wrong.size:
+            continue
+        # Stable rank of each active day in the sorted counts
+        ranks = np.empty(counts.size, dtype=np.int64)
+        ranks[active[np.argsort(counts[active], kind='stable')]] = np.arange(active.size)
+        cutoff = int(np.ceil(0.25 * boundary * (active.size - 1)))
+        lift = wrong[ranks[wrong] > cutoff]
+        counts[lift] = int(np.floor(quartile)) + 1
+        counts = _separate_levels(counts, target_levels, history)
+    return counts
+
+def plan_minimal_counts(target_levels, history=None, rounds=3):
+    """Smallest daily totals whose shading matches target_levels.
+
+    Every day of a level has to end up above every day of the level below,
+    and no day can go under the commits it already has (`history`). Walking
+    the levels upwards and lifting each day to just above the previous level
+    gives the minimal totals; when a quartile then lands inside a level, the
+    days past it are lifted once more. Returns (counts, mismatched) where
+    mismatched flags days whose level still differs, e.g. because they
+    already have commits but should stay empty, or they set a quartile.
+    """
+    target_levels = np.asarray(target_levels, dtype=np.int64)
+    history = np.zeros(target_levels.shape, dtype=np.int64) if history is None else np.asarray(history, dtype=np.int64)
+    counts = _separate_levels(history.copy(), target_levels, history)
+
+    best = counts.copy()
+    best_mismatched = github_levels(counts) != target_levels
+    for _ in range(rounds):
+        if not best_mismatched.any():
+            break
+        counts = _lift_above_quartiles(counts.copy(), target_levels, history)
+        mismatched = github_levels(counts) != target_levels
+        if mismatched.sum() >= best_mismatched.sum():
+            break
+        best, best_mismatched = counts, mismatched
+    return best, best_mismatched
+
+def plan_commit_map(target_map, history=None):
+    """Plan a {YYYY-MM-DD: commits} pattern from a {YYYY-MM-DD: level} map.
+
+    history is an optional {YYYY-MM-DD: commits} map of what already exists.
+    Returns (commit_map, mismatched_dates).
+    """
+    dates = sorted(target_map)
+    history = history or {}
+    counts, mismatched = plan_minimal_counts(
+        [target_map[date] for date in dates],
+        [history.get(date, 0) for date in dates]
+    )
+    commit_map = dict(zip(dates, counts.tolist()))
+    return commit_map, [date for date, bad in zip(dates, mismatched) if bad]
+
+def levels_from_commit_map(commit_map):
+    """The {YYYY-MM-DD: level} map an existing commit pattern is shaded as"""
+    dates = sorted(commit_map)
+    levels = github_levels([commit_map[date] for date in dates])
+    return dict(zip(dates, levels.tolist()))
+
+def commit_history(repo_path, since=None):
+    """{YYYY-MM-DD: commits} of the repository, from the incremental history scanner"""
+    from contribution_history import load_history
+    return load_history(repo_path).counts(start=since)
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Rewrite a commit pattern with the fewest commits that keep its contribution graph shading'
+    )
+    parser.add_argument('--pattern', default=None, help='Pattern to read (default: commit_pattern.json)')
+    parser.add_argument('--output', default=None, help='Where to write the plan (default: overwrite --pattern)')
+    parser.add_argument('--no-history', action='store_true', help='Ignore the commits already in the repository')
+    parser.add_argument('--dry-run', action='store_true', help='Only print the savings')
+    args = parser.parse_args()
+
+    repo_path = os.path.dirname(os.path.abspath(__file__))
+    pattern_path = args.pattern or os.path.join(repo_path, "commit_pattern.json")
+    with open(pattern_path, 'r') as f:
+        commit_map = json.load(f)
+
+    history = {} if args.no_history else commit_history(repo_path, since=min(commit_map) if commit_map else None)
+    target = levels_from_commit_map(commit_map)
+    planned, mismatched = plan_commit_map(target, history)
+
+    before, after = sum(commit_map.values()), sum(planned.values())
+    print(f"Target levels: {dict(sorted(Counter(target.values()).items()))}")
+    print(f"Commits: {before} -> {after} ({before / max(after, 1):.1f}x fewer)")
+    per_level = {}
+    for date, level in target.items():
+        if level:
+            per_level[level] = max(per_level.get(level, 0), planned[date])
+    print(f"Most commits on a day, per level: {dict(sorted(per_level.items()))}")
+    if mismatched:
+        print(f"{len(mismatched)} days can't reach their level, e.g. {', '.join(mismatched[:5])}")
+    if not args.dry_run:
+        output = args.output or pattern_path
+        with open(output, 'w') as f:
+            json.dump(planned, f, indent=2)
+        print(f"Plan saved to {output}")
+
+if __name__ == "__main__":
+    main()
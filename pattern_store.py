@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+import argparse
+import datetime
+import json
+import mmap
+import os
+import struct
+from pathlib import Path
+
+MAGIC = b"CPAT"
+VERSION = 1
+# magic, version, padding, first day (proleptic ordinal), number of days
+HEADER = struct.Struct("<4sHxxiI")
+COUNT = struct.Struct("<H")
+MISSING = 0xFFFF  # Day without an entry in the pattern
+
+def _as_date(value):
+    if isinstance(value, datetime.datetime):
+        return value.date()
+    if isinstance(value, datetime.date):
+        return value
+    return datetime.date.fromisoformat(value)
+
+class PatternStore:
+    """Memory-mapped binary commit pattern.
+
+    The file is a 16 byte header holding the first date and the number of
+    days, followed by one little-endian uint16 commit count per day. Looking
+    a day up reads one record from the mapped file, so nothing is parsed at
+    load; numpy is only imported for the whole-array operations, which keeps
+    the daily should-run check light. close() (or a with block) unmaps the
+    file.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        with open(self.path, 'rb') as f:
+            magic, version, start_ordinal, days = HEADER.unpack(f.read(HEADER.size))
+            if magic != MAGIC or version != VERSION:
+                raise ValueError(f"{self.path} is not a version {VERSION} commit pattern")
+            if os.fstat(f.fileno()).st_size < HEADER.size + days * COUNT.size:
+                raise ValueError(f"{self.path} is truncated")
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self.start = datetime.date.fromordinal(start_ordinal)
+        self.days = days
+        self._counts = None
+
+    def close(self):
+        # Drop our numpy view first; mmap refuses to close while a buffer is exported
+        self._counts = None
+        self._map.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+    @property
+    def counts(self):
+        """All per-day counts as a numpy array over the mapped file"""
+        if self._counts is None:
+            import numpy as np
+            self._counts = np.frombuffer(self._map, dtype='<u2', count=self.days, offset=HEADER.size)
+        return self._counts
+
+    @property
+    def end(self):
+        """First date after the pattern"""
+        return self.start + datetime.timedelta(days=self.days)
+
+    def get(self, date, default=8):
+        """Commit count for a date, or default when the pattern has none"""
+        index = _as_date(date).toordinal() - self.start.toordinal()
+        if not 0 <= index < self.days:
+            return default
+        count = COUNT.unpack_from(self._map, HEADER.size + index * COUNT.size)[0]
+        return default if count == MISSING else count
+
+    def range(self, start, days, default=8):
+        """Commit counts for `days` consecutive dates from `start`, as a list"""
+        import numpy as np
+        offset = _as_date(start).toordinal() - self.start.toordinal()
+        result = np.full(days, default, dtype=np.int64)
+        lo, hi = max(offset, 0), min(offset + days, self.days)
+        if lo < hi:
+            window = self.counts[lo:hi].astype(np.int64)
+            window[window == MISSING] = default
+            result[lo - offset:hi - offset] = window
+        return result.tolist()
+
+    def to_dict(self):
+        """The pattern as the {YYYY-MM-DD: count} map used by commit_pattern.json"""
+        import numpy as np
+        present = np.flatnonzero(self.counts != MISSING)
+        start = np.datetime64(self.start.isoformat(), 'D')
+        dates = np.datetime_as_string(start + present).tolist()
+        return dict(zip(dates, self.counts[present].tolist()))
+
+    @staticmethod
+    def write(path, commit_map):
+        """Write a {YYYY-MM-DD: count} map as a binary pattern file (atomically)"""
+        import numpy as np
+        path = Path(path)
+        ordinals = {datetime.date.fromisoformat(date).toordinal(): count for date, count in commit_map.items()}
+        start = min(ordinals) if ordinals else datetime.date.today().toordinal()
+        days = max(ordinals) - start + 1 if ordinals else 0
+        counts = np.full(days, MISSING, dtype='<u2')
+        if ordinals:
+            index = np.fromiter(ordinals.keys(), dtype=np.int64, count=len(ordinals)) - start
+            values = np.fromiter(ordinals.values(), dtype=np.int64, count=len(ordinals))
+            if values.min() < 0 or values.max() >= MISSING:
+                raise ValueError(f"Commit counts must be between 0 and {MISSING - 1}")
+            counts[index] = values
+        tmp_path = path.with_suffix(".tmp")
+        with open(tmp_path, 'wb') as f:
+            f.write(HEADER.pack(MAGIC, VERSION, start, days))
+            f.write(counts.tobytes())
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def from_json(cls, json_path, path):
+        """Compile a commit_pattern.json into a binary pattern file and open it"""
+        with open(json_path, 'r') as f:
+            cls.write(path, json.load(f))
+        return cls(path)
+
+    def export_json(self, json_path):
+        with open(json_path, 'w') as f:
+            json.dump(self.to_dict(), f, indent=2)
+
+def pattern_paths(repo_path, profile=None):
+    """(json_path, bin_path) of the default pattern or of a named profile"""
+    name = f"commit_pattern.{profile}" if profile else "commit_pattern"
+    repo_path = Path(repo_path)
+    return repo_path / f"{name}.json", repo_path / f"{name}.bin"
+
+def load_pattern_store(repo_path, profile=None):
+    """Open the binary pattern, recompiling it when the JSON is newer.
+
+    Returns None when neither the JSON nor the binary pattern exists.
+    """
+    json_path, bin_path = pattern_paths(repo_path, profile)
+    if json_path.exists():
+        if not bin_path.exists() or bin_path.stat().st_mtime < json_path.stat().st_mtime:
+            return PatternStore.from_json(json_path, bin_path)
+    if bin_path.exists():
+        return PatternStore(bin_path)
+    return None
+
+def main():
+    parser = argparse.ArgumentParser(description='Compile, export or query the binary commit pattern')
+    parser.add_argument('--profile', default=None, help='Pattern profile (default: commit_pattern)')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    subparsers.add_parser('import', help='Compile the JSON pattern into the binary store')
+    subparsers.add_parser('export', help='Write the binary store back out as JSON')
+    show_parser = subparsers.add_parser('show', help='Show the commits planned for a range of days')
+    show_parser.add_argument('date', nargs='?', default=datetime.date.today().isoformat(),
+                           help='First date as YYYY-MM-DD (default: today)')
+    show_parser.add_argument('--days', type=int, default=7, help='Number of days (default: 7)')
+    args = parser.parse_args()
+
+    repo_path = os.path.dirname(os.path.abspath(__file__))
+    json_path, bin_path = pattern_paths(repo_path, args.profile)
+    if args.command == 'import':
+        with PatternStore.from_json(json_path, bin_path) as store:
+            print(f"Compiled {json_path.name} into {bin_path.name}: {store.days} days from {store.start}")
+    elif args.command == 'export':
+        with PatternStore(bin_path) as store:
+            store.export_json(json_path)
+        print(f"Exported {bin_path.name} to {json_path.name}")
+    else:
+        store = load_pattern_store(repo_path, args.profile)
+        if store is None:
+            print(f"No pattern found at {json_path}")
+            return
+        start = datetime.date.fromisoformat(args.date)
+        with store:
+            counts = store.range(start, args.days)
+        for offset, count in enumerate(counts):
+            date = start + datetime.timedelta(days=offset)
+            print(f"{date} ({date.strftime('%A')}): {count} commits")
+
+if __name__ == "__main__":
+    main()
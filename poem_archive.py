@@ -0,0 +1,308 @@
+#!/usr/bin/env python3
+import argparse
+import datetime
+import gzip
+import json
+import os
+import subprocess
+from pathlib import Path
+
+from poem_index import POEM_FILE_PATTERN, date_from_folder
+
+PACK_VERSION = 1
+
+class MonthPack:
+    """One month of poems in a compressed pack with a random-access index.
+
+    YYYY-MM.jsonl.gz holds one gzip member per day, each a JSONL block of
+    {"path", "content", "mtime"} records, so the whole file still reads as
+    a plain gzip JSONL stream. YYYY-MM.idx.json maps every poem path to the
+    byte offset and length of its day's member; reading one poem inflates
+    only that day. New days are appended as new members.
+    """
+
+    def __init__(self, pack_path):
+        self.pack_path = Path(pack_path)
+        self.index_path = self.pack_path.with_name(self.pack_path.name.replace(".jsonl.gz", ".idx.json"))
+        self.index = {"version": PACK_VERSION, "days": {}, "poems": {}}
+        if self.index_path.exists():
+            with open(self.index_path, 'r') as f:
+                self.index = json.load(f)
+
+    def exists(self):
+        return self.pack_path.exists()
+
+    def paths(self):
+        return sorted(self.index["poems"])
+
+    def days(self):
+        return sorted(self.index["days"])
+
+    def _read_member(self, offset, length):
+        with open(self.pack_path, 'rb') as f:
+            f.seek(offset)
+            data = gzip.decompress(f.read(length))
+        return [json.loads(line) for line in data.decode('utf-8').splitlines() if line]
+
+    def read_day(self, day):
+        """All records of a day folder (repo-relative path)"""
+        if day not in self.index["days"]:
+            return []
+        return self._read_member(*self.index["days"][day])
+
+    def read(self, path):
+        """Content of one poem (repo-relative path), or None if it isn't in the pack"""
+        day = self.index["poems"].get(path)
+        if day is None:
+            return None
+        for record in self.read_day(day):
+            if record["path"] == path:
+                return record["content"]
+        return None
+
+    def __iter__(self):
+        """Every record, day by day"""
+        for day in self.days():
+            yield from self.read_day(day)
+
+    def add_days(self, records_by_day):
+        """Store {day folder: [records]}; new days are appended, packed days are rewritten"""
+        if any(day in self.index["days"] for day in records_by_day):
+            merged = {day: self.read_day(day) for day in self.days()}
+            merged.update(records_by_day)
+            self._rewrite(merged)
+            return
+        self.pack_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.pack_path, 'ab') as f:
+            offset = f.tell()
+            for day, records in sorted(records_by_day.items()):
+                member = self._compress(records)
+                f.write(member)
+                self._index_day(day, records, offset, len(member))
+                offset += len(member)
+            f.flush()
+            os.fsync(f.fileno())
+        self._save_index()
+
+    def remove_days(self, days):
+        """Drop day folders from the pack (the pack is deleted when it ends up empty)"""
+        remaining = {day: self.read_day(day) for day in self.days() if day not in days}
+        if remaining:
+            self._rewrite(remaining)
+        else:
+            for path in (self.pack_path, self.index_path):
+                if path.exists():
+                    path.unlink()
+            self.index = {"version": PACK_VERSION, "days": {}, "poems": {}}
+
+    @staticmethod
+    def _compress(records):
+        block = "".join(json.dumps(record, ensure_ascii=False) + "\n" for record in records)
+        return gzip.compress(block.encode('utf-8'), mtime=0)
+
+    def _index_day(self, day, records, offset, length):
+        self.index["days"][day] = [offset, length]
+        for record in records:
+            self.index["poems"][record["path"]] = day
+
+    def _rewrite(self, records_by_day):
+        self.index = {"version": PACK_VERSION, "days": {}, "poems": {}}
+        tmp_path = self.pack_path.with_name(self.pack_path.name + ".tmp")
+        self.pack_path.parent.mkdir(parents=True, exist_ok=True)
+        offset = 0
+        with open(tmp_path, 'wb') as f:
+            for day, records in sorted(records_by_day.items()):
+                member = self._compress(records)
+                f.write(member)
+                self._index_day(day, records, offset, len(member))
+                offset += len(member)
+        os.replace(tmp_path, self.pack_path)
+        self._save_index()
+
+    def _save_index(self):
+        tmp_path = self.index_path.with_name(self.index_path.name + ".tmp")
+        with open(tmp_path, 'w') as f:
+            json.dump(self.index, f)
+        os.replace(tmp_path, self.index_path)
+
+class PoemArchive:
+    """Monthly packs of old poems under archive/poems/, read transparently.
+
+    Packing moves day folders out of the working tree into their month's
+    pack; poems that git tracks are marked skip-worktree, so git status
+    stays clean and their history is untouched. read() and iter_poems()
+    return a poem from disk when it's there and from its pack otherwise.
+    """
+
+    def __init__(self, repo_path):
+        self.repo_path = Path(repo_path)
+        self.poems_dir = self.repo_path / "poems"
+        self.pack_dir = self.repo_path / "archive" / "poems"
+        self._packs = {}
+
+    def pack(self, month):
+        """MonthPack for a YYYY-MM month"""
+        if month not in self._packs:
+            self._packs[month] = MonthPack(self.pack_dir / f"{month}.jsonl.gz")
+        return self._packs[month]
+
+    def months(self):
+        """YYYY-MM months that have a pack"""
+        return sorted(path.name[:7] for path in self.pack_dir.glob("*.jsonl.gz"))
+
+    def _relative(self, path):
+        path = Path(path)
+        if path.is_absolute():
+            path = path.relative_to(self.repo_path)
+        return path.as_posix()
+
+    def _git(self, *args):
+        if not (self.repo_path / ".git").exists():
+            return None
+        return subprocess.run(['git', *args], cwd=self.repo_path, capture_output=True, text=True)
+
+    def _set_skip_worktree(self, paths, skip):
+        """Tell git the packed files are meant to be missing from the working tree (or not anymore)"""
+        if not paths:
+            return
+        tracked = self._git('ls-files', '-z', '--', *paths)
+        if tracked is None or tracked.returncode != 0:
+            return
+        tracked = [path for path in tracked.stdout.split('\0') if path]
+        if tracked:
+            flag = '--skip-worktree' if skip else '--no-skip-worktree'
+            self._git('update-index', flag, '--', *tracked)
+
+    def pack_days(self, folders):
+        """Move day folders into their month packs; returns the number of poems packed.
+
+        The pack is written and read back before any file is removed.
+        """
+        by_month = {}
+        for folder in folders:
+            folder = Path(folder)
+            records = []
+            for file_path in sorted(folder.iterdir()):
+                if file_path.is_file() and POEM_FILE_PATTERN.match(file_path.name):
+                    with open(file_path, 'r', encoding='utf-8') as f:
+                        content = f.read()
+                    records.append({"path": self._relative(file_path), "content": content,
+                                    "mtime": file_path.stat().st_mtime})
+            if records:
+                by_month.setdefault(date_from_folder(folder)[:7], {})[self._relative(folder)] = records
+
+        packed = 0
+        for month, records_by_day in sorted(by_month.items()):
+            pack = self.pack(month)
+            pack.add_days(records_by_day)
+            for day, records in records_by_day.items():
+                stored = {record["path"]: record["content"] for record in pack.read_day(day)}
+                if any(stored.get(record["path"]) != record["content"] for record in records):
+                    raise IOError(f"Pack {pack.pack_path} doesn't read back {day} correctly")
+            paths = [record["path"] for records in records_by_day.values() for record in records]
+            self._set_skip_worktree(paths, True)
+            for path in paths:
+                (self.repo_path / path).unlink()
+            packed += len(paths)
+
+        for folder in folders:
+            remove_empty_folders(Path(folder), self.poems_dir)
+        return packed
+
+    def pack_month(self, month):
+        """Pack every day folder of a YYYY-MM month"""
+        year, number = month.split('-')
+        folders = sorted(
+            folder for folder in self.poems_dir.glob(f"{year}/{number}_*/*") if folder.is_dir()
+        )
+        return self.pack_days(folders)
+
+    def unpack_month(self, month, keep_pack=False):
+        """Restore a month's poems to poems/; returns the number of poems restored"""
+        pack = self.pack(month)
+        if not pack.exists():
+            return 0
+        paths = []
+        for record in pack:
+            file_path = self.repo_path / record["path"]
+            file_path.parent.mkdir(parents=True, exist_ok=True)
+            with open(file_path, 'w', encoding='utf-8') as f:
+                f.write(record["content"])
+            os.utime(file_path, (record["mtime"], record["mtime"]))
+            paths.append(record["path"])
+        self._set_skip_worktree(paths, False)
+        if not keep_pack:
+            pack.remove_days(pack.days())
+        return len(paths)
+
+    def finished_months(self, today=None):
+        """YYYY-MM months before the current one that still have day folders in poems/"""
+        today = today or datetime.date.today()
+        current = today.strftime("%Y-%m")
+        months = set()
+        for month_folder in self.poems_dir.glob("*/*"):
+            if month_folder.is_dir() and month_folder.parent.name.isdigit():
+                month = f"{month_folder.parent.name}-{month_folder.name.split('_')[0]}"
+                if month < current:
+                    months.add(month)
+        return sorted(months)
+
+    def read(self, path):
+        """Content of a poem (repo-relative or absolute path) from disk or its pack, or None"""
+        path = self._relative(path)
+        file_path = self.repo_path / path
+        if file_path.is_file():
+            with open(file_path, 'r', encoding='utf-8') as f:
+                return f.read()
+        return self.pack(date_from_folder(file_path.parent)[:7]).read(path)
+
+    def iter_poems(self, month=None):
+        """(repo-relative path, content) of every packed poem, optionally of one month"""
+        for pack_month in ([month] if month else self.months()):
+            for record in self.pack(pack_month):
+                yield record["path"], record["content"]
+
+def remove_empty_folders(folder, stop):
+    """Remove folder and its parents up to (not including) stop while they are empty"""
+    while folder != stop and folder.is_dir() and not any(folder.iterdir()):
+        folder.rmdir()
+        folder = folder.parent
+
+def main():
+    parser = argparse.ArgumentParser(description='Pack old months of poems into compressed archives and read them back')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    pack_parser = subparsers.add_parser('pack', help='Pack months into archive/poems/')
+    pack_parser.add_argument('months', nargs='*', help='YYYY-MM months (default: every finished month)')
+    unpack_parser = subparsers.add_parser('unpack', help='Restore packed months to poems/')
+    unpack_parser.add_argument('months', nargs='+', help='YYYY-MM months')
+    unpack_parser.add_argument('--keep-pack', action='store_true', help='Leave the pack in place')
+    read_parser = subparsers.add_parser('read', help='Print a poem from disk or its pack')
+    read_parser.add_argument('path', help='Poem path, e.g. poems/2024/01_January/01_Monday/01_RB_Title.md')
+    list_parser = subparsers.add_parser('list', help='List packs, or the poems of one month')
+    list_parser.add_argument('month', nargs='?', help='YYYY-MM month')
+    args = parser.parse_args()
+
+    archive = PoemArchive(os.path.dirname(os.path.abspath(__file__)))
+    if args.command == 'pack':
+        for month in args.months or archive.finished_months():
+            print(f"{month}: packed {archive.pack_month(month)} poems")
+    elif args.command == 'unpack':
+        for month in args.months:
+            print(f"{month}: restored {archive.unpack_month(month, args.keep_pack)} poems")
+    elif args.command == 'read':
+        content = archive.read(args.path)
+        if content is None:
+            print(f"Poem not found: {args.path}")
+            return
+        print(content)
+    elif args.month:
+        for path in archive.pack(args.month).paths():
+            print(path)
+    else:
+        for month in archive.months():
+            pack = archive.pack(month)
+            size = pack.pack_path.stat().st_size
+            print(f"{month}: {len(pack.paths())} poems in {len(pack.days())} days, {size / 1024:.1f} KiB")
+
+if __name__ == "__main__":
+    main()
@@ -1,186 +1,268 @@
-import os
 import datetime
 import random
-from cohere import Client
-import git
 from pathlib import Path
-import time
-import logging
-from logging.handlers import RotatingFileHandler
-import json
 import traceback
 
+from poem_index import PoemIndex, date_from_folder, folder_for_date
+from near_duplicates import NearDuplicateIndex
+from poem_context import PoemContextBuilder
+from pattern_store import load_pattern_store
+from contribution_history import ContributionHistory
+from rate_limiter import RateLimiter, limited_chat
+from scheduler import RealClock
+from resources import REGISTRY
+from retention import RetentionEngine
+from repo_maintenance import RepoMaintenance
+from push_outbox import PushOutbox
+from stage_metrics import StageMetrics
+from poem_parser import parse_poem, parse_structured_poem, sanitize_title, STRUCTURED_POEM_SCHEMA
+
+POEM_MODEL = "command-r-plus-08-2024"
+DEFAULT_ONE_LINER = "vibes so immaculate they transcend the timeline ✨"
+
+# Available themes
+THEMES = [
+    {
+        "theme": "Chinese Astrology",
+        "description": "Zodiac wisdom, cosmic cycles, and destiny's dance 🐲"
+    },
+    {
+        "theme": "Numerology", 
+        "description": "Sacred numbers and life patterns 🔢"
+    },
+    {
+        "theme": "Satirical Commentary",
+        "description": "Witty takes on modern life's chaos 🎭"
+    },
+    {
+        "theme": "Wealth and Freedom",
+        "description": "Money moves and soul searching 💰"
+    },
+    {
+        "theme": "Monkeys",
+        "description": "Chaos masters and jungle vibes 🐒"
+    },
+    {
+        "theme": "Technology and AI",
+        "description": "Digital dreams and robot schemes 🤖"
+    },
+    {
+        "theme": "Traveling",
+        "description": "Wanderlust and world wonders 🌍"
+    },
+    {
+        "theme": "Gaming",
+        "description": "Level ups and epic quests 🎮"
+    },
+    {
+        "theme": "Money Laundering",
+        "description": "Money laundering and tax evasion 💰"
+    },
+    {
+        "theme": "Penguins",
+        "description": "Ice cool squad goals 🐧"
+    },
+    {
+        "theme": "Crypto",
+        "description": "To the moon and back 🚀"
+    },
+    {
+        "theme": "Japanese Philosophy",
+        "description": "Zen vibes and mindful moments 🍵"
+    },
+    {
+        "theme": "Billionaire",
+        "description": "Living the luxury life and building empires 💎"
+    },
+    {
+        "theme": "Entrepreneur",
+        "description": "Hustling and grinding to success 💼"
+    },
+    {
+        "theme": "888K Month Soon",
+        "description": "Manifesting abundance and wealth goals 🎯"
+    },
+    {
+        "theme": "888 Wealth",
+        "description": "Manifesting 888 and abundance vibes 💰"
+    },
+    {
+        "theme": "2025 Vision",
+        "description": "The gigachad year of pure success 🔥"
+    },
+    {
+        "theme": "Gigachad Life",
+        "description": "Breaking rules, making moves, staying alpha 💪"
+    },
+    {
+        "theme": "Blonde Beauty",
+        "description": "Golden hair and gorgeous vibes ✨"
+    },
+    {
+        "theme": "Italian Wife",
+        "description": "La dolce vita with amore 💝"
+    },
+    {
+        "theme": "Roman Empire",
+        "description": "Living that Italian luxury lifestyle 🏛️"
+    },
+    {
+        "theme": "Gen Z Memes Lingo",
+        "description": "No cap fr fr, bussin vibes only 💅"
+    },
+    {
+        "theme": "League of Legends",
+        "description": "Mid diff and pentakills all day ⚔️"
+    },
+    {
+        "theme": "Humility",
+        "description": "Staying grounded while reaching heights 🙏"
+    },
+    {
+        "theme": "China Vibes",
+        "description": "Ancient wisdom meets modern power 🏮"
+    }
+]
+
 class PoemAutomation:
-    def __init__(self, cohere_api_key, repo_path):
-        self.cohere = Client(cohere_api_key)
+    def __init__(self, cohere_api_key, repo_path, max_concurrency=4, prefetch_depth=0,
+                 structured_output=True, cohere_base_url=None, requests_per_minute=20,
+                 tokens_per_minute=0, retention_policies=None, push_batch_size=1,
+                 push_window_seconds=0, registry=None, clock=None):
+        self.cohere_api_key = cohere_api_key
+        self.cohere_base_url = cohere_base_url
+        self.max_concurrency = max_concurrency
+        self.structured_output = structured_output
         self.repo_path = Path(repo_path)
-        self.repo = git.Repo(repo_path)
+        # Scheduler clock for waits and back-offs; a VirtualClock skips them
+        self.clock = clock or RealClock()
+        # Client, repo handle, databases and logging are shared per process
+        self.registry = registry or REGISTRY
         self.daily_folder = None
+        self._git_configured = False
+        self._poem_titles = {}
         
         # Set up logging
         self._setup_logging()
-    
-    def _setup_logging(self):
-        """Configure logging to store logs in the logs folder"""
-        # Create logs directory if it doesn't exist
-        logs_dir = self.repo_path / "logs"
-        logs_dir.mkdir(exist_ok=True)
-        
-        # Create log files with timestamps
-        timestamp = datetime.datetime.now().strftime("%Y-%m-%d")
-        
-        # Main log file
-        main_log = logs_dir / f"poem_automation_{timestamp}.log"
-        
-        # Error log file
-        error_log = logs_dir / f"poem_automation_error_{timestamp}.log"
-        
-        # Configure main logger
-        self.logger = logging.getLogger('PoemAutomation')
-        self.logger.setLevel(logging.INFO)
-        
-        # Rotating file handler for main log (max 10MB per file, keep 5 backup files)
-        main_handler = RotatingFileHandler(
-            main_log,
-            maxBytes=10*1024*1024,  # 10MB
-            backupCount=5,
-            encoding='utf-8'
-        )
-        main_handler.setLevel(logging.INFO)
-        main_formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
-        main_handler.setFormatter(main_formatter)
-        
-        # Rotating file handler for error log
-        error_handler = RotatingFileHandler(
-            error_log,
-            maxBytes=10*1024*1024,  # 10MB
-            backupCount=5,
-            encoding='utf-8'
+        
+        # SQLite index of the poems corpus, built on first use
+        key = str(self.repo_path.resolve())
+        self.index = self.registry.get(("poem_index", key), self._create_index)
+        
+        # MinHash near-duplicate index over the same database
+        self.context_builder = PoemContextBuilder(self.index)
+        self.duplicates = self.registry.get(("near_duplicates", key), self._create_duplicates)
+        
+        # Requests/tokens per minute, shared with other processes using this repo
+        self.rate_limiter = self.registry.get(
+            ("rate_limiter", key, requests_per_minute, tokens_per_minute, id(clock) if clock else None),
+            lambda: RateLimiter(self.repo_path / "rate_limits.sqlite", requests_per_minute, tokens_per_minute,
+                                clock=self.clock)
         )
-        error_handler.setLevel(logging.ERROR)
-        error_formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s\n%(exc_info)s')
-        error_handler.setFormatter(error_formatter)
         
-        # Console handler
-        console_handler = logging.StreamHandler()
-        console_handler.setLevel(logging.INFO)
-        console_formatter = logging.Formatter('%(message)s')
-        console_handler.setFormatter(console_formatter)
+        # Per-day commit counts of the repo, for target vs. actual checks
+        self.history = self.registry.get(("history", key), lambda: ContributionHistory(self.repo_path))
+        
+        # Keep/archive/delete policies for old day folders and logs (default: keep poems)
+        self.retention = RetentionEngine(self.repo_path, retention_policies, logger=self.logger)
         
-        # Add handlers to logger
-        self.logger.addHandler(main_handler)
-        self.logger.addHandler(error_handler)
-        self.logger.addHandler(console_handler)
+        # Object store upkeep in idle slots, and fetch/push timings
+        self.maintenance = RepoMaintenance(self.repo_path, logger=self.logger)
         
-        # Clean up old log files
-        self._cleanup_old_logs(logs_dir)
+        # Per-stage durations, attempts and outcomes (JSONL + Prometheus textfile)
+        self.metrics = StageMetrics(self.repo_path, logger=self.logger)
         
-        self.logger.info("Logging initialized successfully")
+        # Local commits waiting for a push, pushed together by count or age
+        self.outbox = PushOutbox(self.repo_path, push_batch_size, push_window_seconds, logger=self.logger)
+        
+        # Optional spool of pre-generated poems, kept filled in the background
+        self.prefetch_depth = prefetch_depth
+        self.spool = None
+        self._spool_filler = None
+        if prefetch_depth > 0:
+            from poem_spool import PoemSpool
+            self.spool = PoemSpool(self.repo_path)
     
-    def _cleanup_old_logs(self, logs_dir):
-        """Clean up log files older than 7 days"""
-        try:
-            current_time = datetime.datetime.now()
-            for log_file in logs_dir.glob("*.log*"):
-                file_time = datetime.datetime.fromtimestamp(log_file.stat().st_mtime)
-                if (current_time - file_time).days > 7:
-                    self.logger.info(f"Removing old log file: {log_file}")
-                    log_file.unlink()
-        except Exception as e:
-            self.logger.error(f"Error cleaning up old logs: {str(e)}")
+    @classmethod
+    def from_config(cls, **overrides):
+        """An instance with every setting taken from config, for the entry points.
+
+        Keyword arguments override single settings, e.g. clock.
+        """
+        from config import (COHERE_API_KEY, REPO_PATH, GENERATION_CONCURRENCY, PREFETCH_DEPTH, STRUCTURED_OUTPUT,
+                            COHERE_BASE_URL, COHERE_RPM, COHERE_TPM, PUSH_BATCH_SIZE, PUSH_WINDOW_SECONDS)
+        from retention import policies_from_config
+        settings = dict(max_concurrency=GENERATION_CONCURRENCY, prefetch_depth=PREFETCH_DEPTH,
+                        structured_output=STRUCTURED_OUTPUT, cohere_base_url=COHERE_BASE_URL,
+                        requests_per_minute=COHERE_RPM, tokens_per_minute=COHERE_TPM,
+                        retention_policies=policies_from_config(),
+                        push_batch_size=PUSH_BATCH_SIZE, push_window_seconds=PUSH_WINDOW_SECONDS)
+        settings.update(overrides)
+        return cls(COHERE_API_KEY, REPO_PATH, **settings)
+
+    def _setup_logging(self):
+        """Borrow the process-wide logger writing to the logs folder"""
+        self.logger = self.registry.logger(self.repo_path)
+    
+    @property
+    def cohere(self):
+        """Shared Cohere client, created on the first API call"""
+        return self.registry.cohere_client(self.cohere_api_key, self.cohere_base_url)
+    
+    @property
+    def repo(self):
+        """Shared git.Repo handle for the repository"""
+        return self.registry.repo(self.repo_path)
+    
+    @property
+    def commit_writer(self):
+        """In-process writer for poem commits"""
+        def create():
+            from commit_writer import CommitWriter
+            writer = CommitWriter(self.repo)
+            # Entries left in the journal by a run that didn't finish
+            writer.sync_index()
+            return writer
+        return self.registry.get(("commit_writer", str(self.repo_path.resolve())), create)
+    
+    def _create_index(self):
+        index = PoemIndex(self.repo_path)
+        if not index.is_complete():
+            self.logger.info(f"Indexed {index.rebuild()} existing poems")
+        return index
+    
+    def _create_duplicates(self):
+        duplicates = NearDuplicateIndex(self.repo_path, db_path=self.index.db_path)
+        added = duplicates.sync_with_index()
+        if added:
+            self.logger.info(f"Computed near-duplicate signatures for {added} poems")
+        return duplicates
     
     def load_existing_poems(self):
         """Load all existing poems from today's folder"""
         if not self.daily_folder or not self.daily_folder.exists():
             return []
         
-        poems = []
-        # Sort files numerically by poem number
-        poem_files = sorted(
-            self.daily_folder.glob("poem_*.txt"),
-            key=lambda x: int(x.stem.split('_')[1])
-        )
-        
-        for poem_file in poem_files:
-            with open(poem_file, 'r', encoding='utf-8') as f:
-                content = f.read()
-                # Extract just the poem part (skip timestamp and poem number)
-                poem_parts = content.split('\n\n', 2)
-                if len(poem_parts) >= 3:
-                    poems.append(poem_parts[2])
-        
-        return poems
+        # Indexed rows are already ordered by poem number
+        rows = self.index.poems_for_date(date_from_folder(self.daily_folder))
+        return [f"Title: {row['title']}\n{row['lines']}" for row in rows]
     
     def get_poem_context(self):
-        """Create context from all previously generated poems today"""
-        existing_poems = self.load_existing_poems()
-        
-        if not existing_poems:
-            return "This is the first poem of the day."
-            
-        context = "Previously generated poems today:\n\n"
-        for i, poem in enumerate(existing_poems, 1):
-            context += f"Poem {i}:\n{poem}\n\n"
-        return context
+        """Create a token-bounded context from today's and recent poems"""
+        date = date_from_folder(self.daily_folder) if self.daily_folder else None
+        return self.context_builder.build(date)
     
     def validate_poem_structure(self, poem_text):
         """Validate basic poem structure"""
-        try:
-            # Split the poem into parts
-            lines = poem_text.strip().split('\n')
-            
-            # Debug output
-            print("\nReceived poem text:")
-            print(poem_text)
-            print("\nSplit lines:")
-            print(lines)
-            
-            # Extract title and content
-            title_line = None
-            content_lines = []
-            
-            for line in lines:
-                line = line.strip()
-                if 'Title:' in line or line.startswith('#'):  # More flexible title detection
-                    title_line = line
-                elif line and not line.startswith('>') and not line.startswith('---'):  # Skip formatting lines
-                    # Skip empty lines, markdown formatting, and emoji-only lines
-                    if (line and not line.isspace() and 
-                        not line.startswith('*') and 
-                        not line.startswith('#') and
-                        not all(c in '✨🌌🌙🌊🎯🌠🌍💫🌟🐲🔢🎭💰🐒🤖🎮🌸🐧🚀🍵 ' for c in line)):
-                        content_lines.append(line)
-            
-            # Verify we have a title
-            if not title_line:
-                print("❌ Invalid poem structure: No title found")
-                return False
-            
-            # Clean up content lines
-            content_lines = [line for line in content_lines if line.strip()]
-            
-            # Verify we have exactly 8 lines of content
-            if len(content_lines) != 8:
-                print(f"❌ Invalid poem structure: Found {len(content_lines)} lines, expected 8")
-                return False
-            
-            # Verify each line has meaningful content
-            for i, line in enumerate(content_lines, 1):
-                if not line or line.isspace() or '...' in line or '[' in line or ']' in line:
-                    print(f"❌ Invalid content in line {i}: '{line}'")
-                    return False
-            
-            print("✅ Poem structure validation passed:")
-            print(f"- Title: {title_line}")
-            print(f"- Content lines: {len(content_lines)}")
-            return True
-            
-        except Exception as e:
-            print(f"❌ Poem validation error: {str(e)}")
-            return False
+        with self.metrics.stage("validate_poem_structure") as record:
+            parsed = parse_poem(poem_text)
+            if not parsed.valid:
+                record["outcome"] = "invalid"
+                self.logger.info(f"❌ Invalid poem structure: {parsed.failure_reason}")
+        return parsed.valid
 
-    def generate_one_liner(self, themes_used, content_lines):
-        """Generate a dynamic Gen Z one-liner based on themes and content"""
+    def build_one_liner_prompt(self, themes_used, content_lines):
+        """Build the one-liner prompt for a poem's themes and opening lines"""
         theme_list = [t['theme'] for t in themes_used]
         themes_text = ', '.join(theme_list)
         content_preview = ' '.join(content_lines[:2])  # Use first two lines for context
@@ -206,44 +288,46 @@ class PoemAutomation:
         - living rent free in my head rn 🌟
         - it's giving enlightenment fr fr ✨
         """
+        return prompt
+
+    @staticmethod
+    def clean_one_liner(text):
+        """Strip quotes and markdown emphasis from a generated one-liner"""
+        return text.strip().replace('"', '').replace('*', '').strip()
+
+    def chat(self, **kwargs):
+        """self.cohere.chat under the shared rate limiter, retrying 429s and server errors"""
+        with self.metrics.stage("cohere_chat"):
+            return limited_chat(self.rate_limiter, self.cohere.chat, self.logger, **kwargs)
+
+    def generate_one_liner(self, themes_used, content_lines):
+        """Generate a dynamic Gen Z one-liner based on themes and content"""
+        prompt = self.build_one_liner_prompt(themes_used, content_lines)
         
-        try:
-            response = self.cohere.chat(
-                message=prompt,
-                model="command-r-plus-08-2024",
-                temperature=0.93,
-                max_tokens=60
-            )
-            
-            one_liner = response.text.strip()
-            # Clean up the response
-            one_liner = one_liner.replace('"', '').replace('*', '').strip()
-            return one_liner
-            
-        except Exception as e:
-            self.logger.warning(f"Failed to generate custom one-liner: {str(e)}")
-            return "vibes so immaculate they transcend the timeline ✨"
+        with self.metrics.stage("generate_one_liner") as record:
+            try:
+                response = self.chat(
+                    message=prompt,
+                    model=POEM_MODEL,
+                    temperature=0.93,
+                    max_tokens=60
+                )
+                
+                return self.clean_one_liner(response.text)
+                
+            except Exception as e:
+                record["outcome"] = "fallback"
+                self.logger.warning(f"Failed to generate custom one-liner: {str(e)}")
+                return DEFAULT_ONE_LINER
 
-    def format_poem_content(self, poem_text, themes_used):
-        """Format the poem with enhanced Markdown in vertical format"""
-        # Split into lines
-        lines = poem_text.strip().split('\n')
-        
-        # Extract title and content
-        title = "Untitled"  # Default title
-        content_lines = []
-        
-        for line in lines:
-            line = line.strip()
-            if line.startswith('Title:'):
-                title = line.replace('Title:', '').strip()
-            elif line.startswith('# '):
-                title = line.replace('# ', '').strip()
-            elif title and line:  # Only include non-empty lines after title
-                content_lines.append(line)
+    def extract_title_and_lines(self, poem_text):
+        """Extract the title and up to 8 content lines from generated poem text"""
+        parsed = parse_poem(poem_text)
+        title = parsed.title
+        content_lines = list(parsed.lines[:8])
         
         # Ensure we have a valid title
-        if not title or title == "Untitled":
+        if not title:
             self.logger.warning("No valid title found in poem, using generated title")
             # Generate a title based on the first line if available
             if content_lines:
@@ -251,11 +335,19 @@ class PoemAutomation:
             else:
                 title = f"Quantum Poem {datetime.datetime.now().strftime('%H:%M:%S')}"
         
-        # Ensure we don't exceed 8 lines
-        content_lines = content_lines[:8]
+        return title, content_lines
+
+    def format_poem_content(self, poem_text, themes_used, one_liner=None):
+        """Format the poem with enhanced Markdown in vertical format"""
+        with self.metrics.stage("format_poem_content"):
+            return self._format_poem_content(poem_text, themes_used, one_liner)
+
+    def _format_poem_content(self, poem_text, themes_used, one_liner):
+        title, content_lines = self.extract_title_and_lines(poem_text)
         
-        # Generate a dynamic one-liner
-        one_liner = self.generate_one_liner(themes_used, content_lines)
+        # Generate a dynamic one-liner unless one was generated up front
+        if one_liner is None:
+            one_liner = self.generate_one_liner(themes_used, content_lines)
         
         # Format themes used
         theme_list = [t['theme'] for t in themes_used]
@@ -277,117 +369,13 @@ class PoemAutomation:
         
         return formatted_content, title
 
-    def generate_poem(self, poem_number):
-        """Generate a poem using Cohere API with context awareness"""
-        context = self.get_poem_context()
-        # Define available themes
-        themes = [
-            {
-                "theme": "Chinese Astrology",
-                "description": "Zodiac wisdom, cosmic cycles, and destiny's dance 🐲"
-            },
-            {
-                "theme": "Numerology", 
-                "description": "Sacred numbers and life patterns 🔢"
-            },
-            {
-                "theme": "Satirical Commentary",
-                "description": "Witty takes on modern life's chaos 🎭"
-            },
-            {
-                "theme": "Wealth and Freedom",
-                "description": "Money moves and soul searching 💰"
-            },
-            {
-                "theme": "Monkeys",
-                "description": "Chaos masters and jungle vibes 🐒"
-            },
-            {
-                "theme": "Technology and AI",
-                "description": "Digital dreams and robot schemes 🤖"
-            },
-            {
-                "theme": "Traveling",
-                "description": "Wanderlust and world wonders 🌍"
-            },
-            {
-                "theme": "Gaming",
-                "description": "Level ups and epic quests 🎮"
-            },
-            {
-                "theme": "Money Laundering",
-                "description": "Money laundering and tax evasion 💰"
-            },
-            {
-                "theme": "Penguins",
-                "description": "Ice cool squad goals 🐧"
-            },
-            {
-                "theme": "Crypto",
-                "description": "To the moon and back 🚀"
-            },
-            {
-                "theme": "Japanese Philosophy",
-                "description": "Zen vibes and mindful moments 🍵"
-            },
-            {
-                "theme": "Billionaire",
-                "description": "Living the luxury life and building empires 💎"
-            },
-            {
-                "theme": "Entrepreneur",
-                "description": "Hustling and grinding to success 💼"
-            },
-            {
-                "theme": "888K Month Soon",
-                "description": "Manifesting abundance and wealth goals 🎯"
-            },
-            {
-                "theme": "888 Wealth",
-                "description": "Manifesting 888 and abundance vibes 💰"
-            },
-            {
-                "theme": "2025 Vision",
-                "description": "The gigachad year of pure success 🔥"
-            },
-            {
-                "theme": "Gigachad Life",
-                "description": "Breaking rules, making moves, staying alpha 💪"
-            },
-            {
-                "theme": "Blonde Beauty",
-                "description": "Golden hair and gorgeous vibes ✨"
-            },
-            {
-                "theme": "Italian Wife",
-                "description": "La dolce vita with amore 💝"
-            },
-            {
-                "theme": "Roman Empire",
-                "description": "Living that Italian luxury lifestyle 🏛️"
-            },
-            {
-                "theme": "Gen Z Memes Lingo",
-                "description": "No cap fr fr, bussin vibes only 💅"
-            },
-            {
-                "theme": "League of Legends",
-                "description": "Mid diff and pentakills all day ⚔️"
-            },
-            {
-                "theme": "Humility",
-                "description": "Staying grounded while reaching heights 🙏"
-            },
-            {
-                "theme": "China Vibes",
-                "description": "Ancient wisdom meets modern power 🏮"
-            }
-        ]
-        
-        # Select 2-4 themes randomly but weighted by poem number
+    def select_themes(self):
+        """Select 2-4 random themes for a poem"""
         num_themes = random.randint(2, 4)
-        selected_themes = random.sample(themes, num_themes)
-        
+        return random.sample(THEMES, num_themes)
+
+    def build_poem_prompt(self, selected_themes, context=None):
+        """Build the poem generation prompt for the selected themes and earlier-poem context"""
         # Create theme prompts with emojis
         theme_prompts = [f"{t['theme']} - {t['description']}" for t in selected_themes]
         
@@ -430,66 +418,133 @@ class PoemAutomation:
 
         Remember: EXACTLY 8 lines, no more, no less. Start with "Title: " and make it meaningful.
         """
+        if context:
+            prompt += f"""
+        {context}
+        """
+        return prompt
 
-        max_retries = 3
-        for attempt in range(max_retries):
+    def build_structured_prompt(self, selected_themes, context=None):
+        """Build a prompt asking for title, 8 lines and one-liner as one JSON object"""
+        theme_prompts = [f"{t['theme']} - {t['description']}" for t in selected_themes]
+        
+        prompt = f"""
+        You are a Gen Z poet creating a fun and meaningful poem. Your task is to write an 8-line poem mixing these themes:
+        {chr(10).join('• ' + t for t in theme_prompts)}
+
+        Respond with a JSON object with exactly these keys:
+        - "title": a creative, meaningful title (no "Title:" prefix, no markdown)
+        - "lines": an array of EXACTLY 8 strings, one poem line each, every line a complete thought
+        - "one_liner": a fun, witty Gen Z comment about the poem
+
+        Style Guide:
+        • Keep it Gen Z fresh but authentic
+        • Include 2-3 emojis max in the whole poem
+        • Mix fun and deep vibes (60% fun, 40% deep)
+        • Make each line hit different
+        • Keep it relatable to 2024
+        • No numbering, markdown or placeholder text in the lines
+
+        Rules for the one-liner:
+        - Use Gen Z slang and style
+        - Include 1-2 relevant emojis
+        - Keep it under 60 characters
+        - Reference modern trends/culture
+        - Don't use hashtags
+        """
+        if context:
+            prompt += f"""
+        {context}
+        """
+        return prompt
+
+    @staticmethod
+    def extract_response_text(response):
+        """Get the generated text from a Cohere chat response"""
+        if hasattr(response, 'text'):
+            return response.text.strip()
+        elif hasattr(response, 'message'):
+            return response.message.strip()
+        return str(response).strip()
+
+    def generate_structured_poem(self, poem_number):
+        """Generate title, lines and one-liner in a single API call.
+
+        Returns (poem_text, themes, one_liner), or None when the structured
+        response is unusable and the two-call path should be used instead.
+        """
+        selected_themes = self.select_themes()
+        prompt = self.build_structured_prompt(selected_themes, self.get_poem_context())
+        with self.metrics.stage("generate_structured_poem") as record:
             try:
-                response = self.cohere.chat(
+                response = self.chat(
                     message=prompt,
-                    model="command-r-plus-08-2024",
+                    model=POEM_MODEL,
                     temperature=0.92,
-                    max_tokens=1000
+                    max_tokens=1000,
+                    response_format={"type": "json_object", "schema": STRUCTURED_POEM_SCHEMA}
                 )
-                
-                # Get poem text
-                poem_text = ""
-                if hasattr(response, 'text'):
-                    poem_text = response.text.strip()
-                elif hasattr(response, 'message'):
-                    poem_text = response.message.strip()
-                else:
-                    poem_text = str(response).strip()
-                
-                # Debug output
-                print("\nGenerated poem text:")
-                print(poem_text)
-                
-                # Validate basic structure
-                if self.validate_poem_structure(poem_text):
-                    # Ensure we return both the poem and themes
-                    return poem_text, selected_themes
-                
-                print(f"Attempt {attempt + 1}: Invalid poem structure, retrying...")
-                continue
-                    
             except Exception as e:
-                print(f"Error in attempt {attempt + 1}: {str(e)}")
-                if attempt == max_retries - 1:
-                    raise
-                continue
+                record["outcome"] = "error"
+                self.logger.warning(f"Structured generation failed for poem {poem_number}: {str(e)}")
+                return None
+            
+            parsed = parse_structured_poem(self.extract_response_text(response))
+            if parsed is None:
+                record["outcome"] = "unusable"
+                self.logger.info(f"Unusable structured response for poem {poem_number}, using two-call path")
+                return None
+        poem_text, one_liner = parsed
+        return poem_text, selected_themes, one_liner
+
+    def generate_poem(self, poem_number):
+        """Generate a poem using Cohere API with context awareness"""
+        context = self.get_poem_context()
         
-        raise ValueError("Failed to generate a valid poem after multiple attempts")
+        # Select 2-4 themes randomly but weighted by poem number
+        selected_themes = self.select_themes()
+        prompt = self.build_poem_prompt(selected_themes, context)
+
+        max_retries = 3
+        with self.metrics.stage("generate_poem") as record:
+            for attempt in range(max_retries):
+                record["attempts"] = attempt + 1
+                try:
+                    response = self.chat(
+                        message=prompt,
+                        model=POEM_MODEL,
+                        temperature=0.92,
+                        max_tokens=1000
+                    )
+                    
+                    # Get poem text
+                    poem_text = self.extract_response_text(response)
+                    
+                    # Validate basic structure
+                    if self.validate_poem_structure(poem_text):
+                        # Ensure we return both the poem and themes
+                        return poem_text, selected_themes
+                    
+                    print(f"Attempt {attempt + 1}: Invalid poem structure, retrying...")
+                    continue
+                        
+                except Exception as e:
+                    print(f"Error in attempt {attempt + 1}: {str(e)}")
+                    if attempt == max_retries - 1:
+                        raise
+                    continue
+            
+            raise ValueError("Failed to generate a valid poem after multiple attempts")
     
     def get_or_create_daily_folder(self):
         """Get or create hierarchical folder structure: poems/YYYY/MM_Month/DD_Weekday"""
         today = datetime.datetime.now()
         
-        # Create base poems directory
-        poems_dir = self.repo_path / "poems"
-        poems_dir.mkdir(exist_ok=True)
-        
-        # Create year folder (YYYY)
-        year_folder = poems_dir / str(today.year)
-        year_folder.mkdir(exist_ok=True)
-        
-        # Create month folder (MM_MonthName)
-        month_name = today.strftime("%B")  # Full month name
-        month_folder = year_folder / f"{today.strftime('%m')}_{month_name}"
-        month_folder.mkdir(exist_ok=True)
-        
-        # Create daily folder with weekday name
-        daily_folder = month_folder / today.strftime("%d_%A")  # e.g., "15_Friday"
-        daily_folder.mkdir(exist_ok=True)
+        # Create hierarchical folders: poems/YYYY/MM_MonthName/DD_Weekday (e.g. "15_Friday")
+        daily_folder = folder_for_date(self.repo_path, today)
+        daily_folder.mkdir(parents=True, exist_ok=True)
+        month_folder = daily_folder.parent
+        year_folder = month_folder.parent
         
         # Print folder structure for visibility
         print(f"\n📁 Current Poetry Structure:")
@@ -498,130 +553,215 @@ class PoemAutomation:
         print(f"    └── {month_folder.name}/")
         print(f"        └── {daily_folder.name}/")
         
-        # Clean up old files and empty folders
-        self._cleanup_old_folders(poems_dir, today)
+        # Expire old day folders and logs (at most once a day)
+        self.retention.run(today.date())
+        
+        # Pick up poems written by other processes or pulled from origin
+        self.index.sync_folder(daily_folder)
         
         self.daily_folder = daily_folder
         return daily_folder
     
-    def _cleanup_old_folders(self, poems_dir, current_date):
-        """Clean up old folders and files, keeping only recent ones"""
+    def generate_poems_concurrently(self, poem_numbers):
+        """Generate several validated poems in parallel.
+
+        Returns a dict of poem_number -> (poem_text, themes, one_liner) ordered by
+        poem number, suitable for passing to create_poem_file as `generated`.
+        """
+        from async_generation import AsyncPoemGenerator
+        generator = AsyncPoemGenerator(self, self.cohere_api_key, max_concurrency=self.max_concurrency)
+        return generator.run(poem_numbers)
+
+    def start_prefetch(self):
+        """Start the background thread that keeps the poem spool topped up"""
+        if not self.spool or self._spool_filler:
+            return
+        from poem_spool import SpoolFiller
+        self._spool_filler = SpoolFiller(self.spool, self, self.prefetch_depth)
+        self._spool_filler.start()
+        self.logger.info(f"Prefetching poems in the background (depth {self.prefetch_depth})")
+
+    def stop_prefetch(self):
+        """Stop the background spool filler"""
+        if self._spool_filler:
+            self._spool_filler.stop()
+            self._spool_filler = None
+
+    def find_near_duplicate(self, poem_text):
+        """Return (path, similarity) of an existing poem this one nearly duplicates, or None"""
+        title, content_lines = self.extract_title_and_lines(poem_text)
+        return self.duplicates.find_duplicate(title, content_lines)
+
+    def create_poem_file(self, folder_path, index, generated=None):
+        """Create a file with a poem in the proper folder structure
+
+        `generated` is an optional (poem_text, themes, one_liner) tuple from
+        generate_poems_concurrently; without it the poem is taken from the
+        prefetch spool if one is configured, or generated here. A spooled
+        poem stays claimed until its file is written, and goes back into the
+        spool if that fails.
+        """
+        claim = None
+        if generated is None and self.spool:
+            claimed = self.spool.claim()
+            if claimed is None:
+                self.logger.warning("Poem spool is empty, generating on demand")
+            else:
+                claim, generated = claimed
         try:
-            # Keep only current year and month
-            for year_dir in poems_dir.iterdir():
-                if not year_dir.is_dir():
-                    continue
-                
-                year = int(year_dir.name)
-                if year < current_date.year:
-                    self.logger.info(f"Removing old year folder: {year_dir}")
-                    import shutil
-                    shutil.rmtree(year_dir)
-                    continue
+            file_path = self._create_poem_file(folder_path, index, generated)
+        except BaseException:
+            if claim:
+                self.spool.requeue(claim)
+            raise
+        if claim:
+            self.spool.release(claim)
+        return file_path
+
+    def _create_poem_file(self, folder_path, index, generated):
+        with self.metrics.poem(index), self.metrics.stage("create_poem_file") as record:
+            # Generate and validate the poem
+            max_attempts = 3
+            poem = None
+            themes = None
+            one_liner = None
+        
+            for attempt in range(max_attempts):
+                record["attempts"] = attempt + 1
+                try:
+                    if generated is not None:
+                        # Pre-generated poems are already validated
+                        candidate, selected_themes, candidate_one_liner = generated
+                        generated = None
+                    else:
+                        structured = self.generate_structured_poem(index) if self.structured_output else None
+                        if structured:
+                            candidate, selected_themes, candidate_one_liner = structured
+                        else:
+                            # generate_poem only returns validated poems
+                            candidate, selected_themes = self.generate_poem(index)
+                            candidate_one_liner = None
                 
-                # Clean up months in current year
-                for month_dir in year_dir.iterdir():
-                    if not month_dir.is_dir():
-                        continue
-                    
-                    month = int(month_dir.name.split('_')[0])
-                    if month < current_date.month:
-                        self.logger.info(f"Removing old month folder: {month_dir}")
-                        import shutil
-                        shutil.rmtree(month_dir)
+                    # Reject near-duplicates of anything already in the corpus
+                    duplicate = self.find_near_duplicate(candidate)
+                    if duplicate:
+                        duplicate_path, similarity = duplicate
+                        self.logger.warning(
+                            f"Attempt {attempt + 1}: Poem is a near-duplicate of {duplicate_path} "
+                            f"(similarity {similarity:.2f}), retrying..."
+                        )
                         continue
-                    
-                    # Clean up days in current month
-                    for day_dir in month_dir.iterdir():
-                        if not day_dir.is_dir():
-                            continue
-                        
-                        day = int(day_dir.name.split('_')[0])
-                        if day < current_date.day:
-                            self.logger.info(f"Removing old day folder: {day_dir}")
-                            import shutil
-                            shutil.rmtree(day_dir)
-                            
-        except Exception as e:
-            self.logger.error(f"Error during cleanup: {str(e)}", exc_info=True)
-
-    def create_poem_file(self, folder_path, index):
-        """Create a file with a poem in the proper folder structure"""
-        # Generate and validate the poem
-        max_attempts = 3
-        poem = None
-        themes = None
-        
-        for attempt in range(max_attempts):
-            try:
-                generated_poem, selected_themes = self.generate_poem(index)
-                if self.validate_poem_structure(generated_poem):
-                    poem = generated_poem
+                
+                    poem = candidate
                     themes = selected_themes
+                    one_liner = candidate_one_liner
                     break
-                else:
-                    print(f"Attempt {attempt + 1}: Invalid poem structure, retrying...")
-            except Exception as e:
-                print(f"Error in attempt {attempt + 1}: {str(e)}")
-                if attempt == max_attempts - 1:
-                    raise
-        
-        if not poem:
-            raise ValueError("Failed to generate a valid poem after multiple attempts")
+                except Exception as e:
+                    print(f"Error in attempt {attempt + 1}: {str(e)}")
+                    if attempt == max_attempts - 1:
+                        raise
         
-        # Format the poem content
-        formatted_content, title = self.format_poem_content(poem, themes)
+            if not poem:
+                raise ValueError("Failed to generate a valid poem after multiple attempts")
+        
+            # Format the poem content
+            formatted_content, title = self.format_poem_content(poem, themes, one_liner)
+        
+            # Create file name with index for proper ordering
+            file_name = f"{index:02d}_RB_{sanitize_title(title)}.md"
+            file_path = folder_path / file_name
+        
+            # Skip if file already exists
+            if file_path.exists():
+                print(f"Poem {index} already exists, skipping...")
+                record["outcome"] = "skipped"
+                return file_path
+        
+            # Write the file
+            with open(file_path, "w", encoding="utf-8") as f:
+                f.write(formatted_content)
+            self.index.upsert(file_path)
+            self._poem_titles[file_path] = title
+            self.duplicates.add(
+                file_path.relative_to(self.repo_path).as_posix(),
+                title,
+                self.extract_title_and_lines(poem)[1]
+            )
         
-        # Create file name with index for proper ordering
-        sanitized_title = "".join(c for c in title if c.isalnum() or c in [' ', '-']).strip()
-        sanitized_title = sanitized_title.replace(' ', '-')
-        file_name = f"{index:02d}_RB_{sanitized_title}.md"
-        file_path = folder_path / file_name
+            # Print structure and verification
+            print(f"\n✅ Created poem {index}:")
+            print(f"Path: {file_path}")
+            print(f"Title: {title}")
+            print(f"Themes: {' • '.join(t['theme'] for t in themes)}")
         
-        # Skip if file already exists
-        if file_path.exists():
-            print(f"Poem {index} already exists, skipping...")
             return file_path
-        
-        # Write the file
-        with open(file_path, "w", encoding="utf-8") as f:
-            f.write(formatted_content)
-        
-        # Print structure and verification
-        print(f"\n✅ Created poem {index}:")
-        print(f"Path: {file_path}")
-        print(f"Title: {title}")
-        print(f"Themes: {' • '.join(t['theme'] for t in themes)}")
-        
-        return file_path
     
-    def git_commit_and_push(self, file_path):
-        """Commit and push changes to git with enhanced error handling"""
-        try:
-            # Set git configuration
+    def _configure_git(self):
+        """Apply the git configuration once per instance"""
+        if self._git_configured:
+            return
+        # Read and written in-process; the file is only rewritten if a value differs
+        settings = [('pull', 'rebase', 'false'), ('pull', 'ff', 'false'), ('merge', 'ff', 'false')]
+        reader = self.repo.config_reader('global')
+        missing = [(section, option, value) for section, option, value in settings
+                   if reader.get_value(section, option, None) not in (value, False)]
+        if missing:
             print("Setting git configuration...")
-            self.repo.git.config('--global', 'pull.rebase', 'false')
-            self.repo.git.config('--global', 'pull.ff', 'false')
-            self.repo.git.config('--global', 'merge.ff', 'false')
+            with self.repo.config_writer('global') as writer:
+                for section, option, value in missing:
+                    writer.set_value(section, option, value)
+        self._git_configured = True
+
+    def _remote_main_moved(self):
+        """Check with a single ls-remote whether origin/main differs from our tracking ref"""
+        try:
+            with self.metrics.stage("git_ls_remote"), self.maintenance.timed("ls-remote"):
+                output = self.repo.git.ls_remote('origin', 'refs/heads/main')
+            remote_sha = output.split()[0] if output else None
+            local_sha = self.repo.commit('origin/main').hexsha
+        except Exception as e:
+            print(f"Remote ref check failed, fetching anyway: {str(e)}")
+            return True
+        return remote_sha != local_sha
+
+    def git_sync(self):
+        """Bring local main up to date with origin/main, skipping the fetch when nothing moved"""
+        with self.metrics.stage("git_sync"):
+            self._git_sync()
+
+    def _git_sync(self):
+        self._configure_git()
 
-            # Ensure we're on the main branch
-            current = self.repo.active_branch
-            if current.name != 'main':
-                print(f"Switching from {current.name} to main branch...")
-                self.repo.heads.main.checkout()
+        # Ensure we're on the main branch
+        current = self.repo.active_branch
+        if current.name != 'main':
+            print(f"Switching from {current.name} to main branch...")
+            self.sync_git_index()
+            self.repo.heads.main.checkout()
 
-            # Fetch all changes
+        if not self._remote_main_moved():
+            print("origin/main unchanged, skipping fetch")
+        else:
             print("Fetching latest changes...")
             origin = self.repo.remote(name='origin')
-            origin.fetch()
+            with self.metrics.stage("git_fetch"), self.maintenance.timed("fetch"):
+                origin.fetch('main')
+
+        # Nothing to merge if origin/main is already part of our history
+        if self.repo.is_ancestor('origin/main', 'HEAD'):
+            return
 
-            # Merge strategy
+        head_before = self.repo.head.commit.hexsha
+        # Merging needs an index that matches HEAD
+        self.sync_git_index()
+        with self.metrics.stage("git_merge") as record:
             try:
-                print("Pulling with merge strategy...")
-                self.repo.git.pull('origin', 'main', '--no-rebase')
-            except Exception as pull_error:
-                print(f"Pull failed: {str(pull_error)}")
-                # If pull fails, try to merge manually
+                print("Fast-forwarding to origin/main...")
+                self.repo.git.merge('origin/main', '--ff-only')
+            except Exception as ff_error:
+                print(f"Fast-forward failed: {str(ff_error)}")
+                # Histories diverged, fall back to a merge commit
+                record["attempts"] = 2
                 try:
                     print("Attempting manual merge...")
                     self.repo.git.merge('origin/main', '--no-ff')
@@ -632,80 +772,138 @@ class PoemAutomation:
                     self.repo.git.merge('--abort')
                     raise
 
-            # Add the file
-            print(f"Adding file: {file_path}")
-            self.repo.index.add([str(file_path)])
-            
-            # Read the poem title from the file
-            with open(file_path, 'r', encoding='utf-8') as f:
-                content = f.read()
-                poem_title = content.split('\n')[0].replace('# ', '')
-            
-            # Create detailed commit message
-            poem_number = file_path.name.split('_')[0]
-            commit_message = f"""✨ Created Poem {poem_number}: {poem_title} 📝
+        # Re-index poems that arrived with the merge
+        changed = self.repo.git.diff('--name-only', head_before, 'HEAD', '--', 'poems')
+        self.index.update_paths(changed.splitlines())
+        self.duplicates.sync_with_index()
+
+    def build_commit_message(self, file_path, poem_title):
+        """Create the detailed commit message for a poem file"""
+        poem_number = file_path.name.split('_')[0]
+        return f"""✨ Created Poem {poem_number}: {poem_title} 📝
 
 • Type: Daily Quantum Poetry
 • Number: Poem {poem_number} of 8
 • Path: {file_path.relative_to(self.repo_path)}
 • Timestamp: {datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')}"""
-            
-            # Commit changes
-            print("Committing changes...")
-            self.repo.index.commit(commit_message)
-            
-            # Push changes with retry logic
-            max_retries = 8
-            for attempt in range(max_retries):
-                try:
-                    print(f"Pushing changes to origin/main (attempt {attempt + 1}/{max_retries})...")
-                    self.repo.git.push('origin', 'main', '--force-with-lease')
-                    print("Successfully pushed changes to main! 🚀")
-                    break
-                except Exception as e:
-                    if attempt == max_retries - 1:
-                        raise
-                    print(f"Push attempt {attempt + 1} failed: {str(e)}")
-                    print("Retrying in 8 seconds...")
-                    time.sleep(8)
-            
+
+    def git_commit_local(self, file_path, now=None):
+        """Commit a poem file locally; no network access and no index rewrite.
+
+        The commit is queued in the outbox as of `now` (default: self.clock).
+        """
+        # Use the title from create_poem_file, reading the file only if we didn't write it
+        poem_title = self._poem_titles.pop(file_path, None)
+        if poem_title is None:
+            with open(file_path, 'r', encoding='utf-8') as f:
+                poem_title = f.readline().strip().replace('# ', '')
+        
+        # Write blob, trees and commit straight into the object database
+        print(f"Committing {file_path}...")
+        with self.metrics.poem(int(file_path.name.split('_')[0])), self.metrics.stage("git_commit"):
+            commit = self.commit_writer.commit_file(file_path, self.build_commit_message(file_path, poem_title))
+        self.index.set_commit_sha(file_path, commit.hexsha)
+        self.outbox.add(commit.hexsha, file_path, now=now or self.clock.now())
+        return commit
+
+    def sync_git_index(self):
+        """Bring git's index up to date with the poems committed in-process"""
+        with self.metrics.stage("git_index_sync"):
+            synced = self.commit_writer.sync_index()
+        if synced:
+            self.logger.info(f"Updated the git index with {synced} committed poems")
+        return synced
+
+    def git_push(self):
+        """Push local main to origin (a single attempt; the outbox retries later)"""
+        print("Pushing changes to origin/main...")
+        with self.metrics.stage("git_push"), self.maintenance.timed("push"):
+            self.repo.git.push('origin', 'main', '--force-with-lease')
+        print("Successfully pushed changes to main! 🚀")
+
+    def _sync_and_push(self):
+        """Push, syncing first only if origin moved or the push was rejected"""
+        try:
+            self.git_push()
+            return
         except Exception as e:
-            error_msg = f"Error in git operations: {str(e)}"
+            print(f"Push failed, syncing before one more attempt: {str(e)}")
+        self.git_sync()
+        self.git_push()
+
+    def push_outbox(self, force=False, now=None):
+        """Sync and push the queued commits if they're due (or force).
+
+        Returns True when nothing is left to push; a failed push stays
+        queued with a backoff instead of raising.
+        """
+        return self.outbox.drain(self._sync_and_push, force=force, now=now or self.clock.now())
+
+    def git_commit_and_push(self, file_path, now=None):
+        """Commit a poem and push it, or leave it queued in the outbox if the push can't happen now"""
+        with self.metrics.poem(int(file_path.name.split('_')[0])):
+            try:
+                self.git_sync()
+            except Exception as e:
+                # Commit on top of what we have; the outbox syncs again before pushing
+                print(f"⚠️ Sync failed, committing locally: {str(e)}")
+            try:
+                self.git_commit_local(file_path, now=now)
+            except Exception as e:
+                error_msg = f"Error in git operations: {str(e)}"
+                print(f"❌ {error_msg}")
+                raise RuntimeError(error_msg)
+            self.push_outbox(now=now)
+
+    def git_commit_and_push_batch(self, file_paths):
+        """Sync once, commit every poem file locally and push them all in one go"""
+        try:
+            self.git_sync()
+            for file_path in file_paths:
+                self.git_commit_local(file_path)
+        except Exception as e:
+            error_msg = f"Error in batched git operations: {str(e)}"
             print(f"❌ {error_msg}")
             raise RuntimeError(error_msg)
+        if file_paths:
+            self.sync_git_index()
+            self.push_outbox(force=True)
     
+    def load_pattern(self):
+        """The compiled commit pattern (see pattern_store), or None if there is none; close it after use"""
+        return load_pattern_store(self.repo_path)
+
     def test_daily_pattern(self):
         """Test if the daily pattern detection is working correctly"""
         self.logger.info("\n=== Testing Daily Pattern System ===")
-        
-        # Read the commit pattern file
-        pattern_file = self.repo_path / "commit_pattern.json"
-        if not pattern_file.exists():
-            self.logger.error("❌ commit_pattern.json not found!")
-            return False
             
         try:
             # Load the pattern
-            with open(pattern_file, 'r') as f:
-                commit_pattern = json.load(f)
+            pattern = self.load_pattern()
+            if pattern is None:
+                self.logger.error("❌ commit_pattern.json not found!")
+                return False
             
             # Test current date
             today = datetime.datetime.now()
             today_str = today.strftime('%Y-%m-%d')
-            num_commits = commit_pattern.get(today_str, 8)
+            with pattern:
+                week = pattern.range(today, 7)
+            num_commits = week[0]
             
             self.logger.info(f"\nToday ({today_str}):")
             self.logger.info(f"Required commits: {num_commits}")
+            self.history.scan()
+            self.logger.info(f"Commits so far: {self.history.count(today_str)}")
             self.logger.info(f"Pattern type: {'Heavy (Pattern Day)' if num_commits == 17 else 'Normal Day'}")
             
             # Test next 7 days
             self.logger.info("\nNext 7 days preview:")
             self.logger.info("-" * 50)
             
-            for i in range(7):
+            for i, commits in enumerate(week):
                 test_date = today + datetime.timedelta(days=i)
                 date_str = test_date.strftime('%Y-%m-%d')
-                commits = commit_pattern.get(date_str, 8)
                 
                 self.logger.info(f"Date: {date_str} ({test_date.strftime('%A')})")
                 self.logger.info(f"Commits: {commits} ({'Heavy' if commits == 17 else 'Normal'})")
@@ -718,8 +916,32 @@ class PoemAutomation:
             self.logger.error(traceback.format_exc())
             return False
 
-    def run_daily_automation(self):
-        """Run the daily automation process"""
+    def get_commit_count(self, date):
+        """Number of poems the commit pattern asks for on a YYYY-MM-DD date (default 8)"""
+        try:
+            pattern = self.load_pattern()
+        except Exception as e:
+            self.logger.error(f"Error reading commit pattern: {str(e)}", exc_info=True)
+            self.logger.warning("Falling back to default 8 commits")
+            return 8
+        if pattern is None:
+            self.logger.warning("No commit_pattern.json found. Using default 8 commits.")
+            return 8
+        with pattern:
+            return pattern.get(date, 8)  # Default to 8 if date not found
+
+    def run_daily_automation(self, batch_push=False, clock=None):
+        """Run the daily automation process
+
+        The day's slots are planned from commit_pattern.json and run by a
+        PoemScheduler, which saves the plan so a restart resumes at the next
+        slot. Pass a scheduler.VirtualClock as `clock` (here or to the
+        constructor) to run the day without waiting. With batch_push, the repo is synced once up front, each poem
+        is only committed locally at its slot and everything is pushed once
+        at the end.
+        """
+        from scheduler import PoemScheduler
+        
         # First, test the pattern system
         self.logger.info("\nTesting commit pattern system...")
         if not self.test_daily_pattern():
@@ -727,85 +949,21 @@ class PoemAutomation:
             return
             
         folder_path = self.get_or_create_daily_folder()
+        scheduler = PoemScheduler(self, clock=clock)
         
-        self.logger.info(f"\nStarting automation at {datetime.datetime.now()}")
+        self.logger.info(f"\nStarting automation at {scheduler.clock.now()}")
         self.logger.info(f"Using folder: {folder_path}")
         
-        # Read the commit pattern from commit_pattern.json
-        pattern_file = self.repo_path / "commit_pattern.json"
-        if not pattern_file.exists():
-            self.logger.warning("No commit_pattern.json found. Using default 8 commits.")
-            num_commits = 8
-        else:
-            try:
-                with open(pattern_file, 'r') as f:
-                    commit_pattern = json.load(f)
-                
-                # Get today's date in YYYY-MM-DD format
-                today = datetime.datetime.now().strftime('%Y-%m-%d')
-                
-                # Get number of commits for today from pattern
-                num_commits = commit_pattern.get(today, 8)  # Default to 8 if date not found
-                
-                self.logger.info(f"\nDate: {today}")
-                self.logger.info(f"Commits required today: {num_commits}")
-                
-            except Exception as e:
-                self.logger.error(f"Error reading commit pattern: {str(e)}", exc_info=True)
-                self.logger.warning("Falling back to default 8 commits")
-                num_commits = 8
-        
-        # Count existing poems to determine where to start
-        existing_poems = len(list(folder_path.glob("[0-9][0-9]_RB_*.md")))
-        start_number = existing_poems + 1
-        
-        self.logger.info(f"Found {existing_poems} existing poems. Starting from poem {start_number}")
-        self.logger.info(f"Target number of poems for today: {num_commits}")
+        today = date_from_folder(folder_path)
+        num_commits = self.get_commit_count(today)
+        self.logger.info(f"\nDate: {today}")
+        self.logger.info(f"Commits required today: {num_commits}")
+        if num_commits <= 0:
+            self.logger.info("No poems scheduled for today")
+            return
         
-        # Generate remaining poems sequentially with dynamic timing
-        for poem_number in range(start_number, num_commits + 1):
-            try:
-                start_time = datetime.datetime.now()
-                self.logger.info(f"\nGenerating poem {poem_number}/{num_commits} at {start_time}")
-                
-                # Create the poem
-                file_path = self.create_poem_file(folder_path, poem_number)
-                
-                if file_path and file_path.exists():
-                    self.logger.info(f"Created poem at: {file_path}")
-                    
-                    # Display poem content
-                    with open(file_path, 'r', encoding='utf-8') as f:
-                        content = f.read()
-                        self.logger.info("\nPoem content:")
-                        self.logger.info("-" * 50)
-                        self.logger.info(content)
-                        self.logger.info("-" * 50)
-                    
-                    # Commit and push this poem before waiting
-                    self.git_commit_and_push(file_path)
-                    self.logger.info(f"Successfully committed and pushed poem {poem_number}")
-                    
-                    # Calculate time spent and determine wait time
-                    time_spent = (datetime.datetime.now() - start_time).total_seconds()
-                    operation_window = 480 // num_commits  # Distribute 8 hours (480 minutes) across all poems
-                    
-                    # Wait remaining time to complete operation window if needed
-                    if time_spent < operation_window * 60:
-                        remaining_time = (operation_window * 60) - time_spent
-                        self.logger.info(f"\nWaiting {remaining_time:.0f} seconds to complete {operation_window}-minute operation window...")
-                        time.sleep(remaining_time)
-                    
-                    # If there's another poem to generate, add a small buffer
-                    if poem_number < num_commits:
-                        buffer_time = 30  # 30 seconds buffer
-                        self.logger.info(f"Adding {buffer_time} second buffer before next poem...")
-                        time.sleep(buffer_time)
-                
-            except Exception as e:
-                self.logger.error(f"Error creating poem {poem_number}: {str(e)}", exc_info=True)
-                # Wait before retrying
-                time.sleep(30)
-                continue
+        # Distribute 8 hours (480 minutes) across all poems, plus a 30 second buffer
+        interval = datetime.timedelta(minutes=480 // num_commits, seconds=30)
+        scheduler.run_day(folder_path, num_commits, interval, batch_push=batch_push)
         
-        self.logger.info(f"\nCompleted daily automation at {datetime.datetime.now()}") 
\ No newline at end of file
+        self.logger.info(f"\nCompleted daily automation at {scheduler.clock.now()}") 
\ No newline at end of file
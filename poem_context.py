@@ -0,0 +1,79 @@
+import datetime
+
+# Hard cap on the context added to each poem prompt, in estimated tokens
+CONTEXT_TOKEN_BUDGET = 400
+# How many days before today to include once today's poems are in
+CONTEXT_RECENT_DAYS = 1
+
+class PoemContextBuilder:
+    """Build a bounded prompt context from today's and recent poems.
+
+    Poems come from the SQLite poem index, get compressed to their title plus
+    first and last line, and are added newest first until the token budget is
+    spent. Compressed summaries are cached in memory across calls.
+    """
+
+    HEADER = "Previously generated poems (avoid repeating their titles, images and lines):"
+
+    def __init__(self, index, token_budget=CONTEXT_TOKEN_BUDGET, recent_days=CONTEXT_RECENT_DAYS):
+        self.index = index
+        self.token_budget = token_budget
+        self.recent_days = recent_days
+        self._summaries = {}
+
+    @staticmethod
+    def estimate_tokens(text):
+        """Rough token count (~4 characters per token)"""
+        return len(text) // 4 + 1
+
+    def _summaries_for(self, row):
+        """Full and title-only summaries of an indexed poem, cached by content hash"""
+        key = (row["path"], row["content_hash"])
+        cached = self._summaries.get(key)
+        if cached is None:
+            lines = [line for line in (row["lines"] or "").split("\n") if line]
+            title_only = f"- {row['title']}"
+            full = title_only
+            if lines:
+                key_lines = [lines[0]] if len(lines) == 1 else [lines[0], lines[-1]]
+                full += ": " + " / ".join(key_lines)
+            cached = (full, title_only)
+            self._summaries[key] = cached
+        return cached
+
+    def _rows(self, date):
+        """Today's poems newest first, followed by the recent days"""
+        rows = list(reversed(self.index.poems_for_date(date)))
+        if self.recent_days > 0:
+            start = (datetime.date.fromisoformat(date) - datetime.timedelta(days=self.recent_days)).isoformat()
+            rows.extend(self.index.conn.execute(
+                "SELECT * FROM poems WHERE date >= ? AND date < ? ORDER BY date DESC, number DESC",
+                (start, date)
+            ).fetchall())
+        return rows
+
+    def build(self, date=None):
+        """Context text for poems written on (and shortly before) a YYYY-MM-DD date"""
+        date = date or datetime.date.today().isoformat()
+        rows = self._rows(date)
+        if not rows:
+            return "This is the first poem of the day."
+
+        parts = [self.HEADER]
+        used = self.estimate_tokens(self.HEADER)
+        for position, row in enumerate(rows):
+            full, title_only = self._summaries_for(row)
+            for summary in (full, title_only):
+                cost = self.estimate_tokens(summary)
+                if used + cost <= self.token_budget:
+                    parts.append(summary)
+                    used += cost
+                    break
+            else:
+                # Out of budget: older poems are dropped entirely
+                remaining = len(rows) - position
+                note = f"(+{remaining} older poems omitted)"
+                if used + self.estimate_tokens(note) <= self.token_budget:
+                    parts.append(note)
+                break
+        return "\n".join(parts)
@@ -0,0 +1,318 @@
+#!/usr/bin/env python3
+import argparse
+import datetime
+import hashlib
+import os
+import re
+import sqlite3
+import subprocess
+from pathlib import Path
+
+POEM_FILE_PATTERN = re.compile(r"^(\d{2})_RB_.*\.md$")
+LINE_PATTERN = re.compile(r"^\*\*(\d+)\.\*\*\s*(.*)$")
+ONE_LINER_PATTERN = re.compile(r"^>\s*\*(.*)\*$")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS poems (
+    path TEXT PRIMARY KEY,
+    date TEXT NOT NULL,
+    number INTEGER NOT NULL,
+    title TEXT,
+    themes TEXT,
+    one_liner TEXT,
+    lines TEXT,
+    content_hash TEXT,
+    commit_sha TEXT,
+    mtime REAL
+);
+CREATE INDEX IF NOT EXISTS idx_poems_date ON poems (date, number);
+"""
+
+# PRAGMA user_version once rebuild() has indexed the whole corpus; a database
+# that only ever saw sync_folder() or upsert() has a lower version
+FULL_INDEX_VERSION = 1
+
+def date_from_folder(folder_path):
+    """Get the YYYY-MM-DD date of a poems/YYYY/MM_Month/DD_Weekday folder"""
+    folder_path = Path(folder_path)
+    day = folder_path.name.split('_')[0]
+    month = folder_path.parent.name.split('_')[0]
+    year = folder_path.parent.parent.name
+    return f"{year}-{month}-{day}"
+
+def folder_for_date(repo_path, date):
+    """The poems/YYYY/MM_Month/DD_Weekday folder of a date (not created)"""
+    return (Path(repo_path) / "poems" / str(date.year) / date.strftime("%m_%B")
+            / date.strftime("%d_%A"))
+
+def parse_poem_markdown(content):
+    """Parse the NN_RB_*.md markdown written by format_poem_content"""
+    title = None
+    one_liner = None
+    themes = []
+    lines = []
+    for raw_line in content.split('\n'):
+        line = raw_line.strip()
+        if not line:
+            continue
+        if title is None and line.startswith('# '):
+            title = line[2:].strip()
+            continue
+        match = LINE_PATTERN.match(line)
+        if match:
+            lines.append(match.group(2).strip())
+            continue
+        if one_liner is None:
+            match = ONE_LINER_PATTERN.match(line)
+            if match:
+                one_liner = match.group(1).strip()
+                continue
+        if line.startswith('**Themes**:'):
+            themes = [t.strip() for t in line[len('**Themes**:'):].split('•') if t.strip()]
+    return {
+        "title": title,
+        "one_liner": one_liner,
+        "themes": themes,
+        "lines": lines
+    }
+
+class PoemIndex:
+    """Incrementally maintained SQLite index of the poems/ corpus"""
+
+    def __init__(self, repo_path, db_path=None):
+        self.repo_path = Path(repo_path)
+        self.poems_dir = self.repo_path / "poems"
+        self.db_path = Path(db_path) if db_path else self.repo_path / "poem_index.sqlite"
+        # Shared with the prefetch thread; sqlite3 serializes access per connection
+        self.conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.executescript(SCHEMA)
+
+    def close(self):
+        self.conn.close()
+
+    def is_empty(self):
+        return self.conn.execute("SELECT 1 FROM poems LIMIT 1").fetchone() is None
+
+    def is_complete(self):
+        """True once a full rebuild() has run, as opposed to only a few folders being synced"""
+        return self.conn.execute("PRAGMA user_version").fetchone()[0] >= FULL_INDEX_VERSION
+
+    def _relative(self, file_path):
+        file_path = Path(file_path)
+        if file_path.is_absolute():
+            file_path = file_path.relative_to(self.repo_path)
+        return file_path.as_posix()
+
+    def _row_for_file(self, file_path, commit_sha=None):
+        """Build an index row for a poem file, or None if it isn't one"""
+        file_path = self.repo_path / self._relative(file_path)
+        if not POEM_FILE_PATTERN.match(file_path.name):
+            return None
+        with open(file_path, 'rb') as f:
+            raw = f.read()
+        return self._row_for_content(file_path, raw, file_path.stat().st_mtime, commit_sha)
+
+    def _row_for_content(self, file_path, raw, mtime, commit_sha=None):
+        """Build an index row from a poem's bytes, e.g. read from an archive pack"""
+        file_path = self.repo_path / self._relative(file_path)
+        match = POEM_FILE_PATTERN.match(file_path.name)
+        parsed = parse_poem_markdown(raw.decode('utf-8', errors='replace'))
+        return (
+            self._relative(file_path),
+            date_from_folder(file_path.parent),
+            int(match.group(1)),
+            parsed["title"],
+            " • ".join(parsed["themes"]),
+            parsed["one_liner"],
+            "\n".join(parsed["lines"]),
+            hashlib.sha1(raw).hexdigest(),
+            commit_sha,
+            mtime
+        )
+
+    def _write_rows(self, rows):
+        # Keep a previously recorded commit SHA when the new row has none
+        self.conn.executemany(
+            """INSERT INTO poems (path, date, number, title, themes, one_liner, lines,
+                                  content_hash, commit_sha, mtime)
+               VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+               ON CONFLICT(path) DO UPDATE SET
+                   date = excluded.date, number = excluded.number, title = excluded.title,
+                   themes = excluded.themes, one_liner = excluded.one_liner, lines = excluded.lines,
+                   content_hash = excluded.content_hash, mtime = excluded.mtime,
+                   commit_sha = COALESCE(excluded.commit_sha, poems.commit_sha)""",
+            rows
+        )
+        self.conn.commit()
+
+    def _delete_paths(self, paths):
+        """Drop poems from the index along with their near-duplicate signatures"""
+        params = [(path,) for path in paths]
+        self.conn.executemany("DELETE FROM poems WHERE path = ?", params)
+        if self._has_signatures():
+            self.conn.executemany("DELETE FROM minhash WHERE path = ?", params)
+            self.conn.executemany("DELETE FROM minhash_bands WHERE path = ?", params)
+
+    def _has_signatures(self):
+        # The minhash tables belong to NearDuplicateIndex and only exist once it has opened this database
+        return self.conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'minhash'"
+        ).fetchone() is not None
+
+    def upsert(self, file_path, commit_sha=None):
+        """Add or refresh a single poem file"""
+        row = self._row_for_file(file_path, commit_sha)
+        if row:
+            self._write_rows([row])
+
+    def update_paths(self, paths):
+        """Refresh the given repo-relative paths, dropping the ones that no longer exist"""
+        rows = []
+        removed = []
+        for path in paths:
+            full_path = self.repo_path / path
+            if full_path.exists():
+                row = self._row_for_file(full_path)
+                if row:
+                    rows.append(row)
+            else:
+                removed.append(self._relative(full_path))
+        self._delete_paths(removed)
+        self._write_rows(rows)
+
+    def set_commit_sha(self, file_path, commit_sha):
+        """Record the commit a poem file was committed in"""
+        self.conn.execute(
+            "UPDATE poems SET commit_sha = ? WHERE path = ?",
+            (commit_sha, self._relative(file_path))
+        )
+        self.conn.commit()
+
+    def sync_folder(self, folder_path):
+        """Reconcile a single day folder with the index (one directory listing)"""
+        folder_path = Path(folder_path)
+        if not folder_path.exists():
+            return
+        known = {
+            row["path"]: row["mtime"]
+            for row in self.conn.execute(
+                "SELECT path, mtime FROM poems WHERE date = ?", (date_from_folder(folder_path),)
+            )
+        }
+        on_disk = set()
+        rows = []
+        for entry in os.scandir(folder_path):
+            if not POEM_FILE_PATTERN.match(entry.name):
+                continue
+            rel_path = self._relative(entry.path)
+            on_disk.add(rel_path)
+            if known.get(rel_path) != entry.stat().st_mtime:
+                rows.append(self._row_for_file(entry.path))
+        self._delete_paths(set(known) - on_disk)
+        self._write_rows(rows)
+
+    def _commit_shas(self):
+        """Map each poem path to the last commit touching it, in one git log pass"""
+        shas = {}
+        try:
+            output = subprocess.run(
+                ['git', 'log', '--format=commit %H', '--name-only', '--', 'poems'],
+                cwd=self.repo_path, capture_output=True, text=True, check=True
+            ).stdout
+        except (OSError, subprocess.CalledProcessError):
+            return shas
+        current = None
+        for line in output.splitlines():
+            if line.startswith('commit '):
+                current = line[7:]
+            elif line and current:
+                shas.setdefault(line, current)
+        return shas
+
+    def rebuild(self):
+        """Re-index the whole poems/ tree from scratch, including poems moved into archive packs"""
+        from poem_archive import PoemArchive
+        shas = self._commit_shas()
+        rows = []
+        for file_path in sorted(self.poems_dir.glob("*/*/*/[0-9][0-9]_RB_*.md")):
+            row = self._row_for_file(file_path)
+            if row:
+                rows.append(row[:8] + (shas.get(row[0]),) + row[9:])
+        on_disk = {row[0] for row in rows}
+        archive = PoemArchive(self.repo_path)
+        for month in archive.months():
+            for record in archive.pack(month):
+                if record["path"] not in on_disk:
+                    raw = record["content"].encode('utf-8')
+                    rows.append(self._row_for_content(record["path"], raw, record["mtime"], shas.get(record["path"])))
+        self.conn.execute("DELETE FROM poems")
+        self._write_rows(rows)
+        if self._has_signatures():
+            # Signatures of poems that didn't survive the rebuild
+            with self.conn:
+                self.conn.execute("DELETE FROM minhash WHERE path NOT IN (SELECT path FROM poems)")
+                self.conn.execute("DELETE FROM minhash_bands WHERE path NOT IN (SELECT path FROM poems)")
+        with self.conn:
+            self.conn.execute(f"PRAGMA user_version = {FULL_INDEX_VERSION}")
+        return len(rows)
+
+    def count_for_date(self, date):
+        """Number of poems indexed for a YYYY-MM-DD date"""
+        return self.conn.execute("SELECT COUNT(*) FROM poems WHERE date = ?", (date,)).fetchone()[0]
+
+    def poems_for_date(self, date):
+        """All poems of a YYYY-MM-DD date, ordered by poem number"""
+        return self.conn.execute(
+            "SELECT * FROM poems WHERE date = ? ORDER BY number", (date,)
+        ).fetchall()
+
+    def recent_poems(self, limit=20, before_date=None):
+        """Most recent poems, newest first, optionally strictly before a date"""
+        if before_date:
+            return self.conn.execute(
+                "SELECT * FROM poems WHERE date < ? ORDER BY date DESC, number DESC LIMIT ?",
+                (before_date, limit)
+            ).fetchall()
+        return self.conn.execute(
+            "SELECT * FROM poems ORDER BY date DESC, number DESC LIMIT ?", (limit,)
+        ).fetchall()
+
+    def daily_counts(self, start_date=None, end_date=None):
+        """Map of YYYY-MM-DD -> number of poems, optionally within a date range"""
+        query = "SELECT date, COUNT(*) FROM poems"
+        params = []
+        if start_date and end_date:
+            query += " WHERE date BETWEEN ? AND ?"
+            params = [start_date, end_date]
+        query += " GROUP BY date ORDER BY date"
+        return dict(self.conn.execute(query, params).fetchall())
+
+    def total(self):
+        return self.conn.execute("SELECT COUNT(*) FROM poems").fetchone()[0]
+
+def main():
+    parser = argparse.ArgumentParser(description='Maintain the SQLite index of the poems corpus')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    subparsers.add_parser('rebuild', help='Re-index the whole poems/ tree')
+    subparsers.add_parser('stats', help='Show index totals')
+    count_parser = subparsers.add_parser('count', help='Count poems for a date')
+    count_parser.add_argument('date', nargs='?', default=datetime.date.today().isoformat(),
+                            help='Date as YYYY-MM-DD (default: today)')
+    args = parser.parse_args()
+
+    index = PoemIndex(os.path.dirname(os.path.abspath(__file__)))
+    if args.command == 'rebuild':
+        print(f"Indexed {index.rebuild()} poems into {index.db_path}")
+    elif args.command == 'stats':
+        counts = index.daily_counts()
+        print(f"Poems: {index.total()}")
+        print(f"Days: {len(counts)}")
+        if counts:
+            print(f"Range: {min(counts)} to {max(counts)}")
+    else:
+        print(f"{args.date}: {index.count_for_date(args.date)} poems")
+    index.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+import json
+import re
+from functools import lru_cache
+
+EXPECTED_LINES = 8
+
+TITLE_PATTERN = re.compile(
+    r"^(?:#+\s*(?:title[*_]*\s*:[*_\s]*)?|[*_]*\s*title[*_]*\s*:[*_\s]*)(?P<title>.*?)[*_\s]*$",
+    re.IGNORECASE
+)
+EMPHASIS_PATTERN = re.compile(r"^[*_]+\s*(?P<text>.*?)\s*[*_]+(?P<tail>\s*\W*)$")
+EMOJI_RANGES = "\U0001F000-\U0001FAFF\u2300-\u23FF\u2600-\u27BF\u2B00-\u2BFF\u3030\u303D\u3297\u3299"
+EMOJI_PATTERN = re.compile(f"[{EMOJI_RANGES}]")
+# Emoji plus whitespace, variation selectors and zero-width joiners
+EMOJI_ONLY_PATTERN = re.compile(f"^[\\s{EMOJI_RANGES}\\uFE0F\\u200D]+$")
+INVALID_CONTENT_PATTERN = re.compile(r"\.\.\.|\[|\]")
+MAX_ONE_LINER_LENGTH = 120
+
+# JSON schema for single-call generation of title, lines and one-liner
+STRUCTURED_POEM_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "title": {"type": "string"},
+        "lines": {
+            "type": "array",
+            "items": {"type": "string"},
+            "minItems": EXPECTED_LINES,
+            "maxItems": EXPECTED_LINES
+        },
+        "one_liner": {"type": "string"}
+    },
+    "required": ["title", "lines", "one_liner"]
+}
+
+class ParsedPoem:
+    """Structured result of parsing generated poem text"""
+
+    def __init__(self, title, lines, emojis, failure_reason=None):
+        self.title = title
+        self.lines = lines
+        self.emojis = emojis
+        self.failure_reason = failure_reason
+
+    @property
+    def valid(self):
+        return self.failure_reason is None
+
+    def sanitized_title(self):
+        """Title reduced to a filename-safe, dash-separated slug"""
+        return sanitize_title(self.title or "")
+
+    def __repr__(self):
+        return f"ParsedPoem(title={self.title!r}, lines={len(self.lines)}, failure_reason={self.failure_reason!r})"
+
+def sanitize_title(title):
+    """Keep only alphanumerics, spaces and dashes, then turn spaces into dashes"""
+    return "".join(c for c in title if c.isalnum() or c in [' ', '-']).strip().replace(' ', '-')
+
+@lru_cache(maxsize=128)
+def parse_poem(poem_text):
+    """Parse generated poem text in a single pass.
+
+    The first "Title: ..." or "# ..." line is the title. Blockquotes, rules,
+    further headings and emoji-only lines are skipped; markdown emphasis
+    around a line is dropped. Results are cached, so validating and then
+    formatting the same text parses it only once.
+    """
+    title = None
+    lines = []
+    emojis = []
+    failure_reason = None
+
+    for raw_line in poem_text.strip().split('\n'):
+        line = raw_line.strip()
+        if not line:
+            continue
+
+        if title is None:
+            match = TITLE_PATTERN.match(line)
+            if match:
+                # Emphasis may wrap the "Title:" label, the title itself or both
+                title = match.group('title').strip('*_ \t')
+                continue
+
+        if line.startswith(('>', '---', '#')) or EMOJI_ONLY_PATTERN.match(line):
+            continue
+
+        match = EMPHASIS_PATTERN.match(line)
+        if match:
+            line = (match.group('text') + match.group('tail')).strip()
+        if not line:
+            continue
+
+        emojis.extend(EMOJI_PATTERN.findall(line))
+        if failure_reason is None and INVALID_CONTENT_PATTERN.search(line):
+            failure_reason = f"Invalid content in line {len(lines) + 1}: '{line}'"
+        lines.append(line)
+
+    if not title:
+        failure_reason = "No title found"
+    elif len(lines) != EXPECTED_LINES:
+        failure_reason = f"Found {len(lines)} lines, expected {EXPECTED_LINES}"
+
+    return ParsedPoem(title, tuple(lines), tuple(emojis), failure_reason)
+
+def parse_structured_poem(response_text):
+    """Validate a JSON poem response against STRUCTURED_POEM_SCHEMA.
+
+    Returns (poem_text, one_liner) with poem_text in the plain "Title: ..."
+    format understood by parse_poem, or None when the response is unusable.
+    """
+    try:
+        data = json.loads(response_text)
+    except (TypeError, ValueError):
+        return None
+    if not isinstance(data, dict):
+        return None
+
+    title = data.get("title")
+    lines = data.get("lines")
+    one_liner = data.get("one_liner")
+    if not isinstance(title, str) or not title.strip():
+        return None
+    if not isinstance(lines, list) or len(lines) != EXPECTED_LINES:
+        return None
+    if not all(isinstance(line, str) and line.strip() and '\n' not in line.strip() for line in lines):
+        return None
+    if not isinstance(one_liner, str) or not one_liner.strip() or len(one_liner) > MAX_ONE_LINER_LENGTH:
+        return None
+
+    poem_text = f"Title: {title.strip()}\n\n" + "\n".join(line.strip() for line in lines)
+    if not parse_poem(poem_text).valid:
+        return None
+    return poem_text, one_liner.strip().split('\n')[0]
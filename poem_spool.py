@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+import argparse
+import json
+import os
+import threading
+import time
+import uuid
+from pathlib import Path
+
+class PoemSpool:
+    """Persistent on-disk queue of pre-generated, validated poems.
+
+    Each entry is one JSON file in the spool directory (next to poems/). Files
+    are written atomically and claimed with a rename, so several processes can
+    share the same spool safely.
+    """
+
+    STALE_CLAIM_SECONDS = 600
+
+    def __init__(self, repo_path, spool_dir=None):
+        self.spool_dir = Path(spool_dir) if spool_dir else Path(repo_path) / "poem_spool"
+        self.spool_dir.mkdir(exist_ok=True)
+        self._requeue_stale_claims()
+
+    def _requeue_stale_claims(self):
+        """Put back entries claimed by a process that died before using them"""
+        now = time.time()
+        for claimed in self.spool_dir.glob("*.claimed"):
+            try:
+                if now - claimed.stat().st_mtime > self.STALE_CLAIM_SECONDS:
+                    os.replace(claimed, claimed.with_suffix(".json"))
+            except FileNotFoundError:
+                continue
+
+    def _entries(self):
+        """Queued entry files, oldest first"""
+        return sorted(self.spool_dir.glob("*.json"))
+
+    def depth(self):
+        """Number of poems waiting in the spool"""
+        return len(self._entries())
+
+    def push(self, poem_text, themes, one_liner):
+        """Add a validated poem to the end of the queue"""
+        entry = {
+            "poem_text": poem_text,
+            "themes": themes,
+            "one_liner": one_liner,
+            "generated_at": time.time()
+        }
+        name = f"{time.time_ns():020d}_{uuid.uuid4().hex[:8]}"
+        tmp_path = self.spool_dir / f"{name}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(entry, f, ensure_ascii=False)
+        os.replace(tmp_path, self.spool_dir / f"{name}.json")
+
+    def claim(self):
+        """Claim the oldest poem in the queue.
+
+        Returns (claim, (poem_text, themes, one_liner)), or None when empty.
+        The entry stays on disk as a .claimed file until release() (the poem
+        was used) or requeue() (it wasn't); claims left by a process that
+        died are put back into the queue by the next PoemSpool.
+        """
+        for entry_path in self._entries():
+            claimed = entry_path.with_suffix(".claimed")
+            try:
+                os.rename(entry_path, claimed)
+            except FileNotFoundError:
+                # Another process claimed it first
+                continue
+            try:
+                # The rename kept the push time; staleness counts from the claim
+                os.utime(claimed)
+                with open(claimed, "r", encoding="utf-8") as f:
+                    entry = json.load(f)
+            except (OSError, ValueError):
+                claimed.unlink(missing_ok=True)
+                continue
+            return claimed, (entry["poem_text"], entry["themes"], entry["one_liner"])
+        return None
+
+    def release(self, claim):
+        """Drop a claimed entry once its poem has been written"""
+        claim.unlink(missing_ok=True)
+
+    def requeue(self, claim):
+        """Put a claimed entry back at its place in the queue"""
+        try:
+            os.replace(claim, claim.with_suffix(".json"))
+        except FileNotFoundError:
+            pass
+
+class SpoolFiller(threading.Thread):
+    """Background thread keeping the spool topped up to a target depth"""
+
+    def __init__(self, spool, automation, target_depth, poll_interval=30):
+        super().__init__(name="SpoolFiller", daemon=True)
+        self.spool = spool
+        self.automation = automation
+        self.target_depth = target_depth
+        self.poll_interval = poll_interval
+        self._stop_event = threading.Event()
+
+    def fill_once(self):
+        """Generate enough poems to bring the spool back to the target depth"""
+        missing = self.target_depth - self.spool.depth()
+        if missing <= 0:
+            return 0
+        generated = self.automation.generate_poems_concurrently(range(1, missing + 1))
+        for poem_text, themes, one_liner in generated.values():
+            self.spool.push(poem_text, themes, one_liner)
+        self.automation.logger.info(f"Prefetched {len(generated)} poems (spool depth {self.spool.depth()})")
+        return len(generated)
+
+    def run(self):
+        while not self._stop_event.is_set():
+            try:
+                self.fill_once()
+            except Exception as e:
+                self.automation.logger.error(f"Prefetch failed: {str(e)}", exc_info=True)
+            self._stop_event.wait(self.poll_interval)
+
+    def stop(self):
+        self._stop_event.set()
+
+def main():
+    parser = argparse.ArgumentParser(description='Inspect or fill the pre-generated poem spool')
+    parser.add_argument('command', choices=['status', 'fill'],
+                      help='status: show spool depth, fill: top the spool up once')
+    parser.add_argument('--depth', type=int, default=None,
+                      help='Target spool depth for fill (default: PREFETCH_DEPTH or 17)')
+    args = parser.parse_args()
+
+    from config import REPO_PATH, PREFETCH_DEPTH
+
+    if args.command == 'status':
+        print(f"Spool depth: {PoemSpool(REPO_PATH).depth()}")
+        return
+
+    from poem_automation import PoemAutomation
+    automation = PoemAutomation.from_config()
+    depth = args.depth or PREFETCH_DEPTH or 17
+    filler = SpoolFiller(PoemSpool(REPO_PATH), automation, depth)
+    added = filler.fill_once()
+    print(f"Added {added} poems, spool depth: {filler.spool.depth()}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+import argparse
+import datetime
+import json
+import logging
+import os
+from pathlib import Path
+
+BASE_BACKOFF_SECONDS = 30
+MAX_BACKOFF_SECONDS = 1800
+
+class PushOutbox:
+    """Durable record of local commits that still have to reach origin.
+
+    Every local poem commit is queued in push_outbox.json. drain() pushes
+    once for the whole queue when it is due: it holds batch_size commits,
+    or its oldest commit has waited window_seconds. A failed push leaves
+    the queue in place and backs off exponentially instead of retrying in
+    a loop; the next slot, the next run or `push_outbox.py drain` picks it
+    up again.
+    """
+
+    def __init__(self, repo_path, batch_size=1, window_seconds=0, path=None, logger=None):
+        self.repo_path = Path(repo_path)
+        self.path = Path(path) if path else self.repo_path / "push_outbox.json"
+        self.batch_size = max(1, batch_size)
+        self.window = datetime.timedelta(seconds=window_seconds)
+        self.logger = logger or logging.getLogger('PoemAutomation')
+        self.state = self._load()
+
+    def _load(self):
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {"commits": [], "failures": 0, "retry_at": None, "last_push": None}
+
+    def _save(self):
+        tmp_path = self.path.with_suffix(".tmp")
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.state, f, indent=2)
+        os.replace(tmp_path, self.path)
+
+    def add(self, sha, file_path=None, now=None):
+        """Queue a local commit"""
+        now = now or datetime.datetime.now()
+        self.state["commits"].append({
+            "sha": sha,
+            "path": str(Path(file_path).relative_to(self.repo_path)) if file_path else None,
+            "queued_at": now.isoformat(timespec='seconds')
+        })
+        self._save()
+
+    def pending(self):
+        return list(self.state["commits"])
+
+    def next_due(self):
+        """When the queue should next be pushed, or None if it is empty"""
+        commits = self.state["commits"]
+        if not commits:
+            return None
+        if len(commits) >= self.batch_size:
+            due = datetime.datetime.fromisoformat(commits[0]["queued_at"])
+        else:
+            due = datetime.datetime.fromisoformat(commits[0]["queued_at"]) + self.window
+        if self.state["retry_at"]:
+            due = max(due, datetime.datetime.fromisoformat(self.state["retry_at"]))
+        return due
+
+    def due(self, now=None):
+        due = self.next_due()
+        return due is not None and due <= (now or datetime.datetime.now())
+
+    def drain(self, push, force=False, now=None):
+        """Call push() once for everything queued if it's due (or force).
+
+        Returns True when the queue is empty afterwards. push() failing is
+        logged and scheduled for a later retry, never raised.
+        """
+        now = now or datetime.datetime.now()
+        commits = self.state["commits"]
+        if not commits:
+            return True
+        if not force and not self.due(now):
+            return False
+        try:
+            push()
+        except Exception as e:
+            self.state["failures"] += 1
+            delay = min(BASE_BACKOFF_SECONDS * 2 ** (self.state["failures"] - 1), MAX_BACKOFF_SECONDS)
+            self.state["retry_at"] = (now + datetime.timedelta(seconds=delay)).isoformat(timespec='seconds')
+            self._save()
+            self.logger.warning(
+                f"Push of {len(commits)} queued commits failed ({str(e).strip()[:120]}), "
+                f"retrying after {self.state['retry_at']}"
+            )
+            return False
+        self.logger.info(f"Pushed {len(commits)} queued commits")
+        self.state.update({"commits": [], "failures": 0, "retry_at": None,
+                           "last_push": now.isoformat(timespec='seconds')})
+        self._save()
+        return True
+
+def main():
+    parser = argparse.ArgumentParser(description='Show or push the commits waiting in the push outbox')
+    parser.add_argument('command', choices=['status', 'drain'], nargs='?', default='status',
+                      help='status: list queued commits, drain: sync and push them now')
+    args = parser.parse_args()
+
+    from config import REPO_PATH, PUSH_BATCH_SIZE, PUSH_WINDOW_SECONDS
+    if args.command == 'status':
+        outbox = PushOutbox(REPO_PATH, PUSH_BATCH_SIZE, PUSH_WINDOW_SECONDS)
+        for commit in outbox.pending():
+            print(f"{commit['sha'][:10]}  {commit['queued_at']}  {commit['path'] or ''}")
+        print(f"{len(outbox.pending())} commits queued, next push due: {outbox.next_due() or '-'}")
+        print(f"Last push: {outbox.state['last_push'] or '-'}, consecutive failures: {outbox.state['failures']}")
+        return
+
+    from poem_automation import PoemAutomation
+    automation = PoemAutomation.from_config()
+    if automation.push_outbox(force=True):
+        print("Outbox is empty")
+    else:
+        print(f"{len(automation.outbox.pending())} commits still queued")
+
+if __name__ == "__main__":
+    main()
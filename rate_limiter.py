@@ -0,0 +1,280 @@
+#!/usr/bin/env python3
+import argparse
+import asyncio
+import email.utils
+import os
+import sqlite3
+import threading
+import time
+
+import httpx
+
+from scheduler import RealClock
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS buckets (
+    name TEXT PRIMARY KEY,
+    level REAL NOT NULL,
+    updated REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS backoff (
+    name TEXT PRIMARY KEY,
+    until REAL NOT NULL,
+    strikes INTEGER NOT NULL
+);
+"""
+
+CHAT_MAX_ATTEMPTS = 4
+BASE_BACKOFF_SECONDS = 2
+MAX_BACKOFF_SECONDS = 300
+
+def estimate_tokens(message, max_tokens=None):
+    """Rough token cost of a chat call: about 4 characters per prompt token plus the output cap"""
+    return len(message or "") // 4 + 1 + (max_tokens or 0)
+
+def billed_tokens(response):
+    """Input plus output tokens the API billed for a response, or None if it didn't say"""
+    units = getattr(getattr(response, 'meta', None), 'billed_units', None)
+    if units is None:
+        return None
+    return int((units.input_tokens or 0) + (units.output_tokens or 0))
+
+def retry_after_seconds(headers):
+    """Server hint from Retry-After (seconds or HTTP date) or X-RateLimit-Reset headers"""
+    headers = {key.lower(): value for key, value in (headers or {}).items()}
+    value = headers.get('retry-after')
+    if value:
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            parsed = email.utils.parsedate_to_datetime(value)
+            if parsed is not None:
+                return max(0.0, parsed.timestamp() - time.time())
+    value = headers.get('x-ratelimit-reset')
+    if value:
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            pass
+    return None
+
+class RateLimiter:
+    """Token buckets for requests and tokens per minute, shared through SQLite.
+
+    Every process using the same database file draws from the same buckets,
+    so the launchd job, launch.sh and manual runs on one machine stay under
+    the API key's quota together. A 429 sets a shared backoff window from the
+    server's Retry-After hint (or an exponential one) that all callers wait
+    out before their next request. A limit of 0 disables that bucket.
+    Bucket times, waits and retry back-offs all go through `clock` (a
+    scheduler clock), so a VirtualClock skips them in simulations.
+    """
+
+    def __init__(self, db_path, requests_per_minute=20, tokens_per_minute=0, name="cohere", clock=None):
+        self.name = name
+        self.clock = clock or RealClock()
+        self.limits = {}
+        if requests_per_minute:
+            self.limits["requests"] = float(requests_per_minute)
+        if tokens_per_minute:
+            self.limits["tokens"] = float(tokens_per_minute)
+        self.conn = sqlite3.connect(str(db_path), timeout=30, isolation_level=None, check_same_thread=False)
+        self.conn.executescript(SCHEMA)
+        self._lock = threading.Lock()
+
+    def close(self):
+        self.conn.close()
+
+    def _transaction(self, operation):
+        """Run operation(now) inside an exclusive write transaction"""
+        with self._lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                result = operation(self.clock.time())
+            except BaseException:
+                self.conn.execute("ROLLBACK")
+                raise
+            self.conn.execute("COMMIT")
+            return result
+
+    def _level(self, bucket, now):
+        limit = self.limits[bucket]
+        row = self.conn.execute(
+            "SELECT level, updated FROM buckets WHERE name = ?", (f"{self.name}:{bucket}",)
+        ).fetchone()
+        if row is None:
+            return limit
+        return min(limit, row[0] + (now - row[1]) * limit / 60)
+
+    def _store(self, bucket, level, now):
+        self.conn.execute(
+            "INSERT OR REPLACE INTO buckets (name, level, updated) VALUES (?, ?, ?)",
+            (f"{self.name}:{bucket}", level, now)
+        )
+
+    def reserve(self, tokens=0):
+        """Take one request and `tokens` tokens if the buckets allow it.
+
+        Returns 0 when the reservation was made, otherwise the number of
+        seconds to wait before trying again.
+        """
+        def attempt(now):
+            row = self.conn.execute("SELECT until FROM backoff WHERE name = ?", (self.name,)).fetchone()
+            if row and row[0] > now:
+                return row[0] - now
+            # A single call can never need more than a full bucket
+            needs = {"requests": 1, "tokens": tokens}
+            levels = {bucket: self._level(bucket, now) for bucket in self.limits}
+            wait = max(
+                [(min(needs[b], self.limits[b]) - levels[b]) * 60 / self.limits[b] for b in self.limits],
+                default=0
+            )
+            if wait > 0:
+                return wait
+            for bucket, level in levels.items():
+                self._store(bucket, level - needs[bucket], now)
+            return 0
+        return self._transaction(attempt)
+
+    def acquire(self, tokens=0):
+        """Block until a request of `tokens` tokens may be sent; returns seconds waited"""
+        waited = 0.0
+        while True:
+            wait = self.reserve(tokens)
+            if wait <= 0:
+                return waited
+            self.clock.sleep(wait)
+            waited += wait
+
+    async def acquire_async(self, tokens=0):
+        """acquire() for coroutines"""
+        waited = 0.0
+        while True:
+            # reserve() can wait up to 30s on another process's write lock; keep that off the event loop
+            wait = await asyncio.to_thread(self.reserve, tokens)
+            if wait <= 0:
+                return waited
+            await self.clock.sleep_async(wait)
+            waited += wait
+
+    def settle(self, estimated, actual):
+        """Correct the token bucket once the real token count of a call is known"""
+        if "tokens" not in self.limits or actual is None or actual == estimated:
+            return
+        def adjust(now):
+            self._store("tokens", self._level("tokens", now) + estimated - actual, now)
+        self._transaction(adjust)
+
+    def penalize(self, retry_after=None):
+        """Record a 429: every caller waits for the server hint or an exponential backoff.
+
+        Returns the seconds until the shared backoff ends, which may be
+        longer than this 429's own delay if another caller set one already.
+        """
+        def record(now):
+            row = self.conn.execute("SELECT until, strikes FROM backoff WHERE name = ?", (self.name,)).fetchone()
+            until, strikes = row if row else (0.0, 0)
+            delay = retry_after if retry_after is not None else BASE_BACKOFF_SECONDS * 2 ** strikes
+            delay = min(delay, MAX_BACKOFF_SECONDS)
+            until = max(until, now + delay)
+            self.conn.execute(
+                "INSERT OR REPLACE INTO backoff (name, until, strikes) VALUES (?, ?, ?)",
+                (self.name, until, strikes + 1)
+            )
+            # Start the request bucket over so the queue doesn't burst back in
+            if "requests" in self.limits:
+                self._store("requests", 0.0, now)
+            return until - now
+        return self._transaction(record)
+
+    def reward(self):
+        """Record a successful call, resetting the backoff escalation"""
+        def reset(now):
+            self.conn.execute("UPDATE backoff SET strikes = 0 WHERE name = ? AND strikes > 0", (self.name,))
+        self._transaction(reset)
+
+    def retry_delay(self, error, attempt):
+        """How long to wait before retrying a failed call, or None if it shouldn't be retried.
+
+        A 429 is recorded with penalize() and its delay is the shared
+        backoff, so waiting it out leaves nothing for the next acquire().
+        """
+        status = getattr(error, 'status_code', None)
+        if status == 429:
+            return self.penalize(retry_after_seconds(getattr(error, 'headers', None)))
+        if (status is not None and status >= 500) or isinstance(error, (TimeoutError, ConnectionError, httpx.TransportError)):
+            return min(BASE_BACKOFF_SECONDS * 2 ** attempt, MAX_BACKOFF_SECONDS)
+        return None
+
+    def reset(self):
+        """Refill every bucket and clear the backoff"""
+        def clear(now):
+            self.conn.execute("DELETE FROM buckets WHERE name LIKE ?", (f"{self.name}:%",))
+            self.conn.execute("DELETE FROM backoff WHERE name = ?", (self.name,))
+        self._transaction(clear)
+
+    def status(self):
+        """Current bucket levels and backoff, for inspection"""
+        def read(now):
+            levels = {bucket: self._level(bucket, now) for bucket in self.limits}
+            row = self.conn.execute("SELECT until, strikes FROM backoff WHERE name = ?", (self.name,)).fetchone()
+            backoff = max(0.0, row[0] - now) if row else 0.0
+            return levels, backoff, row[1] if row else 0
+        return self._transaction(read)
+
+# Per-call opt-out of the SDK's own retries, so 429s reach the shared limiter
+NO_SDK_RETRIES = {"max_retries": 0}
+
+def limited_chat(limiter, chat, logger, **kwargs):
+    """Call chat(**kwargs) under the limiter, retrying 429s and server errors"""
+    estimated = estimate_tokens(kwargs.get('message'), kwargs.get('max_tokens'))
+    for attempt in range(CHAT_MAX_ATTEMPTS):
+        limiter.acquire(estimated)
+        try:
+            response = chat(request_options=NO_SDK_RETRIES, **kwargs)
+        except Exception as e:
+            delay = limiter.retry_delay(e, attempt)
+            if delay is None or attempt == CHAT_MAX_ATTEMPTS - 1:
+                raise
+            logger.warning(f"Cohere call failed ({str(e).strip()[:80]}), retrying in {delay:.0f}s")
+            limiter.clock.sleep(delay)
+            continue
+        limiter.reward()
+        limiter.settle(estimated, billed_tokens(response))
+        return response
+
+async def limited_chat_async(limiter, chat, logger, **kwargs):
+    """limited_chat() for an AsyncClient's chat"""
+    estimated = estimate_tokens(kwargs.get('message'), kwargs.get('max_tokens'))
+    for attempt in range(CHAT_MAX_ATTEMPTS):
+        await limiter.acquire_async(estimated)
+        try:
+            response = await chat(request_options=NO_SDK_RETRIES, **kwargs)
+        except Exception as e:
+            delay = limiter.retry_delay(e, attempt)
+            if delay is None or attempt == CHAT_MAX_ATTEMPTS - 1:
+                raise
+            logger.warning(f"Cohere call failed ({str(e).strip()[:80]}), retrying in {delay:.0f}s")
+            await limiter.clock.sleep_async(delay)
+            continue
+        limiter.reward()
+        limiter.settle(estimated, billed_tokens(response))
+        return response
+
+def main():
+    parser = argparse.ArgumentParser(description='Show the shared Cohere rate limiter state')
+    parser.add_argument('--reset', action='store_true', help='Refill the buckets and clear any backoff')
+    args = parser.parse_args()
+
+    from config import COHERE_RPM, COHERE_TPM
+    db_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "rate_limits.sqlite")
+    limiter = RateLimiter(db_path, COHERE_RPM, COHERE_TPM)
+    if args.reset:
+        limiter.reset()
+    levels, backoff, strikes = limiter.status()
+    for bucket, level in levels.items():
+        print(f"{bucket}: {level:.1f}/{limiter.limits[bucket]:.0f} available")
+    print(f"Backoff: {backoff:.0f}s remaining ({strikes} consecutive 429s)")
+
+if __name__ == "__main__":
+    main()
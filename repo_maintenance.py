@@ -0,0 +1,245 @@
+#!/usr/bin/env python3
+import argparse
+import datetime
+import json
+import logging
+import os
+import struct
+import subprocess
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+# Thresholds past which a task is due
+LOOSE_OBJECT_LIMIT = 200
+PACK_LIMIT = 10
+LOOSE_REF_LIMIT = 50
+PRUNE_EXPIRE = "2.weeks.ago"
+
+def graph_commit_count(graph_path):
+    """Number of commits in one commit-graph file, from the last entry of its OID fanout"""
+    with open(graph_path, 'rb') as f:
+        header = f.read(8)
+        if header[:4] != b"CGPH":
+            raise ValueError(f"Not a commit-graph file: {graph_path}")
+        chunks = header[6]
+        table = f.read(12 * (chunks + 1))
+        for i in range(chunks):
+            chunk_id, offset = struct.unpack_from(">4sQ", table, 12 * i)
+            if chunk_id == b"OIDF":
+                f.seek(offset + 4 * 255)
+                return struct.unpack(">I", f.read(4))[0]
+    raise ValueError(f"Commit-graph without an OID fanout: {graph_path}")
+
+class RepoMaintenance:
+    """Keeps the object store of this commit-heavy repository in shape.
+
+    health() reads loose object, pack and loose ref counts and how many
+    commits the commit-graph is missing. run() performs only the tasks
+    that are due: git maintenance's loose-objects, incremental-repack and
+    commit-graph tasks, pack-refs, and pruning of old unreachable objects.
+    The scheduler calls run() in idle gaps between poem slots.
+
+    Fetch and push durations go to logs/git_maintenance.jsonl together
+    with the object counts at the time, next to a record of every
+    maintenance run, so report() can compare latency before and after.
+    """
+
+    def __init__(self, repo_path, log_path=None, logger=None):
+        self.repo_path = Path(repo_path)
+        self.log_path = Path(log_path) if log_path else self.repo_path / "logs" / "git_maintenance.jsonl"
+        self.logger = logger or logging.getLogger('PoemAutomation')
+
+    def _git(self, *args, check=True):
+        return subprocess.run(['git', *args], cwd=self.repo_path, capture_output=True, text=True, check=check)
+
+    def _git_dir(self):
+        return self.repo_path / self._git('rev-parse', '--git-dir').stdout.strip()
+
+    def object_counts(self):
+        """git count-objects -v as a dict"""
+        counts = {}
+        for line in self._git('count-objects', '-v').stdout.splitlines():
+            key, _, value = line.partition(':')
+            counts[key.strip()] = int(value.strip() or 0)
+        return counts
+
+    def health(self):
+        """Object store counters and commit-graph freshness"""
+        counts = self.object_counts()
+
+        git_dir = self._git_dir()
+        loose_refs = sum(len(files) for _, _, files in os.walk(git_dir / "refs"))
+        graph_dir = git_dir / "objects" / "info"
+        chain_path = graph_dir / "commit-graphs" / "commit-graph-chain"
+        # Like git, read a single commit-graph file first, else the split chain's layers
+        if (graph_dir / "commit-graph").exists() or not chain_path.exists():
+            layers = [graph_dir / "commit-graph"]
+        else:
+            layers = [chain_path.parent / f"graph-{layer}.graph" for layer in chain_path.read_text().split()]
+        graph_times = [path.stat().st_mtime for path in [*layers, chain_path] if path.exists()]
+        graph_time = max(graph_times) if graph_times else None
+        try:
+            in_graph = sum(graph_commit_count(path) for path in layers)
+        except (OSError, ValueError):
+            in_graph = 0
+        head = self._git('rev-parse', '--verify', '-q', 'HEAD', check=False).stdout.strip()
+        # Counted rather than dated: backfilled and art commits carry past dates
+        reachable = int(self._git('rev-list', '--count', '--all').stdout.strip()) if head else 0
+        stale = max(0, reachable - in_graph)
+
+        health = {
+            "loose_objects": counts.get("count", 0),
+            "loose_kib": counts.get("size", 0),
+            "packs": counts.get("packs", 0),
+            "pack_kib": counts.get("size-pack", 0),
+            "prune_packable": counts.get("prune-packable", 0),
+            "garbage": counts.get("garbage", 0),
+            "loose_refs": loose_refs,
+            "commit_graph_age_s": round(time.time() - graph_time) if graph_time else None,
+            "commits_outside_graph": stale,
+        }
+        return health
+
+    def due_tasks(self, health=None):
+        """Names of the tasks the current health calls for"""
+        health = health or self.health()
+        tasks = []
+        if health["loose_objects"] >= LOOSE_OBJECT_LIMIT or health["prune_packable"]:
+            tasks.append("loose-objects")
+        if health["packs"] >= PACK_LIMIT:
+            tasks.append("incremental-repack")
+        if health["commits_outside_graph"]:
+            tasks.append("commit-graph")
+        if health["loose_refs"] >= LOOSE_REF_LIMIT:
+            tasks.append("pack-refs")
+        if health["garbage"] or "loose-objects" in tasks:
+            tasks.append("prune")
+        return tasks
+
+    def _run_task(self, task):
+        if task == "pack-refs":
+            self._git('pack-refs', '--all')
+        elif task == "prune":
+            self._git('prune', f'--expire={PRUNE_EXPIRE}')
+        else:
+            self._git('-c', 'maintenance.auto=false', 'maintenance', 'run', f'--task={task}')
+
+    def run(self, tasks=None):
+        """Run the given or due tasks; returns the names of the tasks that ran"""
+        before = self.health()
+        tasks = self.due_tasks(before) if tasks is None else tasks
+        if not tasks:
+            return []
+        start = time.perf_counter()
+        done = []
+        for task in tasks:
+            try:
+                self._run_task(task)
+                done.append(task)
+            except (OSError, subprocess.CalledProcessError) as e:
+                stderr = getattr(e, 'stderr', '') or str(e)
+                self.logger.error(f"Repository maintenance task {task} failed: {stderr.strip()}")
+        seconds = time.perf_counter() - start
+        after = self.health()
+        self._record({"op": "maintenance", "tasks": done, "seconds": round(seconds, 3),
+                      "before": before, "after": after})
+        self.logger.info(
+            f"Repository maintenance ({', '.join(done) or 'nothing'}) took {seconds:.1f}s: "
+            f"{before['loose_objects']} -> {after['loose_objects']} loose objects, "
+            f"{before['packs']} -> {after['packs']} packs"
+        )
+        return done
+
+    def run_idle(self):
+        """Idle-slot hook: run whatever is due, never raising"""
+        try:
+            return self.run()
+        except Exception as e:
+            self.logger.error(f"Repository maintenance failed: {str(e)}")
+            return []
+
+    @contextmanager
+    def timed(self, op):
+        """Record how long the wrapped fetch or push took, with the object counts at the time"""
+        start = time.perf_counter()
+        ok = False
+        try:
+            yield
+            ok = True
+        finally:
+            seconds = time.perf_counter() - start
+            try:
+                counts = self.object_counts()
+            except (OSError, subprocess.CalledProcessError):
+                counts = {}
+            self._record({"op": op, "seconds": round(seconds, 3), "ok": ok,
+                          "loose_objects": counts.get("count"), "packs": counts.get("packs")})
+
+    def _record(self, entry):
+        entry = {"time": datetime.datetime.now().isoformat(timespec='seconds'), **entry}
+        try:
+            self.log_path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.log_path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(entry) + "\n")
+        except OSError as e:
+            self.logger.error(f"Could not record git timing: {str(e)}")
+
+    def records(self):
+        try:
+            with open(self.log_path, 'r', encoding='utf-8') as f:
+                return [json.loads(line) for line in f if line.strip()]
+        except OSError:
+            return []
+
+    def report(self):
+        """Mean fetch and push seconds before and after each maintenance run"""
+        rows = []
+        timings = {}
+        last = None
+        for record in self.records():
+            if record["op"] == "maintenance":
+                rows.append((last, record, timings))
+                timings = {}
+                last = record
+            elif record.get("ok", True):
+                timings.setdefault(record["op"], []).append(record["seconds"])
+        rows.append((last, None, timings))
+        return rows
+
+def _mean(values):
+    return f"{sum(values) / len(values):.2f}s" if values else "-"
+
+def main():
+    parser = argparse.ArgumentParser(description='Check and maintain the repository object store')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    subparsers.add_parser('status', help='Show object store health and the tasks that are due')
+    run_parser = subparsers.add_parser('run', help='Run the due maintenance tasks')
+    run_parser.add_argument('--task', action='append', default=None,
+                            choices=['loose-objects', 'incremental-repack', 'commit-graph', 'pack-refs', 'prune'],
+                            help='Run this task even if it is not due (repeatable)')
+    subparsers.add_parser('report', help='Fetch and push latency between maintenance runs')
+    args = parser.parse_args()
+
+    maintenance = RepoMaintenance(os.path.dirname(os.path.abspath(__file__)))
+    if args.command == 'status':
+        health = maintenance.health()
+        for key, value in health.items():
+            print(f"{key}: {value}")
+        print(f"Due: {', '.join(maintenance.due_tasks(health)) or 'nothing'}")
+    elif args.command == 'run':
+        logging.basicConfig(level=logging.INFO, format='%(message)s')
+        done = maintenance.run(args.task)
+        print(f"Ran: {', '.join(done) or 'nothing was due'}")
+    else:
+        for previous, maintenance_run, timings in maintenance.report():
+            since = previous["time"] if previous else "start"
+            until = maintenance_run["time"] if maintenance_run else "now"
+            print(f"{since} .. {until}: fetch {_mean(timings.get('fetch', []))} "
+                  f"({len(timings.get('fetch', []))}), push {_mean(timings.get('push', []))} "
+                  f"({len(timings.get('push', []))})")
+            if maintenance_run:
+                print(f"  maintenance: {', '.join(maintenance_run['tasks'])} in {maintenance_run['seconds']}s")
+
+if __name__ == "__main__":
+    main()
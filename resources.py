@@ -0,0 +1,116 @@
+import datetime
+import logging
+import threading
+from logging.handlers import RotatingFileHandler
+from pathlib import Path
+
+class ResourceRegistry:
+    """Process-wide cache of expensive resources.
+
+    Every PoemAutomation in a process borrows the same API client, repo
+    handle, databases and log handlers from here, so building a second
+    instance (as daily_automation.py does) costs next to nothing and log
+    lines are written once.
+    """
+
+    def __init__(self):
+        self._resources = {}
+        self._lock = threading.RLock()
+
+    def get(self, key, factory):
+        """Return the resource stored under key, creating it with factory() on first use"""
+        with self._lock:
+            if key not in self._resources:
+                self._resources[key] = factory()
+            return self._resources[key]
+
+    def clear(self):
+        """Forget every resource (closing the ones that can be closed)"""
+        with self._lock:
+            for resource in self._resources.values():
+                close = getattr(resource, 'close', None)
+                if callable(close):
+                    try:
+                        close()
+                    except Exception:
+                        pass
+            self._resources.clear()
+
+    def cohere_client(self, api_key, base_url=None):
+        """One Cohere client per key and endpoint, reusing its HTTP connections"""
+        def create():
+            import httpx
+            from cohere import Client
+            # Keep connections around between the spaced-out poem slots
+            http_client = httpx.Client(
+                timeout=300,
+                limits=httpx.Limits(max_keepalive_connections=4, keepalive_expiry=120)
+            )
+            return Client(api_key, base_url=base_url, httpx_client=http_client,
+                          log_warning_experimental_features=False)
+        return self.get(("cohere", api_key, base_url), create)
+
+    def repo(self, repo_path):
+        """One git.Repo handle per repository"""
+        def create():
+            import git
+            return git.Repo(repo_path)
+        return self.get(("repo", str(Path(repo_path).resolve())), create)
+
+    def logger(self, repo_path, name='PoemAutomation', prefix='poem_automation', error_log=True):
+        """A logger writing to repo_path/logs, configured once per process.
+
+        Configuring the same logger for another repository replaces its
+        handlers instead of adding more.
+        """
+        logs_dir = Path(repo_path) / "logs"
+        with self._lock:
+            logger = logging.getLogger(name)
+            key = ("logger", name)
+            if self._resources.get(key) == logs_dir:
+                return logger
+            for handler in list(logger.handlers):
+                logger.removeHandler(handler)
+                handler.close()
+            self._configure_logger(logger, logs_dir, prefix, error_log)
+            self._resources[key] = logs_dir
+        logger.info("Logging initialized successfully")
+        return logger
+
+    @staticmethod
+    def _configure_logger(logger, logs_dir, prefix, error_log):
+        logs_dir.mkdir(exist_ok=True)
+        timestamp = datetime.datetime.now().strftime("%Y-%m-%d")
+        logger.setLevel(logging.INFO)
+
+        # Rotating file handler for main log (max 10MB per file, keep 5 backup files)
+        main_handler = RotatingFileHandler(
+            logs_dir / f"{prefix}_{timestamp}.log",
+            maxBytes=10*1024*1024,  # 10MB
+            backupCount=5,
+            encoding='utf-8'
+        )
+        main_handler.setLevel(logging.INFO)
+        main_handler.setFormatter(logging.Formatter('%(asctime)s - %(levelname)s - %(message)s'))
+        logger.addHandler(main_handler)
+
+        # Rotating file handler for error log
+        if error_log:
+            error_handler = RotatingFileHandler(
+                logs_dir / f"{prefix}_error_{timestamp}.log",
+                maxBytes=10*1024*1024,  # 10MB
+                backupCount=5,
+                encoding='utf-8'
+            )
+            error_handler.setLevel(logging.ERROR)
+            error_handler.setFormatter(logging.Formatter('%(asctime)s - %(levelname)s - %(message)s\n%(exc_info)s'))
+            logger.addHandler(error_handler)
+
+        # Console handler
+        console_handler = logging.StreamHandler()
+        console_handler.setLevel(logging.INFO)
+        console_handler.setFormatter(logging.Formatter('%(message)s'))
+        logger.addHandler(console_handler)
+
+# The registry shared by everything in this process
+REGISTRY = ResourceRegistry()
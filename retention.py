@@ -0,0 +1,314 @@
+#!/usr/bin/env python3
+import argparse
+import datetime
+import gzip
+import json
+import logging
+import os
+import re
+import shutil
+from pathlib import Path
+
+from poem_archive import PoemArchive, remove_empty_folders
+from poem_index import folder_for_date
+
+ACTIONS = ("keep", "archive", "delete")
+LOG_DATE_PATTERN = re.compile(r"_(\d{4}-\d{2}-\d{2})\.log")
+DAY_FOLDER_PATTERN = re.compile(r"^\d{4}/\d{2}_[^/]+/\d{2}_[^/]+$")
+# Append-only record logs; their old records are trimmed instead of expiring the whole file
+JSONL_LOGS = ("git_maintenance.jsonl", "poem_metrics.jsonl")
+
+class RetentionPolicy:
+    """What to do with one kind of entry once it is older than keep_days.
+
+    target is "poems" (day folders under poems/) or "logs" (files under
+    logs/). action is "keep" (leave it alone), "archive" (move it into
+    archive/: day folders into their monthly poem pack, logs gzipped) or
+    "delete". The JSONL record logs in JSONL_LOGS lose only their records
+    older than keep_days. Archiving or deleting poems only changes the
+    working tree; the commits stay in git history.
+    """
+
+    def __init__(self, target, action="keep", keep_days=30):
+        if target not in RetentionEngine.TARGETS:
+            raise ValueError(f"Unknown retention target: {target}")
+        if action not in ACTIONS:
+            raise ValueError(f"Retention action must be one of {', '.join(ACTIONS)}, not {action}")
+        self.target = target
+        self.action = action
+        # Today's entries are never expired
+        self.keep_days = max(1, int(keep_days))
+
+    def cutoff(self, today):
+        """Last date whose entries are expired"""
+        return today - datetime.timedelta(days=self.keep_days)
+
+    def __repr__(self):
+        return f"RetentionPolicy({self.target!r}, {self.action!r}, keep_days={self.keep_days})"
+
+def default_policies(poem_action="keep", poem_days=30, log_action="delete", log_days=7):
+    """Poems are kept unless configured otherwise; logs go after a week"""
+    return [RetentionPolicy("poems", poem_action, poem_days), RetentionPolicy("logs", log_action, log_days)]
+
+def policies_from_config():
+    """Policies set through the POEM_RETENTION* and LOG_RETENTION* settings"""
+    from config import POEM_RETENTION, POEM_RETENTION_DAYS, LOG_RETENTION, LOG_RETENTION_DAYS
+    return default_policies(POEM_RETENTION, POEM_RETENTION_DAYS, LOG_RETENTION, LOG_RETENTION_DAYS)
+
+class RetentionEngine:
+    """Applies retention policies at most once a day.
+
+    Each policy keeps a watermark, the last date it has already processed,
+    in retention_state.json. A run only looks at the dates between the
+    watermark and the new cutoff, so day folders are found by computing
+    their paths instead of walking the whole poems/ tree. Changing a
+    policy's action resets its watermark.
+    """
+
+    TARGETS = ("poems", "logs")
+
+    def __init__(self, repo_path, policies=None, state_path=None, logger=None):
+        self.repo_path = Path(repo_path)
+        self.policies = default_policies() if policies is None else policies
+        self.state_path = Path(state_path) if state_path else self.repo_path / "retention_state.json"
+        self.archive_dir = self.repo_path / "archive"
+        self.logger = logger or logging.getLogger('PoemAutomation')
+        self.state = self._load_state()
+
+    def _load_state(self):
+        try:
+            with open(self.state_path, 'r') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {"last_run": None, "watermarks": {}}
+
+    def _save_state(self):
+        tmp_path = self.state_path.with_suffix(".tmp")
+        with open(tmp_path, 'w') as f:
+            json.dump(self.state, f, indent=2)
+        os.replace(tmp_path, self.state_path)
+
+    def watermark(self, policy):
+        """Last date the policy has processed with its current action, or None"""
+        mark = self.state["watermarks"].get(policy.target)
+        if not mark or mark.get("action") != policy.action:
+            return None
+        return datetime.date.fromisoformat(mark["through"])
+
+    def due(self, today=None):
+        """True unless retention already ran today with the current policies"""
+        today = today or datetime.date.today()
+        if self.state.get("last_run") != today.isoformat():
+            return True
+        return any(self.watermark(policy) is None for policy in self.policies)
+
+    def run(self, today=None, force=False, dry_run=False):
+        """Apply every policy once for today.
+
+        Returns {target: [expired paths]}, or None when retention already
+        ran today. A dry run reports without changing anything.
+        """
+        today = today or datetime.date.today()
+        if not force and not self.due(today):
+            return None
+
+        results = {}
+        for policy in self.policies:
+            cutoff = policy.cutoff(today)
+            since = self.watermark(policy)
+            if since is not None and since >= cutoff:
+                results[policy.target] = []
+                continue
+            # Keeping entries needs no look at them at all
+            expired = [] if policy.action == "keep" else self._expired(policy.target, since, cutoff)
+            if not dry_run:
+                for path in expired:
+                    self._apply(policy, path, cutoff)
+                self.state["watermarks"][policy.target] = {"action": policy.action, "through": cutoff.isoformat()}
+            results[policy.target] = expired
+
+        if not dry_run:
+            self.state["last_run"] = today.isoformat()
+            self._save_state()
+        return results
+
+    def _expired(self, target, since, cutoff):
+        if target == "poems":
+            return self._expired_day_folders(since, cutoff)
+        return self._expired_logs(since, cutoff)
+
+    def _expired_day_folders(self, since, cutoff):
+        """Day folders dated after since and up to cutoff"""
+        poems_dir = self.repo_path / "poems"
+        if since is None:
+            # First run of this policy: one walk of the tree, later runs only step through new days
+            folders = []
+            for folder in sorted(poems_dir.glob("*/*/*")):
+                if not folder.is_dir() or not DAY_FOLDER_PATTERN.match(folder.relative_to(poems_dir).as_posix()):
+                    continue
+                date = folder_date(folder)
+                if date is not None and date <= cutoff:
+                    folders.append(folder)
+            return folders
+        folders = []
+        date = since + datetime.timedelta(days=1)
+        while date <= cutoff:
+            folder = folder_for_date(self.repo_path, date)
+            if folder.is_dir():
+                folders.append(folder)
+            date += datetime.timedelta(days=1)
+        return folders
+
+    def _expired_logs(self, since, cutoff):
+        """Log files dated after since and up to cutoff (by name, or by mtime without a date).
+
+        JSONL record logs are listed whenever their first record is dated
+        up to cutoff, whatever the watermark says.
+        """
+        logs_dir = self.repo_path / "logs"
+        if not logs_dir.is_dir():
+            return []
+        expired = []
+        for entry in os.scandir(logs_dir):
+            if entry.name in JSONL_LOGS:
+                date = first_record_date(entry.path)
+                if date is not None and date <= cutoff:
+                    expired.append(Path(entry.path))
+                continue
+            if not entry.is_file() or ".log" not in entry.name:
+                continue
+            match = LOG_DATE_PATTERN.search(entry.name)
+            if match:
+                date = datetime.date.fromisoformat(match.group(1))
+            else:
+                date = datetime.date.fromtimestamp(entry.stat().st_mtime)
+            if date <= cutoff and (since is None or date > since or not match):
+                expired.append(Path(entry.path))
+        return sorted(expired)
+
+    def _apply(self, policy, path, cutoff):
+        try:
+            if path.name in JSONL_LOGS:
+                self.trim_records(policy, path, cutoff)
+                self.logger.info(f"Trimmed records up to {cutoff} from {path.relative_to(self.repo_path)}")
+            elif policy.action == "archive":
+                self.archive(policy.target, path)
+                self.logger.info(f"Archived {path.relative_to(self.repo_path)}")
+            else:
+                remove(path)
+                self.logger.info(f"Removed {path.relative_to(self.repo_path)}")
+            if policy.target == "poems":
+                remove_empty_folders(path.parent, self.repo_path / "poems")
+        except Exception as e:
+            self.logger.error(f"Retention failed for {path}: {str(e)}")
+
+    def archive(self, target, path):
+        """Move a day folder into its month's poem pack, or gzip a log file into archive/"""
+        if target == "poems":
+            PoemArchive(self.repo_path).pack_days([path])
+            return
+        destination = self.archive_dir / path.relative_to(self.repo_path)
+        destination = destination.with_name(destination.name + ".gz")
+        destination.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, 'rb') as source, gzip.open(destination, 'wb') as packed:
+            shutil.copyfileobj(source, packed)
+        remove(path)
+
+    def trim_records(self, policy, path, cutoff):
+        """Drop a JSONL log's records dated up to cutoff, gzipping them into archive/ first when archiving"""
+        archive_path = None
+        if policy.action == "archive":
+            archive_path = self.archive_dir / path.relative_to(self.repo_path)
+            archive_path = archive_path.with_name(archive_path.name + ".gz")
+        if path.name == "poem_metrics.jsonl":
+            # The metrics export tracks a byte offset into this file
+            from stage_metrics import StageMetrics
+            return StageMetrics(self.repo_path, logs_dir=path.parent, logger=self.logger).trim(cutoff, archive_path)
+        return trim_jsonl(path, cutoff, archive_path)
+
+def first_record_date(path):
+    """Date of the first record of a JSONL log, or None if it has none"""
+    try:
+        with open(path, 'rb') as f:
+            return record_date(f.readline())
+    except OSError:
+        return None
+
+def record_date(line):
+    try:
+        return datetime.date.fromisoformat(json.loads(line)["time"][:10])
+    except (ValueError, KeyError, TypeError):
+        return None
+
+def trim_jsonl(path, cutoff, archive_path=None):
+    """Remove the leading records dated up to cutoff from an append-only JSONL log.
+
+    Records are appended in time order, so the expired ones form a prefix;
+    lines that don't parse inside it go too. With archive_path they are
+    appended to that gzip file first. Returns the number of bytes removed.
+    """
+    path = Path(path)
+    with open(path, 'rb') as f:
+        data = f.read()
+    end = 0
+    for line in data.splitlines(keepends=True):
+        if not line.endswith(b"\n"):
+            break
+        date = record_date(line)
+        if date is not None and date > cutoff:
+            break
+        end += len(line)
+    if not end:
+        return 0
+    if archive_path:
+        archive_path.parent.mkdir(parents=True, exist_ok=True)
+        with gzip.open(archive_path, 'ab') as packed:
+            packed.write(data[:end])
+    tmp_path = path.with_name(path.name + ".tmp")
+    with open(tmp_path, 'wb') as f:
+        f.write(data[end:])
+        # Keep whatever another process appended since the read
+        with open(path, 'rb') as current:
+            current.seek(len(data))
+            shutil.copyfileobj(current, f)
+    os.replace(tmp_path, path)
+    return end
+
+def folder_date(folder):
+    """Date of a poems/YYYY/MM_Month/DD_Weekday folder, or None if it isn't one"""
+    try:
+        return datetime.date(int(folder.parent.parent.name), int(folder.parent.name.split('_')[0]),
+                             int(folder.name.split('_')[0]))
+    except ValueError:
+        return None
+
+def remove(path):
+    if path.is_dir():
+        shutil.rmtree(path)
+    else:
+        path.unlink()
+
+def main():
+    parser = argparse.ArgumentParser(description='Apply the poem and log retention policies')
+    parser.add_argument('--force', action='store_true', help='Run even if retention already ran today')
+    parser.add_argument('--dry-run', action='store_true', help='Only list what would expire')
+    args = parser.parse_args()
+
+    from config import REPO_PATH
+    policies = policies_from_config()
+    engine = RetentionEngine(REPO_PATH, policies)
+    for policy in policies:
+        mark = engine.watermark(policy)
+        print(f"{policy.target}: {policy.action} after {policy.keep_days} days, processed through {mark or 'never'}")
+
+    results = engine.run(force=args.force, dry_run=args.dry_run)
+    if results is None:
+        print(f"Retention already ran today ({engine.state['last_run']}); use --force to run again")
+        return
+    for target, expired in results.items():
+        print(f"{target}: {len(expired)} expired{' (dry run)' if args.dry_run else ''}")
+        for path in expired:
+            print(f"  {path.relative_to(engine.repo_path)}")
+
+if __name__ == "__main__":
+    main()
@@ -1,19 +1,20 @@
 #!/usr/bin/env python3
 import argparse
 from poem_automation import PoemAutomation
-from config import COHERE_API_KEY, REPO_PATH
+from config import REPO_PATH
 import time
 
-def run_poem_generation(num_poems=2, delay_minutes=1):
+def run_poem_generation(num_poems=2, delay_minutes=1, batch=False):
     """
     Run poem generation with configurable parameters
     
     Args:
         num_poems (int): Number of poems to generate (default: 2)
         delay_minutes (int): Delay between poems in minutes (default: 1)
+        batch (bool): Sync once, commit all poems locally and push once at the end
     """
     # Create automation instance
-    automation = PoemAutomation(COHERE_API_KEY, REPO_PATH)
+    automation = PoemAutomation.from_config()
     
     print(f"Starting poem generation for {num_poems} poems...")
     
@@ -22,6 +23,8 @@ def run_poem_generation(num_poems=2, delay_minutes=1):
         folder_path = automation.get_or_create_daily_folder()
         print(f"\nUsing folder: {folder_path}")
         
+        created_files = []
+        
         # Generate specified number of poems
         for i in range(num_poems):
             print(f"\nGenerating poem {i + 1}/{num_poems}...")
@@ -37,17 +40,31 @@ def run_poem_generation(num_poems=2, delay_minutes=1):
                 print("-" * 50)
                 
                 # Commit and push to git
-                automation.git_commit_and_push(file_path)
-                print(f"Pushed poem {i + 1} to git")
+                if batch:
+                    created_files.append(file_path)
+                else:
+                    automation.git_commit_and_push(file_path)
+                    print(f"Committed poem {i + 1}, {len(automation.outbox.pending())} commits waiting to be pushed")
             
             # Delay between poems (unless it's the last poem)
             if i < num_poems - 1:
                 print(f"\nWaiting {delay_minutes} minutes before next poem...")
                 time.sleep(delay_minutes * 60)
+        
+        if created_files:
+            automation.git_commit_and_push_batch(created_files)
+        
+        automation.sync_git_index()
+        
+        # Push anything the outbox is still holding back
+        if not automation.push_outbox(force=True):
+            print(f"{len(automation.outbox.pending())} commits stay queued; run push_outbox.py drain to retry")
             
     except Exception as e:
         print(f"Error during generation: {str(e)}")
         raise
+    finally:
+        automation.metrics.export_quietly()
 
 def main():
     parser = argparse.ArgumentParser(description='Generate and commit poems')
@@ -55,9 +72,20 @@ def main():
                       help='Number of poems to generate (default: 2)')
     parser.add_argument('--delay', type=int, default=1,
                       help='Delay between poems in minutes (default: 1)')
+    parser.add_argument('--batch', action='store_true',
+                      help='Commit all poems locally and push them once at the end')
+    parser.add_argument('--profile', action='store_true',
+                      help='Run under cProfile and tracemalloc; reports go to logs/')
+    parser.add_argument('--profile-top', type=int, default=20,
+                      help='Entries per list in the profile summary (default: 20)')
     
     args = parser.parse_args()
-    run_poem_generation(args.poems, args.delay)
+    if args.profile:
+        from run_profiler import RunProfiler
+        with RunProfiler(REPO_PATH, "run_poems", top=args.profile_top):
+            run_poem_generation(args.poems, args.delay, args.batch)
+        return
+    run_poem_generation(args.poems, args.delay, args.batch)
 
 if __name__ == "__main__":
     main() 
\ No newline at end of file
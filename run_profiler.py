@@ -0,0 +1,197 @@
+import cProfile
+import datetime
+import functools
+import io
+import pstats
+import threading
+import time
+import tracemalloc
+from pathlib import Path
+
+# PoemAutomation methods that make up each stage; only the outermost call is
+# measured, so a one-liner generated while formatting counts as formatting
+STAGES = {
+    "folder setup and cleanup": ("get_or_create_daily_folder",),
+    "generation": ("generate_poems_concurrently", "generate_structured_poem", "generate_poem"),
+    "formatting": ("format_poem_content",),
+    "git sync": ("git_sync", "git_commit_local", "push_outbox", "sync_git_index"),
+}
+
+class RunProfiler:
+    """cProfile and tracemalloc around a whole run, broken down by stage.
+
+    "startup" runs from start() to the first stage: importing and
+    constructing PoemAutomation, opening the index and so on. The other
+    stages are timed by wrapping the PoemAutomation methods in STAGES for
+    the duration of the run. Every call adds its net and peak traced
+    memory to its stage; the first call of each stage is also bracketed by
+    tracemalloc snapshots, whose difference gives the stage's allocation
+    sites. Comparing snapshots of a large heap takes seconds, so it is done
+    once per stage and with cProfile paused; that time is reported
+    separately and left out of the stage times.
+
+    stop() writes logs/profile_<name>_<time>.prof (for pstats or snakeviz)
+    and a _memory.txt report, and prints a top-N summary. Only the thread
+    that started the profiler is profiled; the prefetch thread isn't.
+    """
+
+    def __init__(self, repo_path, name, top=20, logs_dir=None):
+        self.repo_path = Path(repo_path)
+        self.name = name
+        self.top = top
+        self.logs_dir = Path(logs_dir) if logs_dir else self.repo_path / "logs"
+        self.stages = {}
+        self.profile = None
+        self._originals = []
+        self._active = None
+        self._thread = None
+        self.overhead = 0.0
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+        return False
+
+    def start(self):
+        tracemalloc.start()
+        self._thread = threading.current_thread()
+        self._started = time.perf_counter()
+        self._active = ("startup", self._started, 0, tracemalloc.take_snapshot())
+        self.profile = cProfile.Profile()
+        self.profile.enable()
+        # Imported while profiling, so the import counts towards startup
+        from poem_automation import PoemAutomation
+        self._wrap(PoemAutomation)
+
+    def _wrap(self, cls):
+        for stage, names in STAGES.items():
+            for name in names:
+                original = cls.__dict__[name]
+                self._originals.append((cls, name, original))
+                setattr(cls, name, self._stage_method(stage, original))
+
+    def _stage_method(self, stage, original):
+        profiler = self
+
+        @functools.wraps(original)
+        def wrapper(*args, **kwargs):
+            if threading.current_thread() is not profiler._thread or \
+                    (profiler._active and profiler._active[0] != "startup"):
+                return original(*args, **kwargs)
+            profiler._enter(stage)
+            try:
+                return original(*args, **kwargs)
+            finally:
+                profiler._exit()
+        return wrapper
+
+    def _enter(self, stage):
+        self.profile.disable()
+        if self._active:
+            # The first stage ends startup
+            self._close()
+        snapshot = None
+        if stage not in self.stages:
+            overhead_start = time.perf_counter()
+            snapshot = tracemalloc.take_snapshot()
+            self.overhead += time.perf_counter() - overhead_start
+        tracemalloc.reset_peak()
+        self._active = (stage, time.perf_counter(), tracemalloc.get_traced_memory()[0], snapshot)
+        self.profile.enable()
+
+    def _exit(self):
+        self.profile.disable()
+        self._close()
+        self.profile.enable()
+
+    def _close(self):
+        """Add the active stage's time and allocations to its totals"""
+        stage, started, traced, before = self._active
+        seconds = time.perf_counter() - started
+        current, peak = tracemalloc.get_traced_memory()
+        self._active = None
+
+        totals = self.stages.setdefault(stage, {"calls": 0, "seconds": 0.0, "net": 0, "peak": 0, "sites": {}})
+        totals["calls"] += 1
+        totals["seconds"] += seconds
+        totals["net"] += current - traced
+        totals["peak"] = max(totals["peak"], peak)
+        if before is None:
+            return
+        overhead_start = time.perf_counter()
+        for stat in tracemalloc.take_snapshot().compare_to(before, 'lineno'):
+            site = stat.traceback[0]
+            # Leave out the snapshots themselves
+            if stat.size_diff and site.filename != tracemalloc.__file__:
+                totals["sites"][str(site)] = (stat.size_diff, stat.count_diff)
+        self.overhead += time.perf_counter() - overhead_start
+
+    def stop(self):
+        """Stop profiling, write the .prof and memory reports and print the summary"""
+        self.profile.disable()
+        if self._active:
+            self._close()
+        for cls, name, original in self._originals:
+            setattr(cls, name, original)
+        self._originals = []
+        wall = time.perf_counter() - self._started
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+        stamp = datetime.datetime.now().strftime('%Y-%m-%d_%H%M%S')
+        self.logs_dir.mkdir(parents=True, exist_ok=True)
+        prof_path = self.logs_dir / f"profile_{self.name}_{stamp}.prof"
+        memory_path = self.logs_dir / f"profile_{self.name}_{stamp}_memory.txt"
+        self.profile.dump_stats(prof_path)
+        with open(memory_path, 'w', encoding='utf-8') as f:
+            f.write(self.memory_report(self.top))
+
+        print(f"\n{'=' * 50}")
+        print(f"Profile of {self.name}: {wall:.2f}s wall ({self.overhead:.2f}s of it tracemalloc snapshots), "
+              f"{peak / 1024 / 1024:.1f} MiB peak traced memory")
+        print(f"{'=' * 50}")
+        print(self.stage_table())
+        print(f"\nTop {self.top} functions by cumulative time:")
+        print(self.function_stats(self.top))
+        print(f"\nTop {self.top} functions by own time:")
+        print(self.function_stats(self.top, sort='tottime'))
+        print("\nPoemAutomation methods by cumulative time:")
+        print(self.function_stats(self.top, restriction=r'poem_automation\.py'))
+        print()
+        print(f"Top allocation sites per stage are in {memory_path}")
+        print(f"Profile written to {prof_path} (python -m pstats {prof_path.name})")
+        return prof_path, memory_path
+
+    def stage_table(self):
+        lines = [f"{'stage':26} {'calls':>6} {'wall s':>9} {'net KiB':>10} {'peak KiB':>10}"]
+        for stage in ["startup", *STAGES]:
+            totals = self.stages.get(stage)
+            if totals:
+                lines.append(f"{stage:26} {totals['calls']:>6} {totals['seconds']:>9.3f} "
+                             f"{totals['net'] / 1024:>10.1f} {totals['peak'] / 1024:>10.1f}")
+        return "\n".join(lines)
+
+    def function_stats(self, top, sort='cumulative', restriction=None):
+        """pstats listing, optionally restricted to files matching a regex"""
+        stream = io.StringIO()
+        stats = pstats.Stats(self.profile, stream=stream).strip_dirs().sort_stats(sort)
+        stats.print_stats(*([restriction] if restriction else []), top)
+        # Skip pstats' header lines
+        text = stream.getvalue()
+        return (text[text.find("   ncalls"):] if "   ncalls" in text else text).rstrip()
+
+    def memory_report(self, top):
+        """Per stage: time, net and peak traced memory, and the top allocation sites"""
+        lines = [f"Allocation report for {self.name}", "", self.stage_table()]
+        for stage in ["startup", *STAGES]:
+            totals = self.stages.get(stage)
+            if not totals:
+                continue
+            lines += ["", f"{stage} ({', '.join(STAGES.get(stage, ())) or 'imports and setup'}), first call:"]
+            sites = sorted(totals["sites"].items(), key=lambda item: abs(item[1][0]), reverse=True)
+            for site, (size, count) in sites[:top]:
+                lines.append(f"  {size / 1024:>+10.1f} KiB {count:>+8} blocks  {site}")
+        return "\n".join(lines) + "\n"
@@ -0,0 +1,343 @@
+#!/usr/bin/env python3
+import argparse
+import asyncio
+import datetime
+import heapq
+import itertools
+import json
+import os
+import time
+from pathlib import Path
+
+from poem_index import date_from_folder
+
+MAX_SLOT_ATTEMPTS = 3
+# Gaps between events at least this long get repository maintenance first
+IDLE_MAINTENANCE_SECONDS = 120
+
+class RealClock:
+    """Wall clock; waiting really sleeps.
+
+    time(), sleep() and sleep_async() make a clock usable wherever the time
+    module was used, e.g. the rate limiter's buckets and retry back-offs.
+    """
+
+    def now(self):
+        return datetime.datetime.now()
+
+    def sleep_until(self, when):
+        remaining = (when - self.now()).total_seconds()
+        if remaining > 0:
+            time.sleep(remaining)
+
+    def time(self):
+        return time.time()
+
+    def sleep(self, seconds):
+        time.sleep(seconds)
+
+    async def sleep_async(self, seconds):
+        await asyncio.sleep(seconds)
+
+class VirtualClock:
+    """Clock that jumps straight to the next event, for simulations and dry runs"""
+
+    def __init__(self, start=None):
+        self.start = start or datetime.datetime.now()
+        self.current = self.start
+        # Seconds skipped by sleep() (retry back-offs and rate limit waits)
+        self.slept = 0.0
+
+    def now(self):
+        return self.current
+
+    def sleep_until(self, when):
+        if when > self.current:
+            self.current = when
+
+    def time(self):
+        return self.current.timestamp()
+
+    def sleep(self, seconds):
+        seconds = max(0.0, seconds)
+        self.slept += seconds
+        self.current += datetime.timedelta(seconds=seconds)
+
+    async def sleep_async(self, seconds):
+        self.sleep(seconds)
+        # Still give the other tasks a turn
+        await asyncio.sleep(0)
+
+    def elapsed(self):
+        return (self.current - self.start).total_seconds()
+
+class DayPlan:
+    """The poem slots of one day and how far each of them got.
+
+    Slots are dicts with the poem number, its due time (ISO format), a status
+    of pending, done or failed, and the number of attempts made.
+    """
+
+    def __init__(self, date, total, slots):
+        self.date = date
+        self.total = total
+        self.slots = slots
+
+    @classmethod
+    def create(cls, date, total, first_due, interval, done_numbers=()):
+        """Spread the not yet written poems of a day from first_due, one per interval"""
+        slots = []
+        pending = 0
+        for number in range(1, total + 1):
+            if number in done_numbers:
+                slots.append({"number": number, "due": None, "status": "done", "attempts": 0})
+                continue
+            due = first_due + interval * pending
+            pending += 1
+            slots.append({"number": number, "due": due.isoformat(), "status": "pending", "attempts": 0})
+        return cls(date, total, slots)
+
+    @classmethod
+    def load(cls, plan_path):
+        """Read a saved plan, or None if there is no usable one"""
+        try:
+            with open(plan_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            return cls(data["date"], data["total"], data["slots"])
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def save(self, plan_path):
+        plan_path = Path(plan_path)
+        tmp_path = plan_path.with_suffix(".tmp")
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({"date": self.date, "total": self.total, "slots": self.slots}, f, indent=2)
+        os.replace(tmp_path, plan_path)
+
+    def pending_slots(self):
+        return [slot for slot in self.slots if slot["status"] == "pending"]
+
+    def due(self, slot):
+        return datetime.datetime.fromisoformat(slot["due"])
+
+    def reschedule(self, now, interval):
+        """Move overdue pending slots so they start at now and stay interval apart.
+
+        After a restart the missed slots would otherwise all be due at once
+        and go out as a burst of commits. Returns the number of slots moved.
+        """
+        moved = 0
+        earliest = now
+        for slot in sorted(self.pending_slots(), key=self.due):
+            due = max(self.due(slot), earliest)
+            if due != self.due(slot):
+                slot["due"] = due.isoformat()
+                moved += 1
+            earliest = due + interval
+        return moved
+
+class PoemScheduler:
+    """Runs a day of poem generation and commits as timed events.
+
+    The day plan is saved after every slot, so a restarted process resumes at
+    the first unfinished slot. Time comes from a pluggable clock: RealClock in
+    production, VirtualClock to run a whole day instantly.
+    """
+
+    def __init__(self, automation, clock=None, plan_path=None, retry_delay=30):
+        self.automation = automation
+        self.logger = automation.logger
+        self.clock = clock or getattr(automation, 'clock', None) or RealClock()
+        self.plan_path = Path(plan_path) if plan_path else automation.repo_path / "poem_schedule.json"
+        self.retry_delay = retry_delay
+        self.plan = None
+        self._events = []
+        self._sequence = itertools.count()
+        self._pregenerated = {}
+        self._push_scheduled = False
+
+    def schedule(self, when, name, action):
+        """Queue action() to run at `when`; events due at the same time run in order"""
+        heapq.heappush(self._events, (when, next(self._sequence), name, action))
+
+    def plan_day(self, folder_path, total, interval, first_due=None):
+        """Load today's saved plan, or create one for the poems still missing"""
+        date = date_from_folder(folder_path)
+        plan = DayPlan.load(self.plan_path)
+        if plan and plan.date == date and plan.total == total:
+            self.logger.info(f"Resuming saved plan for {date}: {len(plan.pending_slots())} slots left")
+        else:
+            done = {row["number"] for row in self.automation.index.poems_for_date(date)}
+            plan = DayPlan.create(date, total, first_due or self.clock.now(), interval, done)
+            plan.save(self.plan_path)
+            self.logger.info(f"Planned {len(plan.pending_slots())} poem slots for {date}")
+        self.plan = plan
+        return plan
+
+    def _generate(self, numbers):
+        """Generation event: fill the spool in the background or pregenerate the day"""
+        if self.automation.spool:
+            self.automation.start_prefetch()
+            return
+        try:
+            self._pregenerated = self.automation.generate_poems_concurrently(numbers)
+            self.logger.info(f"Pre-generated {len(self._pregenerated)} poems")
+        except Exception as e:
+            self.logger.error(f"Concurrent generation failed, generating per slot: {str(e)}", exc_info=True)
+
+    def _existing_file(self, number):
+        """Look for an indexed poem in this slot.
+
+        Returns (file_path, already_done); file_path is set when the poem was
+        written but never committed, e.g. because the process died.
+        """
+        for row in self.automation.index.poems_for_date(self.plan.date):
+            if row["number"] != number:
+                continue
+            file_path = self.automation.repo_path / row["path"]
+            if row["commit_sha"] or not file_path.exists():
+                return None, True
+            # Indexed without a SHA: either pulled in by a sync or left behind by a crash
+            if not self.automation.repo.git.status('--porcelain', '--', row["path"]):
+                return None, True
+            return file_path, False
+        return None, False
+
+    def _run_slot(self, slot, folder_path, batch_push):
+        """Commit event: write the slot's poem and commit (and push) it"""
+        number = slot["number"]
+        slot["attempts"] += 1
+        self.logger.info(f"\nGenerating poem {number}/{self.plan.total} at {self.clock.now()}")
+        try:
+            file_path, already_done = self._existing_file(number)
+            if already_done:
+                self.logger.info(f"Poem {number} was already committed")
+            else:
+                if not file_path:
+                    file_path = self.automation.create_poem_file(
+                        folder_path, number, self._pregenerated.pop(number, None)
+                    )
+                if not file_path or not file_path.exists():
+                    raise RuntimeError(f"Failed to create poem file {number}")
+                self.logger.info(f"Created poem at: {file_path}")
+                with open(file_path, 'r', encoding='utf-8') as f:
+                    self.logger.info("\nPoem content:")
+                    self.logger.info("-" * 50)
+                    self.logger.info(f.read())
+                    self.logger.info("-" * 50)
+                if batch_push:
+                    self.automation.git_commit_local(file_path, now=self.clock.now())
+                    self.logger.info(f"Committed poem {number} locally")
+                else:
+                    self.automation.git_commit_and_push(file_path, now=self.clock.now())
+                    self.logger.info(f"Committed poem {number}, {len(self.automation.outbox.pending())} commits waiting to be pushed")
+                    self._schedule_push()
+            slot["status"] = "done"
+        except Exception as e:
+            self.logger.error(f"Error creating poem {number}: {str(e)}", exc_info=True)
+            if slot["attempts"] < MAX_SLOT_ATTEMPTS:
+                retry_at = self.clock.now() + datetime.timedelta(seconds=self.retry_delay)
+                self.schedule(retry_at, f"poem {number} (retry)",
+                              lambda: self._run_slot(slot, folder_path, batch_push))
+            else:
+                slot["status"] = "failed"
+                self.logger.error(f"Giving up on poem {number} after {slot['attempts']} attempts")
+        self.plan.save(self.plan_path)
+        self.automation.metrics.export_quietly()
+
+    def _run_events(self):
+        while self._events:
+            when, _, name, action = heapq.heappop(self._events)
+            wait = (when - self.clock.now()).total_seconds()
+            if wait >= IDLE_MAINTENANCE_SECONDS:
+                self._idle()
+            if (when - self.clock.now()).total_seconds() > 0:
+                self.logger.info(f"Waiting {wait / 60:.1f} minutes until {when} for {name}")
+                self.clock.sleep_until(when)
+            action()
+
+    def _schedule_push(self):
+        """Queue a push event for when the outbox is next due, while slots remain"""
+        due = self.automation.outbox.next_due()
+        if due is None or self._push_scheduled or not self.plan.pending_slots():
+            return
+        self._push_scheduled = True
+        self.schedule(max(due, self.clock.now()), "push", self._push)
+
+    def _push(self):
+        """Push event: push the outbox if it's due (a failure reschedules it)"""
+        self._push_scheduled = False
+        self.automation.push_outbox(now=self.clock.now())
+        self._schedule_push()
+
+    def _drain_outbox(self):
+        """Push commits left unpushed by an earlier run"""
+        count = len(self.automation.outbox.pending())
+        self.logger.info(f"Pushing {count} commits left over from an earlier run...")
+        self.automation.push_outbox(force=True, now=self.clock.now())
+
+    def _idle(self):
+        """Use a long gap between events for repository maintenance"""
+        maintenance = getattr(self.automation, 'maintenance', None)
+        if maintenance:
+            maintenance.run_idle()
+
+    def run_day(self, folder_path, total, interval, first_due=None, batch_push=False):
+        """Plan (or resume) the day and run its events until every slot is settled"""
+        plan = self.plan_day(folder_path, total, interval, first_due)
+        pending = plan.pending_slots()
+        if not pending:
+            self.logger.info(f"All {total} poems for {plan.date} are done")
+            return plan
+
+        now = self.clock.now()
+        moved = plan.reschedule(now, interval)
+        if moved:
+            plan.save(self.plan_path)
+            self.logger.info(f"Moved {moved} overdue slots to start at {now}, {interval} apart")
+        if self.automation.outbox.pending():
+            self.schedule(now, "push outbox", self._drain_outbox)
+        if batch_push:
+            self.schedule(now, "git sync", self._initial_sync)
+        self.schedule(now, "generation", lambda: self._generate([slot["number"] for slot in pending]))
+        for slot in pending:
+            self.schedule(max(plan.due(slot), now), f"poem {slot['number']}",
+                          lambda slot=slot: self._run_slot(slot, folder_path, batch_push))
+        try:
+            self._run_events()
+        finally:
+            self.automation.stop_prefetch()
+            self.automation.sync_git_index()
+
+        # Whatever is still queued goes out now; if that fails too, the next run pushes it
+        pending = len(self.automation.outbox.pending())
+        if pending:
+            self.logger.info(f"Pushing {pending} locally committed poems...")
+            if not self.automation.push_outbox(force=True, now=self.clock.now()):
+                self.logger.warning(f"{len(self.automation.outbox.pending())} commits stay queued for the next run")
+        self.automation.metrics.export_quietly()
+        return plan
+
+    def _initial_sync(self):
+        try:
+            self.automation.git_sync()
+        except Exception as e:
+            self.logger.error(f"Initial git sync failed: {str(e)}", exc_info=True)
+
+def main():
+    parser = argparse.ArgumentParser(description='Show the saved poem schedule')
+    parser.add_argument('--plan', default=None, help='Plan file (default: poem_schedule.json in the repo)')
+    args = parser.parse_args()
+
+    plan_path = args.plan or os.path.join(os.path.dirname(os.path.abspath(__file__)), "poem_schedule.json")
+    plan = DayPlan.load(plan_path)
+    if not plan:
+        print(f"No schedule saved at {plan_path}")
+        return
+    print(f"Schedule for {plan.date} ({plan.total} poems):")
+    for slot in plan.slots:
+        due = slot["due"] or "-"
+        print(f"  {slot['number']:02d}  {due:<28}{slot['status']:<9}attempts: {slot['attempts']}")
+
+if __name__ == "__main__":
+    main()
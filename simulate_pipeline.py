@@ -0,0 +1,238 @@
+#!/usr/bin/env python3
+import argparse
+import contextlib
+import datetime
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# config.py refuses to import without an API key; the fake server ignores it
+os.environ.setdefault("COHERE_API_KEY", "fake-key")
+
+from fake_cohere import FakeCohereServer
+
+REPO_PATH = Path(os.path.dirname(os.path.abspath(__file__)))
+
+STAGES = [
+    "generate_poems_concurrently",
+    "generate_structured_poem",
+    "generate_poem",
+    "generate_one_liner",
+    "create_poem_file",
+    "git_sync",
+    "git_commit_local",
+    "git_push",
+]
+
+class StageTimer:
+    """Time calls to PoemAutomation methods by temporarily wrapping them"""
+
+    def __init__(self, cls, names):
+        self.cls = cls
+        self.originals = {}
+        self.stats = {}
+        for name in names:
+            if hasattr(cls, name):
+                self.originals[name] = getattr(cls, name)
+                self.stats[name] = [0, 0.0]
+                setattr(cls, name, self._wrap(name, self.originals[name]))
+
+    def _wrap(self, name, original):
+        stats = self.stats[name]
+
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return original(*args, **kwargs)
+            finally:
+                stats[0] += 1
+                stats[1] += time.perf_counter() - start
+
+        return timed
+
+    def restore(self):
+        for name, original in self.originals.items():
+            setattr(self.cls, name, original)
+
+def git(*args, cwd=None):
+    return subprocess.run(['git', *args], cwd=cwd, check=True, capture_output=True, text=True).stdout.strip()
+
+def create_workspace(poems, full_corpus=False):
+    """Build a throwaway work repo with a local bare 'origin' and today's pattern"""
+    root = Path(tempfile.mkdtemp(prefix="poem_sim_"))
+    remote = root / "remote.git"
+    work = root / "work"
+    # Keep the automation's `git config --global` calls out of the real config
+    os.environ["GIT_CONFIG_GLOBAL"] = str(root / "gitconfig")
+
+    git('init', '--bare', '-q', str(remote))
+    if full_corpus:
+        git('clone', '-q', '--local', str(REPO_PATH), str(work))
+        git('checkout', '-q', '-B', 'main', cwd=work)
+        git('remote', 'set-url', 'origin', str(remote), cwd=work)
+    else:
+        git('init', '-q', str(work))
+        git('checkout', '-q', '-b', 'main', cwd=work)
+        git('remote', 'add', 'origin', str(remote), cwd=work)
+    git('config', 'user.name', 'Poem Simulator', cwd=work)
+    git('config', 'user.email', 'simulator@localhost', cwd=work)
+
+    (work / "logs").mkdir(exist_ok=True)
+    with open(work / "commit_pattern.json", "w") as f:
+        json.dump({datetime.date.today().isoformat(): poems}, f, indent=2)
+    git('add', 'commit_pattern.json', cwd=work)
+    git('commit', '-q', '-m', 'Simulation pattern', cwd=work)
+    git('push', '-q', 'origin', 'main', cwd=work)
+    return root, work
+
+def run_target(target, work, base_url, poems, concurrency, batch, structured, rpm=0):
+    """Run one of the real entry points against the workspace on a virtual clock"""
+    from scheduler import VirtualClock
+    # Slots, rate limit waits and retry back-offs all run on this clock
+    clock = VirtualClock()
+
+    if target == "automation":
+        import poem_automation
+        automation = poem_automation.PoemAutomation(
+            "fake-key", work, max_concurrency=concurrency,
+            structured_output=structured, cohere_base_url=base_url, requests_per_minute=rpm,
+            clock=clock
+        )
+        automation.run_daily_automation(batch_push=batch)
+    else:
+        import config
+        import daily_automation
+        # PoemAutomation.from_config() reads the settings from config when it is called
+        config.REPO_PATH = str(work)
+        config.COHERE_API_KEY = "fake-key"
+        config.COHERE_BASE_URL = base_url
+        config.GENERATION_CONCURRENCY = concurrency
+        config.STRUCTURED_OUTPUT = structured
+        config.COHERE_RPM = rpm
+        daily_automation.REPO_PATH = str(work)
+        daily_automation.BATCH_PUSH = batch
+        daily_automation.TOTAL_POEMS = poems
+        # Skip the 8 AM start gate
+        daily_automation.should_generate_poems = lambda: True
+        daily_automation.run_daily_automation(clock=clock)
+    return clock
+
+def simulate(args):
+    """Run one simulated day and return the report dict"""
+    import poem_automation
+
+    server = FakeCohereServer(
+        latency=args.latency, error_rate=args.error_rate, rate_limit_rate=args.rate_limit_rate,
+        malformed_rate=args.malformed_rate, seed=args.seed, replay_path=args.replay
+    ).start()
+    root, work = create_workspace(args.poems, args.full_corpus)
+    remote = root / "remote.git"
+    commits_before = int(git('rev-list', '--count', 'main', cwd=remote))
+
+    timer = StageTimer(poem_automation.PoemAutomation, STAGES)
+    log_path = root / "simulation.log"
+    start = time.perf_counter()
+    try:
+        with open(log_path, "w", encoding="utf-8") as log_file:
+            output = contextlib.nullcontext() if args.verbose else contextlib.ExitStack()
+            with output as stack:
+                if stack is not None:
+                    stack.enter_context(contextlib.redirect_stdout(log_file))
+                    stack.enter_context(contextlib.redirect_stderr(log_file))
+                clock = run_target(
+                    args.target, work, server.base_url, args.poems, args.concurrency,
+                    args.batch, not args.no_structured, args.rpm
+                )
+    finally:
+        elapsed = time.perf_counter() - start
+        timer.restore()
+        server.stop()
+
+    poems_committed = int(git('rev-list', '--count', 'main', cwd=remote)) - commits_before
+    requests = {kind: server.stats[f"requests_{kind}"] for kind in ("structured", "poem", "one_liner")}
+    total_requests = sum(requests.values())
+    calls_per_poem = 1 if not args.no_structured else 2
+    report = {
+        "target": args.target,
+        "poems_requested": args.poems,
+        "poems_committed": poems_committed,
+        "wall_seconds": round(elapsed, 3),
+        "virtual_sleep_seconds": round(clock.slept, 1),
+        "virtual_schedule_seconds": round(clock.elapsed(), 1),
+        "throughput_poems_per_second": round(poems_committed / elapsed, 2) if elapsed else None,
+        "api_requests": requests,
+        "extra_api_calls": max(0, total_requests - poems_committed * calls_per_poem),
+        "injected": {
+            "errors_500": server.stats["injected_500"],
+            "rate_limited_429": server.stats["injected_429"],
+            "malformed": server.stats["injected_malformed"]
+        },
+        "stages": {
+            name: {"calls": calls, "total_seconds": round(total, 4),
+                   "mean_ms": round(total / calls * 1000, 2) if calls else 0.0}
+            for name, (calls, total) in timer.stats.items()
+        },
+        "workspace": str(root) if args.keep else None,
+        "log": str(log_path) if args.keep else None
+    }
+    if not args.keep:
+        shutil.rmtree(root, ignore_errors=True)
+    return report
+
+def print_report(report):
+    print(f"\n=== Simulation report: {report['target']} ===")
+    print(f"Poems committed: {report['poems_committed']}/{report['poems_requested']}")
+    print(f"Wall time: {report['wall_seconds']:.2f}s (simulated a {report['virtual_schedule_seconds'] / 60:.0f} minute "
+          f"schedule, skipped {report['virtual_sleep_seconds']:.0f}s of retry sleeps)")
+    print(f"Throughput: {report['throughput_poems_per_second']} poems/s")
+    requests = report['api_requests']
+    print(f"API requests: {sum(requests.values())} "
+          f"(structured {requests['structured']}, poem {requests['poem']}, one-liner {requests['one_liner']})")
+    print(f"Extra API calls (retries and fallbacks): {report['extra_api_calls']}")
+    injected = report['injected']
+    print(f"Injected: {injected['errors_500']} × 500, {injected['rate_limited_429']} × 429, "
+          f"{injected['malformed']} malformed")
+    print("\nStage timings (nested stages overlap):")
+    print(f"{'stage':<30}{'calls':>7}{'total s':>10}{'mean ms':>10}")
+    for name, stage in report['stages'].items():
+        if stage['calls']:
+            print(f"{name:<30}{stage['calls']:>7}{stage['total_seconds']:>10.3f}{stage['mean_ms']:>10.1f}")
+    if report['workspace']:
+        print(f"\nWorkspace kept at {report['workspace']} (log: {report['log']})")
+
+def main():
+    parser = argparse.ArgumentParser(description='Simulate a full poem day against a fake Cohere server')
+    parser.add_argument('--target', choices=['automation', 'daily'], default='automation',
+                      help='automation: PoemAutomation.run_daily_automation, daily: daily_automation.py')
+    parser.add_argument('--poems', type=int, default=17, help='Poems to generate (default: 17)')
+    parser.add_argument('--concurrency', type=int, default=4, help='Generation concurrency (default: 4)')
+    parser.add_argument('--batch', action='store_true', help='Use the batched push mode')
+    parser.add_argument('--no-structured', action='store_true', help='Use the two-call generation path')
+    parser.add_argument('--rpm', type=int, default=0, help='Requests per minute for the rate limiter (default: 0, off)')
+    parser.add_argument('--latency', default='lognormal:-1.5,0.5',
+                      help='Fake API latency spec (default: lognormal:-1.5,0.5, about 0.25s)')
+    parser.add_argument('--error-rate', type=float, default=0.05)
+    parser.add_argument('--rate-limit-rate', type=float, default=0.0)
+    parser.add_argument('--malformed-rate', type=float, default=0.1)
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--replay', help='Serve responses recorded with fake_cohere.py --record')
+    parser.add_argument('--full-corpus', action='store_true', help='Clone this repo (with poems/) as the workspace')
+    parser.add_argument('--keep', action='store_true', help='Keep the temporary workspace and log')
+    parser.add_argument('--verbose', action='store_true', help='Show the pipeline output instead of logging it')
+    parser.add_argument('--json', action='store_true', help='Print the report as JSON')
+    args = parser.parse_args()
+
+    report = simulate(args)
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print_report(report)
+    sys.exit(0 if report['poems_committed'] >= args.poems else 1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,228 @@
+#!/usr/bin/env python3
+import argparse
+import contextvars
+import datetime
+import json
+import logging
+import os
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+# Upper bounds (seconds) of the latency histogram buckets, from validation to slow API calls
+BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+# Poem number the running stages belong to (follows threads and asyncio tasks)
+_current_poem = contextvars.ContextVar('current_poem', default=None)
+
+class StageMetrics:
+    """Durations, attempt counts and outcomes of the pipeline stages.
+
+    Every stage() appends one record to logs/poem_metrics.jsonl:
+    {"time", "run", "poem", "stage", "seconds", "attempts", "outcome"}.
+    export() folds the records added since the last export into cumulative
+    per-stage histograms (kept in logs/poem_metrics_state.json with the
+    JSONL offset they cover) and writes them as a Prometheus
+    textfile-collector file, logs/poem_metrics.prom. Any process can
+    export; the JSONL is the source of truth until log retention trims
+    its folded records with trim().
+    """
+
+    def __init__(self, repo_path, logs_dir=None, logger=None):
+        self.repo_path = Path(repo_path)
+        self.logs_dir = Path(logs_dir) if logs_dir else self.repo_path / "logs"
+        self.jsonl_path = self.logs_dir / "poem_metrics.jsonl"
+        self.state_path = self.logs_dir / "poem_metrics_state.json"
+        self.prom_path = self.logs_dir / "poem_metrics.prom"
+        self.logger = logger or logging.getLogger('PoemAutomation')
+        self.run_id = f"{datetime.datetime.now().strftime('%Y%m%dT%H%M%S')}-{os.getpid()}"
+
+    @contextmanager
+    def poem(self, number):
+        """Attribute the stages run inside to poem `number`"""
+        token = _current_poem.set(number)
+        try:
+            yield
+        finally:
+            _current_poem.reset(token)
+
+    @contextmanager
+    def stage(self, name):
+        """Time the wrapped block as stage `name`.
+
+        Yields the record; the block may set "attempts" and "outcome"
+        (default "ok", or "error" when it raises).
+        """
+        record = {"stage": name, "poem": _current_poem.get(), "attempts": 1}
+        start = time.perf_counter()
+        try:
+            yield record
+        except BaseException:
+            record["outcome"] = "error"
+            raise
+        finally:
+            record["seconds"] = round(time.perf_counter() - start, 4)
+            record.setdefault("outcome", "ok")
+            self._record(record)
+
+    def _record(self, record):
+        entry = {"time": datetime.datetime.now().isoformat(timespec='milliseconds'), "run": self.run_id,
+                 "poem": record["poem"], "stage": record["stage"], "seconds": record["seconds"],
+                 "attempts": record["attempts"], "outcome": record["outcome"]}
+        try:
+            self.logs_dir.mkdir(parents=True, exist_ok=True)
+            # One write per line, so records from concurrent processes don't interleave
+            with open(self.jsonl_path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(entry) + "\n")
+        except OSError as e:
+            self.logger.error(f"Could not record stage timing: {str(e)}")
+
+    def records(self, offset=0):
+        """(records, end offset) of the complete JSONL lines from offset on"""
+        try:
+            with open(self.jsonl_path, 'rb') as f:
+                f.seek(offset)
+                data = f.read()
+        except OSError:
+            return [], offset
+        # A line still being written is left for the next export
+        end = data.rfind(b"\n") + 1
+        records = []
+        for line in data[:end].splitlines():
+            try:
+                records.append(json.loads(line))
+            except ValueError:
+                continue
+        return records, offset + end
+
+    def _load_state(self):
+        try:
+            with open(self.state_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {"offset": 0, "stages": {}}
+
+    def export(self):
+        """Fold new records into the histograms and rewrite the textfile; returns the records folded"""
+        state = self._load_state()
+        try:
+            if state["offset"] > self.jsonl_path.stat().st_size:
+                # The JSONL was removed or truncated; start over from what it holds now
+                state = {"offset": 0, "stages": {}}
+        except OSError:
+            pass
+        records, state["offset"] = self.records(state["offset"])
+        for record in records:
+            stage = state["stages"].setdefault(record["stage"], {
+                "buckets": [0] * len(BUCKETS), "count": 0, "sum": 0.0, "attempts": 0, "outcomes": {}
+            })
+            for i, bound in enumerate(BUCKETS):
+                if record["seconds"] <= bound:
+                    stage["buckets"][i] += 1
+            stage["count"] += 1
+            stage["sum"] += record["seconds"]
+            stage["attempts"] += record.get("attempts") or 1
+            stage["outcomes"][record["outcome"]] = stage["outcomes"].get(record["outcome"], 0) + 1
+
+        try:
+            self.logs_dir.mkdir(parents=True, exist_ok=True)
+            _write_atomic(self.state_path, json.dumps(state, indent=2))
+            _write_atomic(self.prom_path, self.prometheus_text(state))
+        except OSError as e:
+            self.logger.error(f"Could not export stage metrics: {str(e)}")
+        return len(records)
+
+    def trim(self, cutoff, archive_path=None):
+        """Drop JSONL records dated up to cutoff once they are folded into the histograms.
+
+        Returns the number of bytes removed; the export offset moves back by as much.
+        """
+        from retention import trim_jsonl
+        self.export()
+        removed = trim_jsonl(self.jsonl_path, cutoff, archive_path)
+        if removed:
+            state = self._load_state()
+            state["offset"] = max(0, state["offset"] - removed)
+            _write_atomic(self.state_path, json.dumps(state, indent=2))
+        return removed
+
+    def export_quietly(self):
+        """export() for the end of a slot or run, never raising"""
+        try:
+            return self.export()
+        except Exception as e:
+            self.logger.error(f"Stage metrics export failed: {str(e)}")
+            return 0
+
+    @staticmethod
+    def prometheus_text(state):
+        """The state in the Prometheus text exposition format"""
+        lines = [
+            "# HELP poem_stage_duration_seconds Duration of poem pipeline stages.",
+            "# TYPE poem_stage_duration_seconds histogram",
+        ]
+        stages = sorted(state["stages"].items())
+        for name, stage in stages:
+            for bound, count in zip(BUCKETS, stage["buckets"]):
+                lines.append(f'poem_stage_duration_seconds_bucket{{stage="{name}",le="{bound}"}} {count}')
+            lines.append(f'poem_stage_duration_seconds_bucket{{stage="{name}",le="+Inf"}} {stage["count"]}')
+            lines.append(f'poem_stage_duration_seconds_sum{{stage="{name}"}} {stage["sum"]:.4f}')
+            lines.append(f'poem_stage_duration_seconds_count{{stage="{name}"}} {stage["count"]}')
+        lines += [
+            "# HELP poem_stage_attempts_total Attempts made by poem pipeline stages, retries included.",
+            "# TYPE poem_stage_attempts_total counter",
+        ]
+        for name, stage in stages:
+            lines.append(f'poem_stage_attempts_total{{stage="{name}"}} {stage["attempts"]}')
+        lines += [
+            "# HELP poem_stage_outcomes_total Finished poem pipeline stages by outcome.",
+            "# TYPE poem_stage_outcomes_total counter",
+        ]
+        for name, stage in stages:
+            for outcome, count in sorted(stage["outcomes"].items()):
+                lines.append(f'poem_stage_outcomes_total{{stage="{name}",outcome="{outcome}"}} {count}')
+        lines += [
+            "# HELP poem_metrics_export_timestamp_seconds When the stage metrics were last exported.",
+            "# TYPE poem_metrics_export_timestamp_seconds gauge",
+            f"poem_metrics_export_timestamp_seconds {time.time():.0f}",
+        ]
+        return "\n".join(lines) + "\n"
+
+    def summary(self, run=None):
+        """{stage: (count, total seconds, attempts, {outcome: count})} over the JSONL, optionally of one run"""
+        summary = {}
+        for record in self.records()[0]:
+            if run and record["run"] != run:
+                continue
+            count, seconds, attempts, outcomes = summary.get(record["stage"], (0, 0.0, 0, {}))
+            outcomes[record["outcome"]] = outcomes.get(record["outcome"], 0) + 1
+            summary[record["stage"]] = (count + 1, seconds + record["seconds"],
+                                        attempts + (record.get("attempts") or 1), outcomes)
+        return summary
+
+def _write_atomic(path, text):
+    # The textfile collector must never see a half-written file
+    tmp_path = path.with_name(path.name + ".tmp")
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write(text)
+    os.replace(tmp_path, path)
+
+def main():
+    parser = argparse.ArgumentParser(description='Summarize or export the per-stage pipeline timings')
+    parser.add_argument('command', choices=['summary', 'export'], nargs='?', default='summary',
+                      help='summary: per-stage totals from logs/poem_metrics.jsonl, '
+                           'export: rewrite logs/poem_metrics.prom')
+    parser.add_argument('--run', help='Only summarize this run id')
+    args = parser.parse_args()
+
+    metrics = StageMetrics(os.path.dirname(os.path.abspath(__file__)))
+    if args.command == 'export':
+        print(f"Folded {metrics.export()} new records into {metrics.prom_path}")
+        return
+    print(f"{'stage':28} {'count':>6} {'mean s':>8} {'total s':>9} {'attempts':>9}  outcomes")
+    for name, (count, seconds, attempts, outcomes) in sorted(metrics.summary(args.run).items()):
+        outcome_text = ", ".join(f"{outcome} {n}" for outcome, n in sorted(outcomes.items()))
+        print(f"{name:28} {count:>6} {seconds / count:>8.3f} {seconds:>9.2f} {attempts:>9}  {outcome_text}")
+
+if __name__ == "__main__":
+    main()
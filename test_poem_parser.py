@@ -0,0 +1,19 @@
+from poem_parser import parse_poem
+
+LINES = "\n".join(f"Line {n} of the poem 🚀" for n in range(1, 9))
+
+def test_bold_title_label():
+    parsed = parse_poem(f"**Title:** Crypto Monkey Business\n\n{LINES}")
+    assert parsed.title == "Crypto Monkey Business"
+    assert parsed.sanitized_title() == "Crypto-Monkey-Business"
+    assert parsed.valid
+
+def test_bold_title_text():
+    parsed = parse_poem(f"Title: **Crypto Monkey Business**\n\n{LINES}")
+    assert parsed.title == "Crypto Monkey Business"
+    assert parsed.valid
+
+def test_plain_and_heading_titles():
+    assert parse_poem(f"Title: Moon Math\n{LINES}").title == "Moon Math"
+    assert parse_poem(f"# __Moon Math__\n{LINES}").title == "Moon Math"
+    assert parse_poem(f"__Title__: _Moon Math_\n{LINES}").title == "Moon Math"